@@ -1,27 +1,210 @@
 """Client for DAR File Upload AI API."""
 
+import os
+import threading
+import time
 import urllib.parse
-from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Union,
+)
 
 import requests
-from requests import Response
+from requests import RequestException, Response
 
+from sap.aibus.dar.client.aiapi.file_manifest import FileManifest, file_sha256
+from sap.aibus.dar.client.exceptions import (
+    DARException,
+    DARHTTPException,
+    DownloadVerificationFailed,
+)
+from sap.aibus.dar.client.util.http_transport import (
+    CONNECT_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    NUM_REQUEST_RETRIES,
+    READ_TIMEOUT,
+    RetrySession,
+)
+from sap.aibus.dar.client.util.logging import LoggerMixin
 
-class DARAIAPIFileUploadClient:
+#: Default number of files uploaded concurrently by
+#: :meth:`DARAIAPIFileUploadClient.put_many`
+UPLOAD_WORKER_COUNT = 4
+
+#: Size in bytes of the chunks in which downloads are written to disk
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+#: Number of times an interrupted download is resumed before giving up
+DOWNLOAD_RESUME_ATTEMPTS = 3
+
+#: Suffix appended to the local path while a file is being downloaded
+PARTIAL_DOWNLOAD_SUFFIX = ".part"
+
+#: Suffix appended to the partial file name for the file which stores the ETag or
+#: Last-Modified date of the partial download
+DOWNLOAD_VALIDATOR_SUFFIX = ".validator"
+
+
+class FileDownload(NamedTuple):
+    """A file to be downloaded by :meth:`DARAIAPIFileUploadClient.download_many`.
+
+    .. versionadded:: 0.16.0
+    """
+
+    #: URL of the file
+    url: str
+    #: Local destination path
+    local_path: str
+    #: Optional: expected SHA-256 checksum as hexadecimal string
+    sha256: Optional[str] = None
+
+
+class FileUploadReport:
+    """Outcome of :meth:`DARAIAPIFileUploadClient.put_many`.
+
+    Files are identified by their remote path.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self) -> None:
+        #: Remote paths of the uploaded files
+        self.uploaded = []  # type: List[str]
+        #: Remote paths of files skipped because they already exist
+        self.skipped = []  # type: List[str]
+        #: Failed uploads: the error response or exception per remote path
+        self.failed = {}  # type: Dict[str, Union[Response, Exception]]
+        #: Total size in bytes of the uploaded files
+        self.bytes_uploaded = 0
+        #: Wall clock time of the upload in seconds
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Aggregate upload throughput.
+
+        :returns: Uploaded bytes per second.
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_uploaded / self.elapsed
+
+    def __repr__(self) -> str:
+        return (
+            "FileUploadReport(uploaded={}, skipped={}, failed={}, "
+            "bytes_uploaded={}, elapsed={:.2f})".format(
+                len(self.uploaded),
+                len(self.skipped),
+                len(self.failed),
+                self.bytes_uploaded,
+                self.elapsed,
+            )
+        )
+
+
+class FileDownloadReport:
+    """Outcome of :meth:`DARAIAPIFileUploadClient.download_many`.
+
+    Files are identified by their local path.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self) -> None:
+        #: Local paths of the downloaded files
+        self.downloaded = []  # type: List[str]
+        #: Failed downloads: the exception per local path
+        self.failed = {}  # type: Dict[str, Exception]
+        #: Total size in bytes of the downloaded files
+        self.bytes_downloaded = 0
+        #: Wall clock time of the download in seconds
+        self.elapsed = 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Aggregate download throughput.
+
+        :returns: Downloaded bytes per second.
+        """
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_downloaded / self.elapsed
+
+    def __repr__(self) -> str:
+        return (
+            "FileDownloadReport(downloaded={}, failed={}, bytes_downloaded={}, "
+            "elapsed={:.2f})".format(
+                len(self.downloaded),
+                len(self.failed),
+                self.bytes_downloaded,
+                self.elapsed,
+            )
+        )
+
+
+class DARAIAPIFileUploadClient(LoggerMixin):
     """Client for DAR File Upload AI API.
 
-    This client provides methods to upload and delete files on the DAR service,
-    handling authentication and request preparation internally.
+    This client provides methods to upload, download and delete files on the DAR
+    service, handling authentication and request preparation internally.
+
+    All requests are sent through one persistent HTTP session, so that connections
+    are reused across file operations. The session applies the same retry and
+    timeout policies as
+    :class:`~sap.aibus.dar.client.util.http_transport.TimeoutRetrySession` and can
+    be shared by several threads; *pool_maxsize* should be at least the number of
+    threads. Call :meth:`close` or use the client as a context manager to close the
+    connections.
+
+    .. versionchanged:: 0.16.0
+       Connections are reused instead of creating a new session per request.
+       Failed requests are retried.
     """
 
-    def __init__(self, base_url: str, get_token: Callable[[], str]):
+    # pylint: disable=too-many-arguments
+    def __init__(
+        self,
+        base_url: str,
+        get_token: Callable[[], str],
+        num_retries: int = NUM_REQUEST_RETRIES,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        pool_maxsize: int = DEFAULT_POOL_SIZE,
+    ):
         """Initialize the DARFileUploadAIAPIClient.
 
         :param base_url: The base URL of the DAR AI API.
         :param get_token: A callable to fetch the authorization token.
+        :param num_retries: Number of retries for failed requests.
+        :param connect_timeout: Timeout in seconds to establish a connection.
+        :param read_timeout: Maximum time in seconds between bytes received.
+        :param pool_maxsize: Number of connections kept open.
         """
         self.base_url = base_url + "/files"
         self.get_token = get_token
+        self.timeout = (connect_timeout, read_timeout)
+        self._http = RetrySession(num_retries, pool_maxsize=pool_maxsize)
+
+    def close(self) -> None:
+        """Close all connections of the underlying HTTP session.
+
+        :returns: None
+        """
+        self._http.session.close()
+
+    def __enter__(self) -> "DARAIAPIFileUploadClient":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
 
     def delete_file(self, remote_path: str) -> Response:
         """Delete file under defined remote path.
@@ -58,6 +241,183 @@ class DARAIAPIFileUploadClient:
                 method="PUT", url=url, headers=headers, params=params, data=file
             )
 
+    def put_many(
+        self,
+        files: Iterable[Tuple[str, str]],
+        overwrite: bool = False,
+        worker_count: int = UPLOAD_WORKER_COUNT,
+        manifest: Optional[FileManifest] = None,
+    ) -> FileUploadReport:
+        """Upload several files concurrently.
+
+        Each file is streamed from disk, so files are never read into memory as a
+        whole. At most *worker_count* files are uploaded at the same time.
+
+        If *overwrite* is False, files whose remote copy already exists are
+        rejected by the service with status code 409 and reported as skipped.
+        Other errors do not stop the remaining uploads; they are collected in
+        :attr:`FileUploadReport.failed`.
+
+        .. note::
+
+            Skip detection relies on the 409 response to the upload itself; the
+            client does not check whether a remote file exists beforehand. The
+            content of each skipped file is therefore still sent to the service
+            before it is rejected. To avoid re-sending unchanged files, pass a
+            *manifest* or use :meth:`sync_directory`.
+
+        If a *manifest* is given, files which the manifest records as uploaded
+        unchanged to the same remote path are reported as skipped without sending
+        a request, and successful uploads are recorded in the manifest. The
+        manifest is not saved; see :meth:`sync_directory`.
+
+        .. versionadded:: 0.16.0
+
+        :param files: Tuples of local path and remote path.
+        :param overwrite: Whether to overwrite existing files, defaults to False.
+        :param worker_count: Maximum number of concurrent uploads.
+        :param manifest: Optional: The manifest of previously uploaded files.
+
+        :returns: A report of uploaded, skipped and failed files.
+        """
+        if worker_count < 1:
+            raise ValueError("worker_count must be > 0, not {}".format(worker_count))
+        self._http.ensure_pool_size(worker_count)
+        report = FileUploadReport()
+        lock = threading.Lock()
+
+        def upload(local_path: str, remote_path: str) -> None:
+            try:
+                size = os.path.getsize(local_path)
+                entry = None
+                if manifest is not None:
+                    entry = manifest.changed_entry(local_path, remote_path)
+                    if entry is None:
+                        with lock:
+                            report.skipped.append(remote_path)
+                        return
+                response = self.put_file(local_path, remote_path, overwrite)
+            except (OSError, RequestException) as exc:
+                self.log.warning("Failed to upload %s: %s", local_path, exc)
+                with lock:
+                    report.failed[remote_path] = exc
+                return
+            with lock:
+                if response.status_code == 409 and not overwrite:
+                    report.skipped.append(remote_path)
+                elif response.status_code > 299:
+                    self.log.warning(
+                        "Failed to upload %s: status code %s",
+                        local_path,
+                        response.status_code,
+                    )
+                    report.failed[remote_path] = response
+                else:
+                    report.uploaded.append(remote_path)
+                    report.bytes_uploaded += size
+                    if manifest is not None and entry is not None:
+                        manifest.record(remote_path, entry)
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            for future in [
+                executor.submit(upload, local_path, remote_path)
+                for local_path, remote_path in files
+            ]:
+                future.result()
+        report.elapsed = time.monotonic() - started_at
+        self.log.info(
+            "Uploaded %s files (%.1f MB) in %.1f s at %.2f MB/s;"
+            " %s skipped, %s failed",
+            len(report.uploaded),
+            report.bytes_uploaded / 1e6,
+            report.elapsed,
+            report.throughput / 1e6,
+            len(report.skipped),
+            len(report.failed),
+        )
+        return report
+
+    def put_directory(
+        self,
+        local_dir: str,
+        remote_dir: str,
+        overwrite: bool = False,
+        worker_count: int = UPLOAD_WORKER_COUNT,
+        manifest: Optional[FileManifest] = None,
+    ) -> FileUploadReport:
+        """Upload all files below a local directory concurrently.
+
+        The directory structure is preserved: the file *local_dir/a/b.csv* is
+        uploaded to *remote_dir/a/b.csv*. See :meth:`put_many` for details,
+        including how existing files are detected.
+
+        .. versionadded:: 0.16.0
+
+        :param local_dir: The local directory to upload.
+        :param remote_dir: The destination directory on the server.
+        :param overwrite: Whether to overwrite existing files, defaults to False.
+        :param worker_count: Maximum number of concurrent uploads.
+        :param manifest: Optional: The manifest of previously uploaded files.
+
+        :returns: A report of uploaded, skipped and failed files.
+        """
+        if not os.path.isdir(local_dir):
+            raise ValueError("Not a directory: {}".format(local_dir))
+        remote_dir = remote_dir.rstrip("/")
+        files = []
+        for dir_path, dir_names, file_names in os.walk(local_dir):
+            dir_names.sort()
+            for file_name in sorted(file_names):
+                local_path = os.path.join(dir_path, file_name)
+                relative_path = os.path.relpath(local_path, local_dir)
+                remote_path = remote_dir + "/" + relative_path.replace(os.sep, "/")
+                files.append((local_path, remote_path))
+        return self.put_many(
+            files, overwrite=overwrite, worker_count=worker_count, manifest=manifest
+        )
+
+    def sync_directory(
+        self,
+        local_dir: str,
+        remote_dir: str,
+        manifest_path: str,
+        worker_count: int = UPLOAD_WORKER_COUNT,
+    ) -> FileUploadReport:
+        """Upload new and changed files below a local directory.
+
+        A :class:`~sap.aibus.dar.client.aiapi.file_manifest.FileManifest` stored at
+        *manifest_path* records size, modification time and SHA-256 checksum of
+        each uploaded file. Files whose size and modification time are unchanged
+        are skipped without reading them; files which were touched but whose
+        checksum is unchanged are skipped as well. All other files are uploaded,
+        overwriting their remote copy. If nothing changed, no request is sent.
+
+        The manifest is saved even if the upload is interrupted.
+
+        .. versionadded:: 0.16.0
+
+        :param local_dir: The local directory to upload.
+        :param remote_dir: The destination directory on the server.
+        :param manifest_path: The path of the manifest file. Use one manifest per
+            remote directory.
+        :param worker_count: Maximum number of concurrent uploads.
+
+        :returns: A report of uploaded, skipped and failed files. Unchanged files
+            are reported as skipped.
+        """
+        manifest = FileManifest(manifest_path)
+        try:
+            return self.put_directory(
+                local_dir,
+                remote_dir,
+                overwrite=True,
+                worker_count=worker_count,
+                manifest=manifest,
+            )
+        finally:
+            manifest.save()
+
     def get_file_from_url(self, url: str) -> Response:
         """Download file under defined url.
 
@@ -67,6 +427,194 @@ class DARAIAPIFileUploadClient:
         """
         return self._send("GET", url)
 
+    def download_file(
+        self,
+        url: str,
+        local_path: str,
+        sha256: Optional[str] = None,
+        size: Optional[int] = None,
+        resume: bool = True,
+        chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    ) -> int:
+        """Download a file to disk.
+
+        The response is streamed to *local_path* with the suffix
+        *PARTIAL_DOWNLOAD_SUFFIX* in chunks of *chunk_size* bytes, so that large
+        files are never held in memory. If the connection breaks, the download is
+        resumed with an HTTP *Range* request up to *DOWNLOAD_RESUME_ATTEMPTS*
+        times. If *resume* is True, a partial file left behind by an earlier call
+        is resumed as well.
+
+        The strong *ETag*, or else the *Last-Modified* date, of the response is
+        stored next to the partial file with the suffix
+        *DOWNLOAD_VALIDATOR_SUFFIX*. When resuming, it is sent in an *If-Range*
+        header, so that a server whose copy of the file has changed in the
+        meantime sends the entire new file instead of a range of it. The download
+        then restarts from the beginning.
+
+        Once complete, the size is checked against the size announced by the
+        server and against *size*, and the checksum against *sha256*, if given.
+        Only then is the file renamed to *local_path*.
+
+        .. versionadded:: 0.16.0
+
+        :param url: The url of the file to download.
+        :param local_path: The local destination path.
+        :param sha256: Optional: The expected SHA-256 checksum as hexadecimal
+            string.
+        :param size: Optional: The expected size in bytes.
+        :param resume: Whether to resume an existing partial download, defaults to
+            True.
+        :param chunk_size: Number of bytes written to disk at a time.
+
+        :returns: The size of the downloaded file in bytes.
+        :raises DARHTTPException: if the server responds with an error
+        :raises DownloadVerificationFailed: if size or checksum do not match
+        """
+        part_path = local_path + PARTIAL_DOWNLOAD_SUFFIX
+        directory = os.path.dirname(local_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if not resume:
+            _remove_partial_download(part_path)
+
+        attempt = 0
+        while True:
+            try:
+                expected_size = self._download_to_part(url, part_path, chunk_size)
+                break
+            except RequestException as exc:
+                if attempt >= DOWNLOAD_RESUME_ATTEMPTS:
+                    raise
+                attempt += 1
+                self.log.warning("Download of %s interrupted, resuming: %s", url, exc)
+
+        actual_size = os.path.getsize(part_path)
+        reason = None
+        if expected_size is not None and actual_size != expected_size:
+            reason = "expected {} bytes from server, got {}".format(
+                expected_size, actual_size
+            )
+        elif size is not None and actual_size != size:
+            reason = "expected {} bytes, got {}".format(size, actual_size)
+        elif sha256 is not None:
+            actual_sha256 = file_sha256(part_path, chunk_size)
+            if actual_sha256 != sha256.lower():
+                reason = "expected SHA-256 {}, got {}".format(sha256, actual_sha256)
+        if reason is not None:
+            _remove_partial_download(part_path)
+            raise DownloadVerificationFailed(url, local_path, reason)
+        os.replace(part_path, local_path)
+        _remove_partial_download(part_path)
+        return actual_size
+
+    def _download_to_part(
+        self, url: str, part_path: str, chunk_size: int
+    ) -> Optional[int]:
+        """Download to or append to the partial file.
+
+        :returns: The total size announced by the server, if known.
+        """
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validator_path = part_path + DOWNLOAD_VALIDATOR_SUFFIX
+        # Compressed responses would be decoded, which breaks byte ranges and
+        # the size check.
+        headers = {"Accept-Encoding": "identity"}
+        if offset:
+            headers["Range"] = "bytes={}-".format(offset)
+            if os.path.exists(validator_path):
+                with open(validator_path, "r", encoding="utf-8") as validator_file:
+                    headers["If-Range"] = validator_file.read()
+        response = self._send("GET", url, headers=headers, stream=True)
+        with response:
+            if response.status_code == 416 and offset:
+                # The partial file is not a prefix of the remote file.
+                self.log.info("Cannot resume download of %s, restarting", url)
+                _remove_partial_download(part_path)
+                return self._download_to_part(url, part_path, chunk_size)
+            if response.status_code > 299:
+                raise DARHTTPException.create_from_response(url, response)
+            expected_size = None
+            if response.status_code == 206:
+                mode = "ab"
+                total = response.headers.get("Content-Range", "").rpartition("/")[2]
+                if total.isdigit():
+                    expected_size = int(total)
+            else:
+                # The server ignored the Range header or the remote file changed,
+                # as indicated by If-Range, and sends the entire file.
+                if offset:
+                    self.log.info("Restarting download of %s from the start", url)
+                mode = "wb"
+                length = response.headers.get("Content-Length", "")
+                if length.isdigit():
+                    expected_size = int(length)
+                _store_validator(validator_path, response)
+            with open(part_path, mode) as part_file:
+                for chunk in response.iter_content(chunk_size):
+                    part_file.write(chunk)
+        return expected_size
+
+    def download_many(
+        self,
+        downloads: Iterable[Union[FileDownload, Tuple[str, str]]],
+        worker_count: int = UPLOAD_WORKER_COUNT,
+        resume: bool = True,
+    ) -> FileDownloadReport:
+        """Download several files concurrently.
+
+        Each file is downloaded with :meth:`download_file`. At most *worker_count*
+        files are downloaded at the same time. Failed downloads do not stop the
+        remaining downloads; they are collected in
+        :attr:`FileDownloadReport.failed`.
+
+        .. versionadded:: 0.16.0
+
+        :param downloads: :class:`FileDownload` instances, or tuples of url and
+            local path.
+        :param worker_count: Maximum number of concurrent downloads.
+        :param resume: Whether to resume existing partial downloads, defaults to
+            True.
+
+        :returns: A report of downloaded and failed files.
+        """
+        if worker_count < 1:
+            raise ValueError("worker_count must be > 0, not {}".format(worker_count))
+        self._http.ensure_pool_size(worker_count)
+        report = FileDownloadReport()
+        lock = threading.Lock()
+
+        def download(item: FileDownload) -> None:
+            try:
+                size = self.download_file(
+                    item.url, item.local_path, sha256=item.sha256, resume=resume
+                )
+            except (DARException, OSError, RequestException) as exc:
+                self.log.warning("Failed to download %s: %s", item.url, exc)
+                with lock:
+                    report.failed[item.local_path] = exc
+                return
+            with lock:
+                report.downloaded.append(item.local_path)
+                report.bytes_downloaded += size
+
+        started_at = time.monotonic()
+        with ThreadPoolExecutor(max_workers=worker_count) as executor:
+            for future in [
+                executor.submit(download, FileDownload(*item)) for item in downloads
+            ]:
+                future.result()
+        report.elapsed = time.monotonic() - started_at
+        self.log.info(
+            "Downloaded %s files (%.1f MB) in %.1f s at %.2f MB/s; %s failed",
+            len(report.downloaded),
+            report.bytes_downloaded / 1e6,
+            report.elapsed,
+            report.throughput / 1e6,
+            len(report.failed),
+        )
+        return report
+
     def _send(  # pylint: disable=too-many-arguments
         self,
         method: str,
@@ -74,8 +622,9 @@ class DARAIAPIFileUploadClient:
         headers: dict = None,
         data: Any = None,
         params: dict = None,
+        stream: bool = False,
     ) -> Response:
-        """Send an HTTP request using the `requests` library.
+        """Send an HTTP request through the persistent session.
 
         :param method: The HTTP method (e.g., 'GET', 'POST', 'PUT', 'DELETE').
         :param url: The full URL for the request.
@@ -83,10 +632,11 @@ class DARAIAPIFileUploadClient:
         :param data: The data payload for the request (e.g., file data),
                      defaults to None.
         :param params: The query parameters for the URL,defaults to None.
+        :param stream: Whether to stream the response body instead of reading it
+                       immediately, defaults to False.
 
         :returns: The HTTP response object from the API call.
         """
-        session = requests.Session()
         auth_headers = {
             "Authorization": self.get_token(),
         }
@@ -100,5 +650,31 @@ class DARAIAPIFileUploadClient:
         prep.url = url
         if params:
             prep.url += "?" + urllib.parse.urlencode(params)
-        response = session.send(prep, verify=True)
+        response = self._http.session.send(
+            prep, verify=True, timeout=self.timeout, stream=stream
+        )
         return response
+
+
+def _store_validator(validator_path: str, response: Response) -> None:
+    """Store the validator of a full response for If-Range requests.
+
+    Weak ETags must not be used in If-Range, so the Last-Modified date is stored
+    instead. Without either, resumed downloads are not validated.
+    """
+    validator = response.headers.get("ETag")
+    if validator is None or validator.startswith("W/"):
+        validator = response.headers.get("Last-Modified")
+    if validator is None:
+        if os.path.exists(validator_path):
+            os.remove(validator_path)
+        return
+    with open(validator_path, "w", encoding="utf-8") as file:
+        file.write(validator)
+
+
+def _remove_partial_download(part_path: str) -> None:
+    """Remove a partial download and its validator, if present."""
+    for path in (part_path, part_path + DOWNLOAD_VALIDATOR_SUFFIX):
+        if os.path.exists(path):
+            os.remove(path)
@@ -0,0 +1,175 @@
+"""Manifest of files uploaded to the DAR AI API file storage."""
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+#: Number of bytes hashed at a time
+HASH_CHUNK_SIZE = 1024 * 1024
+
+#: Files of at least this size in bytes are memory-mapped for hashing
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+
+def file_sha256(path: str, chunk_size: int = HASH_CHUNK_SIZE) -> str:
+    """Compute the SHA-256 checksum of a local file.
+
+    The file is hashed incrementally in chunks of *chunk_size* bytes. Files of at
+    least *MMAP_THRESHOLD* bytes are memory-mapped instead of read, which avoids
+    copying their content.
+
+    .. versionadded:: 0.16.0
+
+    :param path: The path of the file.
+    :param chunk_size: Number of bytes hashed at a time.
+
+    :returns: The checksum as hexadecimal string.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        # Empty files cannot be memory-mapped.
+        if size >= max(MMAP_THRESHOLD, 1):
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    for offset in range(0, size, chunk_size):
+                        digest.update(view[offset : offset + chunk_size])
+                finally:
+                    # The mmap cannot be closed while a view is exported.
+                    view.release()
+        else:
+            for chunk in iter(lambda: file.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ManifestEntry(NamedTuple):
+    """State of a local file when it was uploaded.
+
+    .. versionadded:: 0.16.0
+    """
+
+    #: Size in bytes
+    size: int
+    #: Modification time in nanoseconds
+    mtime_ns: int
+    #: SHA-256 checksum as hexadecimal string
+    sha256: str
+
+
+class FileManifest(LoggerMixin):
+    """Records size, modification time and checksum of uploaded files.
+
+    The manifest maps remote paths to the :class:`ManifestEntry` of the local file
+    uploaded there. It is stored as JSON file at *path*, loaded on construction and
+    written by :meth:`save`.
+
+    :meth:`changed_entry` decides whether a local file needs to be uploaded. If
+    size and modification time match the manifest, the file is assumed to be
+    unchanged without reading it. Otherwise, the file is hashed and only counts as
+    changed if its checksum differs.
+
+    The manifest only knows about uploads made through it. If remote files are
+    changed or deleted by other means, delete the manifest to upload all files
+    again.
+
+    Instances are thread-safe.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, path: str):
+        """Load the manifest.
+
+        :param path: The path of the JSON file. Need not exist yet.
+        """
+        self.path = path
+        self.entries = {}  # type: Dict[str, ManifestEntry]
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            self.entries = {
+                remote_path: ManifestEntry(**entry)
+                for remote_path, entry in data["files"].items()
+            }
+        except (ValueError, KeyError, TypeError) as exc:
+            self.log.warning(
+                "Ignoring unreadable manifest %s, all files will be uploaded: %s",
+                self.path,
+                exc,
+            )
+            self.entries = {}
+
+    def changed_entry(
+        self, local_path: str, remote_path: str
+    ) -> Optional[ManifestEntry]:
+        """Check whether a local file differs from the file uploaded to a path.
+
+        If only the modification time differs, the manifest is updated.
+
+        :param local_path: The path of the local file.
+        :param remote_path: The path of the file on the server.
+
+        :returns: None if the file is unchanged; otherwise the entry to
+            :meth:`record` once the file has been uploaded.
+        """
+        stat = os.stat(local_path)
+        with self._lock:
+            entry = self.entries.get(remote_path)
+        if (
+            entry is not None
+            and entry.size == stat.st_size
+            and entry.mtime_ns == stat.st_mtime_ns
+        ):
+            return None
+        new_entry = ManifestEntry(
+            size=stat.st_size,
+            mtime_ns=stat.st_mtime_ns,
+            sha256=file_sha256(local_path),
+        )
+        if entry is not None and entry.sha256 == new_entry.sha256:
+            self.record(remote_path, new_entry)
+            return None
+        return new_entry
+
+    def record(self, remote_path: str, entry: ManifestEntry) -> None:
+        """Record an uploaded file.
+
+        :param remote_path: The path of the file on the server.
+        :param entry: The state of the uploaded local file.
+
+        :returns: None
+        """
+        with self._lock:
+            self.entries[remote_path] = entry
+
+    def save(self) -> None:
+        """Write the manifest to disk.
+
+        The file is replaced atomically, so that an interrupted write does not
+        corrupt an existing manifest.
+
+        :returns: None
+        """
+        with self._lock:
+            data = {
+                "files": {
+                    remote_path: entry._asdict()
+                    for remote_path, entry in sorted(self.entries.items())
+                }
+            }
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=1)
+        os.replace(temp_path, self.path)
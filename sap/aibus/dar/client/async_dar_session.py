@@ -0,0 +1,191 @@
+"""
+This module contains the asyncio HTTP Transport layer used to interact with the DAR
+service.
+"""
+from typing import Optional
+
+from sap.aibus.dar.client.exceptions import DARHTTPException
+from sap.aibus.dar.client.util.async_http_transport import (
+    MAX_CONNECTIONS,
+    AsyncTimeoutPostRetrySession,
+    AsyncTimeoutRetrySession,
+    require_httpx,
+)
+from sap.aibus.dar.client.util.credentials import CredentialsSource
+from sap.aibus.dar.client.util.http_transport import (
+    CONNECT_TIMEOUT,
+    READ_TIMEOUT,
+    RetryBudget,
+    normalize_base_url,
+)
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    # AsyncDARSession raises an ImportError via require_httpx() instead.
+    pass
+
+
+class AsyncDARSession:
+    """
+    An asyncio HTTP client for the DAR service.
+
+    This is the asyncio counterpart of
+    :class:`~sap.aibus.dar.client.dar_session.DARSession`. All request methods are
+    coroutines and return a `httpx.Response`. All methods can raise a
+    :py:class:`DARHTTPException`. The underlying `httpx` library may raise
+    `httpx.HTTPError`.
+
+    The session keeps a pool of up to *max_connections* connections which is shared
+    by all requests. Call :meth:`aclose` or use the session as an asynchronous
+    context manager to release the connections:
+
+    .. code-block:: python
+
+        async with AsyncDARSession(url, credentials_source) as session:
+            response = await session.get_from_endpoint(endpoint)
+
+    .. note::
+
+        Tokens are retrieved from the *credentials_source* synchronously. An
+        :class:`~sap.aibus.dar.client.util.credentials.OnlineCredentialsSource`
+        caches the token, so the event loop is only blocked briefly when a new token
+        is fetched once the previous token has expired.
+
+    If a *retry_budget* is given, it is shared by all requests of the session and
+    limits the share of retried requests, see
+    :class:`~sap.aibus.dar.client.util.http_transport.RetryBudget`.
+
+    This class internally uses :class:`AsyncTimeoutRetrySession`.
+
+    .. versionadded:: 0.16.0
+        The *retry_budget* parameter.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        credentials_source: CredentialsSource,
+        max_connections: int = MAX_CONNECTIONS,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        """
+        Constructor.
+
+        :param base_url: Base URL of the service.
+        :param credentials_source: :py:class:`CredentialsSource` used for authentication
+        :param max_connections: maximum number of concurrent connections
+        :param retry_budget: Optional: limits the share of retried requests
+        """
+        require_httpx()
+        self.base_url = normalize_base_url(base_url)
+        self.credentials_source = credentials_source
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+        )
+        # Both sessions share the connection pool.
+        self.http = AsyncTimeoutRetrySession(client=client, retry_budget=retry_budget)
+        self.http_post_retry = AsyncTimeoutPostRetrySession(
+            client=client, retry_budget=retry_budget
+        )
+
+    def _get_headers(self):
+        return {
+            "Authorization": "Bearer " + self.credentials_source.token(),
+            "User-Agent": "DAR-SDK httpx/" + httpx.__version__,
+            "Accept": "application/json;q=0.9,text/plain",
+        }
+
+    async def get_from_endpoint(self, endpoint: str) -> "httpx.Response":
+        """
+        Performs **GET** request against **endpoint**.
+
+        :param endpoint: Path component of URL
+        :return: the `httpx.Response` object.
+        :raise: DARHTTPException
+        :raise: httpx.HTTPError
+        """
+        url = self.base_url + endpoint
+        response = await self.http.get(url, headers=self._get_headers())
+        self._check_status_code(response, url)
+        return response
+
+    async def delete_from_endpoint(self, endpoint: str) -> "httpx.Response":
+        """
+        Performs **DELETE** request against **endpoint**.
+
+        :param endpoint: Path component of URL
+        :return: the `httpx.Response` object.
+        :raise: DARHTTPException
+        :raise: httpx.HTTPError
+        """
+        url = self.base_url + endpoint
+        response = await self.http.delete(url, headers=self._get_headers())
+        self._check_status_code(response, url)
+        return response
+
+    @staticmethod
+    def _check_status_code(response, url):
+        if response.status_code > 299:
+            raise DARHTTPException.create_from_response(url, response)
+
+    async def post_to_endpoint(
+        self, endpoint: str, payload: dict, retry: bool = False
+    ) -> "httpx.Response":
+        """
+        Performs **POST** request against **endpoint**.
+
+        The given **payload** is encoded as JSON and sent as the body
+        of the request.
+
+        The **retry** parameter has the same semantics as in
+        :meth:`DARSession.post_to_endpoint`. See :ref:`retry` for trade-offs
+        involved here.
+
+        :param endpoint: Path component of URL
+        :param payload: Body of the request. Will be encoded to JSON.
+        :param retry: whether to retry on failed requests. Defaults to False.
+        :return: the `httpx.Response` object.
+        :raise: DARHTTPException
+        :raise: httpx.HTTPError
+        """
+        url = self.base_url + endpoint
+        return await self.post_to_url(url, payload, retry=retry)
+
+    async def post_to_url(
+        self, url: str, payload: dict, retry: bool = False
+    ) -> "httpx.Response":
+        """
+        Performs **POST** request against fully-qualified URL
+
+        :param url: a fully-qualified inference URL
+        :param payload: request body
+        :param retry: enables retrying a failed request
+        :return: the `httpx.Response` object.
+        :raise: DARHTTPException
+        :raise: httpx.HTTPError
+        """
+        connection = self.http
+        if retry:
+            connection = self.http_post_retry
+        response = await connection.post(url, headers=self._get_headers(), json=payload)
+        self._check_status_code(response, url)
+        return response
+
+    async def aclose(self) -> None:
+        """
+        Closes all connections held by this session.
+
+        :return: None
+        """
+        await self.http.aclose()
+
+    async def __aenter__(self) -> "AsyncDARSession":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
@@ -0,0 +1,188 @@
+"""
+Asyncio client API for the Inference microservice.
+"""
+import asyncio
+from typing import List, Optional, Tuple
+
+from sap.aibus.dar.client.async_dar_session import AsyncDARSession
+from sap.aibus.dar.client.base_client import BaseClient
+from sap.aibus.dar.client.exceptions import DARHTTPException, InvalidWorkerCount
+from sap.aibus.dar.client.inference_constants import LIMIT_OBJECTS_PER_CALL, TOP_N
+from sap.aibus.dar.client.inference_requests import InferenceRequestMixin
+from sap.aibus.dar.client.util.credentials import CredentialsSource
+from sap.aibus.dar.client.util.lists import split_list
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    # AsyncDARSession raises an ImportError via require_httpx() instead.
+    pass
+
+#: How many inference requests are in flight at most during bulk inference by default
+DEFAULT_CONCURRENCY = 4
+
+# pylint: disable=too-many-arguments
+
+
+class AsyncInferenceClient(InferenceRequestMixin, BaseClient):
+    """
+    An asyncio client for the DAR Inference microservice.
+
+    This is the asyncio counterpart of
+    :class:`~sap.aibus.dar.client.inference_client.InferenceClient`. All API methods
+    are coroutines which do not block the event loop while waiting for the service.
+    Instead of a thread per request, a single event loop can keep many inference
+    requests in flight.
+
+    The client requires the optional `httpx` dependency::
+
+        pip install data-attribute-recommendation-sdk[async]
+
+    Example usage:
+
+    .. code-block:: python
+
+        async def main():
+            async with AsyncInferenceClient.construct_from_service_key(key) as client:
+                predictions = await client.do_bulk_inference("my-model", objects)
+
+        asyncio.run(main())
+
+    If the API call fails, all methods will raise an :exc:`DARHTTPException`.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, url: str, credentials_source: CredentialsSource):
+        # pylint: disable=super-init-not-called
+        self.credentials_source = credentials_source
+        self.session = AsyncDARSession(url, credentials_source)
+
+    async def create_inference_request(
+        self,
+        model_name: str,
+        objects: List[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+    ) -> dict:
+        """
+        Performs inference for the given *objects* with *model_name*.
+
+        See :meth:`InferenceClient.create_inference_request` for details.
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :return: API response
+        """
+        endpoint, payload = self._prepare_model_request(model_name, objects, top_n)
+        response = await self.session.post_to_endpoint(
+            endpoint, payload=payload, retry=retry
+        )
+        return self._parse_inference_response(response)
+
+    async def create_inference_request_with_url(
+        self,
+        url: str,
+        objects: List[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+    ) -> dict:
+        """
+        Performs inference for the given *objects* against fully-qualified URL.
+
+        See :meth:`InferenceClient.create_inference_request_with_url` for details.
+
+        :param url: fully-qualified inference URL
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :return: API response
+        """
+        payload = self._prepare_url_request(url, objects, top_n)
+        response = await self.session.post_to_url(url, payload=payload, retry=retry)
+        return self._parse_inference_response(response)
+
+    async def do_bulk_inference(
+        self,
+        model_name: str,
+        objects: List[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> List[Optional[dict]]:
+        """
+        Performs bulk inference for larger collections.
+
+        For *objects* collections larger than *LIMIT_OBJECTS_PER_CALL*, splits
+        the data into several smaller Inference requests. Up to *concurrency*
+        requests are in flight at the same time.
+
+        The result and the error handling are identical to
+        :meth:`InferenceClient.do_bulk_inference`: if an inference request fails,
+        a placeholder prediction with `labels` set to `None` and an `_sdk_error`
+        key is returned for each of the objects in the failing request.
+
+        .. note::
+
+            Each inference request incurs a cost for non-trial service instances.
+            For trial service instances, keep *concurrency* at the default value.
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param concurrency: maximum number of concurrent requests
+        :raises: InvalidWorkerCount if concurrency param is incorrect
+        :return: the aggregated ObjectPrediction dictionaries
+        """
+        if concurrency is None or concurrency <= 0:
+            raise InvalidWorkerCount("concurrency must be greater than 0!")
+
+        batches = list(enumerate(split_list(objects, LIMIT_OBJECTS_PER_CALL)))
+        # Workers take batches from the end; reverse to start with the first one.
+        batches.reverse()
+        batch_results = [None] * len(batches)  # type: List[Optional[List[dict]]]
+
+        async def worker(queue: List[Tuple[int, List[dict]]]) -> None:
+            while queue:
+                idx, work_package = queue.pop()
+                batch_results[idx] = await self._predict_batch(
+                    model_name, work_package, top_n, retry
+                )
+
+        await asyncio.gather(
+            *(worker(batches) for _ in range(min(concurrency, len(batches))))
+        )
+
+        results = []  # type: List[Optional[dict]]
+        for predictions in batch_results:
+            results.extend(predictions or [])
+        return results
+
+    async def _predict_batch(
+        self, model_name: str, work_package: List[dict], top_n: int, retry: bool
+    ) -> List[dict]:
+        try:
+            response = await self.create_inference_request(
+                model_name, work_package, top_n=top_n, retry=retry
+            )
+            return response["predictions"]
+        except (DARHTTPException, httpx.HTTPError, ValueError) as exc:
+            # ValueError: the response body is not valid JSON
+            return self._failed_batch_predictions(work_package, exc)
+
+    async def aclose(self) -> None:
+        """
+        Closes all connections held by this client.
+
+        :return: None
+        """
+        await self.session.aclose()
+
+    async def __aenter__(self) -> "AsyncInferenceClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
@@ -0,0 +1,681 @@
+"""
+Bulk inference which streams objects through a bounded window of requests.
+
+:class:`BaseBulkInferenceClient` implements the streaming, multi-process and
+resumable bulk inference methods of
+:class:`~sap.aibus.dar.client.inference_client.InferenceClient`.
+"""
+import functools
+import os
+import pickle  # nosec
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from sap.aibus.dar.client.base_client import BaseClientWithSession
+from sap.aibus.dar.client.exceptions import InvalidWorkerCount
+from sap.aibus.dar.client.inference_constants import LIMIT_OBJECTS_PER_CALL, TOP_N
+from sap.aibus.dar.client.inference_journal import BulkInferenceJournal
+from sap.aibus.dar.client.util.batching import InferenceBatch, InferenceBatchPlanner
+from sap.aibus.dar.client.util.concurrency import AdaptiveConcurrencyLimit
+from sap.aibus.dar.client.util.credentials import CredentialsSource
+from sap.aibus.dar.client.util.lists import split_iterable
+from sap.aibus.dar.client.util.rate_limiting import RateLimiter
+
+#: How many inference requests may be submitted per worker before the oldest
+#: result is consumed during bulk inference
+IN_FLIGHT_BATCHES_PER_WORKER = 2
+
+#: How many inference requests per worker thread are made for a single shard of
+#: objects in multi-process bulk inference
+REQUESTS_PER_SHARD = 4
+
+#: A batch of objects sent in a single inference request
+Batch = Union[List[dict], InferenceBatch]
+
+# pylint: disable=too-many-arguments
+
+
+class BaseBulkInferenceClient(BaseClientWithSession):
+    """
+    Base class of :class:`~sap.aibus.dar.client.inference_client.InferenceClient`
+    with the bulk inference methods which consume *objects* lazily.
+
+    Subclasses send the individual inference requests by implementing
+    :meth:`_predict_batch`.
+
+    .. versionadded:: 0.16.0
+    """
+
+    #: Optional: limits the number of objects sent per second
+    object_rate_limiter = None  # type: Optional[RateLimiter]
+
+    def do_streaming_bulk_inference(
+        self,
+        model_name: str,
+        objects: Iterable[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+        worker_count: int = 4,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        max_payload_bytes: Optional[int] = None,
+    ) -> Iterator[dict]:
+        """
+        Performs bulk inference and yields predictions as they become available.
+
+        This is a streaming variant of :meth:`do_bulk_inference`. The *objects* can be
+        any iterable, including a generator reading from a file or a database cursor.
+        Objects are consumed lazily in batches of *LIMIT_OBJECTS_PER_CALL*, and the
+        ObjectPrediction dictionaries of each batch are yielded in input order as soon
+        as the batch and all batches before it have finished.
+
+        At most *IN_FLIGHT_BATCHES_PER_WORKER* times *worker_count* batches are
+        submitted ahead of the consumer. Peak memory usage therefore depends on the
+        *worker_count* instead of on the number of *objects*.
+
+        Errors are handled like in :meth:`do_bulk_inference`: if an inference request
+        fails, a placeholder prediction with `labels` set to `None` and an `_sdk_error`
+        key is yielded for each object of the failed request.
+
+        .. versionadded:: 0.16.0
+
+        Example usage:
+
+        .. code-block:: python
+
+            def read_objects():
+                for line in open("objects.jsonl"):
+                    yield json.loads(line)
+
+            predictions = client.do_streaming_bulk_inference(
+                "my-model", read_objects()
+            )
+            for prediction in predictions:
+                print(prediction["objectId"], prediction["labels"])
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param worker_count: maximum number of concurrent requests. Ignored if
+            *concurrency_limit* is given.
+        :param concurrency_limit: Optional: adaptive limit for concurrent requests,
+            see :meth:`do_bulk_inference`
+        :param max_payload_bytes: Optional: maximum size of a request body in bytes,
+            see :meth:`do_bulk_inference`
+        :raises: InvalidWorkerCount if worker_count param is incorrect
+        :return: a generator of ObjectPrediction dictionaries
+        """
+        # Validate eagerly: a generator would only do so on the first iteration.
+        self._validate_worker_count(worker_count)
+
+        batch_predictions = self._iter_batch_predictions(
+            model_name,
+            plan_batches(objects, top_n, max_payload_bytes, split_iterable),
+            top_n=top_n,
+            retry=retry,
+            worker_count=worker_count,
+            concurrency_limit=concurrency_limit,
+        )
+        return (
+            prediction
+            for predictions in batch_predictions
+            for prediction in predictions
+        )
+
+    def do_unordered_bulk_inference(
+        self,
+        model_name: str,
+        objects: Iterable[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+        worker_count: int = 4,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        max_payload_bytes: Optional[int] = None,
+    ) -> Iterator[Tuple[range, List[dict]]]:
+        """
+        Performs bulk inference and yields the predictions of each batch as soon as
+        the batch completes.
+
+        Unlike :meth:`do_streaming_bulk_inference`, a slow batch does not hold back
+        batches which were submitted later but finished earlier. Each yielded item
+        is a tuple of the index range of the batch within *objects* and the
+        ObjectPrediction dictionaries for the objects in this range:
+
+        .. code-block:: python
+
+            for index_range, predictions in client.do_unordered_bulk_inference(
+                "my-model", objects
+            ):
+                for idx, prediction in zip(index_range, predictions):
+                    store(idx, prediction)
+
+        Otherwise, this method behaves like :meth:`do_streaming_bulk_inference`:
+        *objects* are consumed lazily, the number of batches in flight is bounded
+        and failed requests result in placeholder predictions.
+
+        .. versionadded:: 0.16.0
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param worker_count: maximum number of concurrent requests. Ignored if
+            *concurrency_limit* is given.
+        :param concurrency_limit: Optional: adaptive limit for concurrent requests,
+            see :meth:`do_bulk_inference`
+        :param max_payload_bytes: Optional: maximum size of a request body in bytes,
+            see :meth:`do_bulk_inference`
+        :raises: InvalidWorkerCount if worker_count param is incorrect
+        :return: a generator of (index range, predictions) tuples in order of
+            completion
+        """
+        self._validate_worker_count(worker_count)
+
+        return self._iter_batch_predictions(
+            model_name,
+            plan_batches(objects, top_n, max_payload_bytes, split_iterable),
+            top_n=top_n,
+            retry=retry,
+            worker_count=worker_count,
+            concurrency_limit=concurrency_limit,
+            ordered=False,
+        )
+
+    def do_multiprocess_bulk_inference(
+        self,
+        model_name: str,
+        objects: Iterable[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+        process_count: Optional[int] = None,
+        worker_count: int = 1,
+        preprocess: Optional[Callable[[dict], dict]] = None,
+        postprocess: Optional[Callable[[dict], Any]] = None,
+        max_payload_bytes: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """
+        Performs bulk inference with a pool of worker processes.
+
+        The thread pool of :meth:`do_streaming_bulk_inference` is sufficient to
+        keep the service busy as long as little work is done on the client side.
+        If each object is prepared with CPU-intensive code, or each prediction is
+        converted before it is stored, the threads contend for the global
+        interpreter lock instead. This method runs such code in parallel on
+        several CPU cores.
+
+        The *objects* are consumed lazily and sent to the worker processes in
+        shards of *REQUESTS_PER_SHARD* times *worker_count* requests. Each worker
+        process applies *preprocess* to each object of a shard, runs
+        :meth:`do_bulk_inference` with *worker_count* threads and applies
+        *postprocess* to each ObjectPrediction dictionary. Only the return values
+        of *postprocess* are sent back to this process, so returning a compact
+        value such as a tuple reduces the overhead of inter-process
+        communication. The results are yielded in input order.
+
+        Each worker process owns its own :class:`DARSession`. The access token is
+        obtained from the *credentials_source* of this client whenever a shard is
+        submitted and forwarded to the worker process together with the shard,
+        so that tokens are only fetched once and renewed tokens reach all
+        workers.
+
+        The rate limiters of this client and its session are passed on to the
+        worker processes. As the workers need to share a single limit, only
+        rate limiters which can be pickled, such as
+        :class:`~sap.aibus.dar.client.util.rate_limiting.SqliteTokenBucket`, are
+        supported.
+
+        Example usage:
+
+        .. code-block:: python
+
+            def normalize(inference_object):
+                ...
+                return inference_object
+
+            def flatten(prediction):
+                label = prediction["labels"][0] if prediction["labels"] else None
+                return prediction["objectId"], label and label["results"][0]["value"]
+
+            for object_id, value in client.do_multiprocess_bulk_inference(
+                "my-model", objects, preprocess=normalize, postprocess=flatten
+            ):
+                store(object_id, value)
+
+        Errors are handled like in :meth:`do_bulk_inference`: *postprocess* also
+        receives the placeholder predictions of failed requests. An exception
+        raised by *preprocess* or *postprocess* is re-raised by this method.
+
+        .. note::
+
+            *preprocess* and *postprocess* are sent to the worker processes and
+            must therefore be picklable: use functions defined at the top level of
+            a module, not lambdas or nested functions. On platforms which start
+            worker processes with *spawn*, such as Windows and macOS, the calling
+            code must be guarded by ``if __name__ == "__main__":``.
+
+        Up to *process_count* times *worker_count* requests are made concurrently.
+
+        .. versionadded:: 0.16.0
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param process_count: number of worker processes. Defaults to the number
+            of CPUs.
+        :param worker_count: number of concurrent requests per worker process.
+            Default: 1
+        :param preprocess: Optional: function applied to each object before it is
+            sent to the service
+        :param postprocess: Optional: function applied to each ObjectPrediction
+            dictionary
+        :param max_payload_bytes: Optional: maximum size of a request body in bytes,
+            see :meth:`do_bulk_inference`
+        :raises: InvalidWorkerCount if worker_count param is incorrect
+        :raises: ValueError if process_count is not positive or a hook or rate
+            limiter cannot be pickled
+        :return: a generator of ObjectPrediction dictionaries or of the return
+            values of *postprocess*
+        """
+        self._validate_worker_count(worker_count)
+        if process_count is None:
+            process_count = os.cpu_count() or 1
+        if process_count < 1:
+            raise ValueError("process_count must be > 0, not {}".format(process_count))
+
+        settings = _ShardSettings(
+            client_class=type(self),
+            base_url=self.session.base_url,
+            compress_requests=self.session.compress_requests,
+            compression_threshold=self.session.compression_threshold,
+            request_rate_limiter=self.session.rate_limiter,
+            object_rate_limiter=self.object_rate_limiter,
+            model_name=model_name,
+            top_n=top_n,
+            retry=retry,
+            worker_count=worker_count,
+            max_payload_bytes=max_payload_bytes,
+            preprocess=preprocess,
+            postprocess=postprocess,
+        )
+        _check_shard_settings(settings)
+        shard_results = _run_windowed(
+            functools.partial(_predict_shard, settings),
+            self._iter_shards(objects, worker_count),
+            worker_count=process_count,
+            window_size=process_count * IN_FLIGHT_BATCHES_PER_WORKER,
+            executor_factory=ProcessPoolExecutor,
+        )
+        return (result for results in shard_results for result in results)
+
+    def _iter_shards(
+        self, objects: Iterable[dict], worker_count: int
+    ) -> Iterator[Tuple[str, List[dict]]]:
+        """
+        Splits *objects* into the shards sent to the worker processes, each along
+        with the current access token.
+        """
+        shard_size = LIMIT_OBJECTS_PER_CALL * worker_count * REQUESTS_PER_SHARD
+        for shard in split_iterable(objects, shard_size):
+            yield self.credentials_source.token(), shard
+
+    def do_resumable_bulk_inference(
+        self,
+        model_name: str,
+        objects: Iterable[dict],
+        journal_path: str,
+        top_n: int = TOP_N,
+        retry: bool = True,
+        worker_count: int = 4,
+    ) -> List[dict]:
+        """
+        Performs bulk inference which can be resumed after an interruption.
+
+        This behaves like :meth:`do_bulk_inference`, but records the predictions of
+        each successful batch in a journal file at *journal_path*; see
+        :class:`~sap.aibus.dar.client.inference_journal.BulkInferenceJournal`.
+        If the process is interrupted, calling this method again with the same
+        *objects* and *journal_path* only sends the batches which are not yet
+        recorded in the journal.
+
+        Batches which failed are not recorded and are sent again on the next call.
+        The journal is not deleted once all batches have completed: it can be used
+        to read the results again later. Delete the file to start from scratch.
+
+        .. versionadded:: 0.16.0
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param journal_path: file name of the journal
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param worker_count: maximum number of concurrent requests
+        :raises: InvalidWorkerCount if worker_count param is incorrect
+        :raises: JournalMismatch if the journal was written for another model
+            or *top_n*
+        :return: the aggregated ObjectPrediction dictionaries
+        """
+        self._validate_worker_count(worker_count)
+
+        with BulkInferenceJournal(journal_path, model_name, top_n) as journal:
+            batch_results, missing = _lookup_batches(journal, objects)
+            self.log.info(
+                "Found %s of %s batches in journal '%s'",
+                len(batch_results) - len(missing),
+                len(batch_results),
+                journal_path,
+            )
+
+            batch_predictions = self._iter_batch_predictions(
+                model_name,
+                (batch for _, _, batch in missing),
+                top_n=top_n,
+                retry=retry,
+                worker_count=worker_count,
+            )
+            for (batch_index, fingerprint, _), predictions in zip(
+                missing, batch_predictions
+            ):
+                if not is_failed(predictions):
+                    journal.record(batch_index, fingerprint, predictions)
+                batch_results[batch_index] = predictions
+
+        return [
+            prediction
+            for predictions in batch_results
+            for prediction in predictions or []
+        ]
+
+    @staticmethod
+    def _validate_worker_count(worker_count: int) -> None:
+        if worker_count is None:
+            raise InvalidWorkerCount("worker_count cannot be None!")
+
+        if worker_count > 4:
+            msg = "worker_count too high: %s. Up to 4 allowed." % worker_count
+            raise InvalidWorkerCount(msg)
+
+        if worker_count <= 0:
+            msg = "worker_count must be greater than 0!"
+            raise InvalidWorkerCount(msg)
+
+    def _iter_batch_predictions(
+        self,
+        model_name: str,
+        batches: Iterable[Batch],
+        top_n: int,
+        retry: bool,
+        worker_count: int,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        ordered: bool = True,
+    ) -> Iterator:
+        """
+        Runs inference for each batch and yields the predictions in input order.
+
+        Batches are submitted to a thread pool, but no more than
+        *IN_FLIGHT_BATCHES_PER_WORKER* times *worker_count* batches are pending at
+        any time. With a *concurrency_limit*, the thread pool is sized to its
+        ceiling and the limit decides how many requests actually run concurrently.
+        The connection pool of the session is enlarged to the size of the thread
+        pool, so that each thread can keep its connection open.
+
+        If *ordered* is False, (index range, predictions) tuples are yielded in
+        order of completion instead.
+        """
+        if concurrency_limit is not None:
+            worker_count = concurrency_limit.max_limit
+        self.session.ensure_pool_size(worker_count)
+
+        def predict_call(work_package: Batch) -> List[dict]:
+            return self._predict_batch(
+                model_name, work_package, top_n, retry, concurrency_limit
+            )
+
+        window_size = worker_count * IN_FLIGHT_BATCHES_PER_WORKER
+        if ordered:
+            return _run_windowed(
+                predict_call,
+                batches,
+                worker_count=worker_count,
+                window_size=window_size,
+            )
+        return _run_as_completed(
+            predict_call,
+            batches,
+            worker_count=worker_count,
+            window_size=window_size,
+        )
+
+    def _predict_batch(
+        self,
+        model_name: str,
+        work_package: Batch,
+        top_n: int,
+        retry: bool,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+    ) -> List[dict]:
+        """
+        Runs inference for a single batch. Returns placeholder predictions
+        instead of raising if the request fails.
+        """
+        raise NotImplementedError
+
+
+def plan_batches(
+    objects: Iterable[dict],
+    top_n: int,
+    max_payload_bytes: Optional[int],
+    split: Callable[[Any, int], Iterator[List[dict]]],
+) -> Iterable[Batch]:
+    """
+    Splits *objects* into the batches sent to the service.
+
+    Without *max_payload_bytes*, the objects are split by count using *split*.
+    """
+    if max_payload_bytes is None:
+        return split(objects, LIMIT_OBJECTS_PER_CALL)
+    planner = InferenceBatchPlanner(LIMIT_OBJECTS_PER_CALL, max_payload_bytes)
+    return planner.plan(objects, top_n)
+
+
+def _check_picklable(value: Any, hint: str) -> None:
+    try:
+        pickle.dumps(value)
+    except (pickle.PicklingError, AttributeError, TypeError) as exc:
+        raise ValueError(
+            "{!r} cannot be sent to a worker process: {}".format(value, hint)
+        ) from exc
+
+
+class _ShardSettings(NamedTuple):
+    """
+    Everything a worker process needs to know to process a shard, except for the
+    access token.
+    """
+
+    client_class: Type[BaseBulkInferenceClient]
+    base_url: str
+    compress_requests: bool
+    compression_threshold: int
+    request_rate_limiter: Optional[RateLimiter]
+    object_rate_limiter: Optional[RateLimiter]
+    model_name: str
+    top_n: int
+    retry: bool
+    worker_count: int
+    max_payload_bytes: Optional[int]
+    preprocess: Optional[Callable[[dict], dict]]
+    postprocess: Optional[Callable[[dict], Any]]
+
+
+def _check_shard_settings(settings: _ShardSettings) -> None:
+    """
+    Raises a ValueError if the hooks or rate limiters cannot be sent to a worker
+    process.
+    """
+    for hook in (settings.preprocess, settings.postprocess):
+        _check_picklable(hook, "use a function defined at the top level of a module")
+    for rate_limiter in (settings.request_rate_limiter, settings.object_rate_limiter):
+        _check_picklable(rate_limiter, "use a SqliteTokenBucket")
+
+
+class _ForwardedCredentialsSource(CredentialsSource):
+    """
+    Holds the access token last forwarded to a worker process.
+    """
+
+    def __init__(self) -> None:
+        self.current_token = None  # type: Optional[str]
+
+    def token(self) -> str:
+        if self.current_token is None:
+            raise RuntimeError("No access token has been forwarded to this process")
+        return self.current_token
+
+
+_WorkerClient = Tuple[BaseBulkInferenceClient, _ForwardedCredentialsSource]
+
+#: Clients owned by this process if it is a worker process of
+#: :meth:`BaseBulkInferenceClient.do_multiprocess_bulk_inference`, by client
+#: class and session settings
+_worker_clients = {}  # type: Dict[Tuple[type, str, bool, int], _WorkerClient]
+
+
+def _predict_shard(settings: _ShardSettings, work: Tuple[str, List[dict]]) -> list:
+    """
+    Runs in a worker process: classifies a shard of objects.
+    """
+    token, objects = work
+    key = (
+        settings.client_class,
+        settings.base_url,
+        settings.compress_requests,
+        settings.compression_threshold,
+    )
+    if key not in _worker_clients:
+        source = _ForwardedCredentialsSource()
+        client = settings.client_class(settings.base_url, source)
+        client.session.compress_requests = settings.compress_requests
+        client.session.compression_threshold = settings.compression_threshold
+        _worker_clients[key] = (client, source)
+    client, source = _worker_clients[key]
+    source.current_token = token
+    client.session.rate_limiter = settings.request_rate_limiter
+    client.object_rate_limiter = settings.object_rate_limiter
+
+    if settings.preprocess is not None:
+        objects = [
+            settings.preprocess(inference_object) for inference_object in objects
+        ]
+    predictions = list(
+        client.do_streaming_bulk_inference(
+            settings.model_name,
+            objects,
+            top_n=settings.top_n,
+            retry=settings.retry,
+            worker_count=settings.worker_count,
+            max_payload_bytes=settings.max_payload_bytes,
+        )
+    )
+    if settings.postprocess is None:
+        return predictions
+    return [settings.postprocess(prediction) for prediction in predictions]
+
+
+def is_failed(predictions: List[dict]) -> bool:
+    """
+    Returns whether *predictions* contain placeholders for a failed request.
+    """
+    return any("_sdk_error" in prediction for prediction in predictions)
+
+
+def _lookup_batches(
+    journal: BulkInferenceJournal, objects: Iterable[dict]
+) -> Tuple[List[Optional[List[dict]]], List[Tuple[int, str, List[dict]]]]:
+    """
+    Splits *objects* into batches and looks them up in *journal*.
+
+    Returns the recorded predictions for each batch, or None if the batch is not
+    recorded, and the index, fingerprint and objects of the batches which are not.
+    """
+    batch_results = []  # type: List[Optional[List[dict]]]
+    missing = []  # type: List[Tuple[int, str, List[dict]]]
+    for batch_index, batch in enumerate(
+        split_iterable(objects, LIMIT_OBJECTS_PER_CALL)
+    ):
+        fingerprint = journal.fingerprint(batch)
+        recorded = journal.get(batch_index, fingerprint)
+        if recorded is None:
+            missing.append((batch_index, fingerprint, batch))
+        batch_results.append(recorded)
+    return batch_results, missing
+
+
+def _run_windowed(
+    func: Callable[[Any], List[Any]],
+    batches: Iterable[Any],
+    worker_count: int,
+    window_size: int,
+    executor_factory: Callable[..., Executor] = ThreadPoolExecutor,
+) -> Iterator[List[Any]]:
+    pending = deque()  # type: deque
+    with executor_factory(max_workers=worker_count) as pool:
+        try:
+            for batch in batches:
+                pending.append(pool.submit(func, batch))
+                if len(pending) >= window_size:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # Only relevant if the consumer stops early: do not send requests
+            # for batches which have not been started yet.
+            for future in pending:
+                future.cancel()
+
+
+def _run_as_completed(
+    func: Callable[[Batch], List[dict]],
+    batches: Iterable[Batch],
+    worker_count: int,
+    window_size: int,
+) -> Iterator[Tuple[range, List[dict]]]:
+    pending = {}  # type: Dict[Future, range]
+    offset = 0
+    with ThreadPoolExecutor(max_workers=worker_count) as pool:
+        try:
+            for batch in batches:
+                index_range = range(offset, offset + len(batch))
+                offset = index_range.stop
+                pending[pool.submit(func, batch)] = index_range
+                if len(pending) >= window_size:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future.result()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -2,18 +2,39 @@
 This module contains the HTTP Transport layer used to interact with the DAR
 service.
 """
+import gzip
+import tempfile
 import typing
+import zlib
+from urllib.parse import urlsplit
 
 import requests
-from requests import Response
+from requests import RequestException, Response
 
-from sap.aibus.dar.client.exceptions import DARHTTPException
+from sap.aibus.dar.client.exceptions import CircuitBreakerOpen, DARHTTPException
+from sap.aibus.dar.client.util.circuit_breaker import CircuitBreakerRegistry
+from sap.aibus.dar.client.util import json_codec
 from sap.aibus.dar.client.util.credentials import CredentialsSource
 from sap.aibus.dar.client.util.http_transport import (
+    DEFAULT_POOL_SIZE,
+    RetryBudget,
     TimeoutRetrySession,
     TimeoutPostRetrySession,
-    enforce_https_except_localhost,
+    normalize_base_url,
 )
+from sap.aibus.dar.client.util.rate_limiting import RateLimiter
+
+#: Minimum size in bytes of a JSON request body to be compressed by default
+DEFAULT_COMPRESSION_THRESHOLD = 16 * 1024
+
+#: gzip compression level for request bodies, trading CPU time for size
+COMPRESSION_LEVEL = 6
+
+#: Size of the chunks read from a data stream when compressing it
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# The token the headers were built for, and the headers
+_HeaderCache = typing.Tuple[typing.Optional[str], typing.Dict[str, str]]
 
 
 class DARSession:
@@ -34,9 +55,70 @@ class DARSession:
     :py:class:`requests.RequestException`.
 
     This class internally uses :py:class:`TimeoutRetrySession`.
+
+    If *compress_requests* is enabled, request bodies are sent with
+    `Content-Encoding: gzip`. JSON bodies are only compressed if they are at least
+    *compression_threshold* bytes long. Data streams sent with
+    :meth:`post_data_to_endpoint` are compressed into a temporary file.
+    If the service rejects compressed requests for an endpoint, compression can be
+    switched off for this endpoint with :meth:`disable_compression`.
+
+    .. versionadded:: 0.16.0
+        The *compress_requests* and *compression_threshold* parameters.
+
+    If a *rate_limiter* is given, each request takes one unit from it before it is
+    sent, and waits if the rate limit is exhausted. Retries performed by the
+    underlying :py:class:`TimeoutRetrySession` are not counted. See
+    :mod:`~sap.aibus.dar.client.util.rate_limiting`.
+
+    .. versionadded:: 0.16.0
+        The *rate_limiter* parameter.
+
+    If a *retry_budget* is given, it is shared by all requests of the session and
+    limits the share of requests which are retried, see
+    :class:`~sap.aibus.dar.client.util.http_transport.RetryBudget`.
+
+    .. versionadded:: 0.16.0
+        The *retry_budget* parameter.
+
+    If *circuit_breakers* are given, requests to an endpoint family whose circuit
+    breaker is open are not sent, and :exc:`CircuitBreakerOpen` is raised
+    immediately. Connection errors, timeouts and responses with status code 429 or
+    5xx count as failures. See
+    :class:`~sap.aibus.dar.client.util.circuit_breaker.CircuitBreaker`.
+
+    .. versionadded:: 0.16.0
+        The *circuit_breakers* parameter.
+
+    Connections are kept open and reused. *pool_maxsize* connections per host are
+    kept open; it should be at least the number of concurrent requests; the bulk
+    inference methods of
+    :class:`~sap.aibus.dar.client.inference_client.InferenceClient` enlarge the
+    pool to their level of concurrency with :meth:`ensure_pool_size`. See
+    :class:`~sap.aibus.dar.client.util.http_transport.RetrySession` for
+    *pool_connections*, *pool_block* and *keep_alive*.
+
+    .. versionadded:: 0.16.0
+        The *pool_connections*, *pool_maxsize*, *pool_block* and *keep_alive*
+        parameters.
     """
 
-    def __init__(self, base_url: str, credentials_source: CredentialsSource):
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+
+    def __init__(
+        self,
+        base_url: str,
+        credentials_source: CredentialsSource,
+        compress_requests: bool = False,
+        compression_threshold: int = DEFAULT_COMPRESSION_THRESHOLD,
+        rate_limiter: typing.Optional[RateLimiter] = None,
+        retry_budget: typing.Optional[RetryBudget] = None,
+        circuit_breakers: typing.Optional[CircuitBreakerRegistry] = None,
+        pool_connections: int = DEFAULT_POOL_SIZE,
+        pool_maxsize: int = DEFAULT_POOL_SIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True,
+    ):
         """
         Constructor.
 
@@ -52,22 +134,85 @@ class DARSession:
 
         :param base_url: Base URL of the service.
         :param credentials_source: :py:class:`CredentialsSource` used for authentication
+        :param compress_requests: whether to compress request bodies with gzip.
+            Defaults to False.
+        :param compression_threshold: minimum size in bytes of a JSON request body
+            to be compressed
+        :param rate_limiter: Optional: limits the number of requests per second
+        :param retry_budget: Optional: limits the share of retried requests
+        :param circuit_breakers: Optional: circuit breakers per endpoint family
+        :param pool_connections: number of hosts for which connections are kept open
+        :param pool_maxsize: number of connections kept open per host
+        :param pool_block: whether to wait for a free connection if *pool_maxsize*
+            connections to a host are in use
+        :param keep_alive: whether to reuse connections for subsequent requests
         """
-        if base_url[-1] == "/":
-            # Normalize base url.
-            base_url = base_url[:-1]
-        enforce_https_except_localhost(base_url)
-        self.base_url = base_url
+        self.base_url = normalize_base_url(base_url)
         self.credentials_source = credentials_source
-        self.http = TimeoutRetrySession()
-        self.http_post_retry = TimeoutPostRetrySession()
+        http_kwargs = {
+            "retry_budget": retry_budget,
+            "pool_connections": pool_connections,
+            "pool_maxsize": pool_maxsize,
+            "pool_block": pool_block,
+            "keep_alive": keep_alive,
+        }  # type: typing.Dict[str, typing.Any]
+        self.http = TimeoutRetrySession(**http_kwargs)
+        self.http_post_retry = TimeoutPostRetrySession(**http_kwargs)
+        self.compress_requests = compress_requests
+        self.compression_threshold = compression_threshold
+        self.uncompressed_endpoints = set()  # type: typing.Set[str]
+        self.rate_limiter = rate_limiter
+        self.circuit_breakers = circuit_breakers
+        self._header_cache = (None, {})  # type: _HeaderCache
+
+    def disable_compression(self, endpoint: str) -> None:
+        """
+        Switches off request compression for an endpoint.
+
+        Compression is switched off for all URLs whose path starts with
+        **endpoint**.
+
+        .. versionadded:: 0.16.0
+
+        :param endpoint: Path component of URL, or a prefix thereof
+        :return: None
+        """
+        self.uncompressed_endpoints.add(endpoint)
 
-    def _get_headers(self):
-        return {
-            "Authorization": "Bearer " + self.credentials_source.token(),
-            "User-Agent": "DAR-SDK requests/" + _get_requests_version(),
-            "Accept": "application/json;q=0.9,text/plain",
-        }
+    def ensure_pool_size(self, pool_maxsize: int) -> None:
+        """
+        Enlarges the connection pools to keep at least *pool_maxsize* connections
+        per host open.
+
+        Call this before sending *pool_maxsize* concurrent requests. Does nothing
+        if the pools are already large enough.
+
+        .. versionadded:: 0.16.0
+
+        :param pool_maxsize: number of connections kept open per host
+        :return: None
+        """
+        self.http.ensure_pool_size(pool_maxsize)
+        self.http_post_retry.ensure_pool_size(pool_maxsize)
+
+    def _wait_for_rate_limit(self) -> None:
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def _get_headers(self) -> typing.Dict[str, str]:
+        # The token is fetched for every request because the credentials source
+        # may refresh it, but the headers are only rebuilt if it changed. Callers
+        # receive a copy which they may modify.
+        token = self.credentials_source.token()
+        cached_token, headers = self._header_cache
+        if token != cached_token:
+            headers = {
+                "Authorization": "Bearer " + token,
+                "User-Agent": "DAR-SDK requests/" + _get_requests_version(),
+                "Accept": "application/json;q=0.9,text/plain",
+            }
+            self._header_cache = (token, headers)
+        return headers.copy()
 
     def get_from_endpoint(self, endpoint: str) -> Response:
         """
@@ -80,10 +225,7 @@ class DARSession:
         """
         url = self.base_url + endpoint
 
-        response = self.http.get(url, headers=self._get_headers())
-        self._check_status_code(response, url)
-
-        return response
+        return self._send(self.http.get, url, headers=self._get_headers())
 
     def delete_from_endpoint(self, endpoint: str) -> Response:
         """
@@ -95,9 +237,7 @@ class DARSession:
         :raise: RequestException
         """
         url = self.base_url + endpoint
-        response = self.http.delete(url, headers=self._get_headers())
-        self._check_status_code(response, url)
-        return response
+        return self._send(self.http.delete, url, headers=self._get_headers())
 
     @staticmethod
     def _check_status_code(response, url):
@@ -111,7 +251,8 @@ class DARSession:
         Performs **POST** request against **endpoint**.
 
         The given **payload** is encoded as JSON and sent as the body
-        of the request.
+        of the request. If a fast JSON library is installed, it is used to encode
+        the payload; see :mod:`~sap.aibus.dar.client.util.json_codec`.
 
         If **retry** is True, the request will be retried in case of errors. This
         includes HTTP error status codes in the response returned by the remote
@@ -130,12 +271,29 @@ class DARSession:
         :raise: RequestException
         """
         url = self.base_url + endpoint
-        connection = self.http
-        if retry:
-            connection = self.http_post_retry
-        response = connection.post(url, headers=self._get_headers(), json=payload)
-        self._check_status_code(response, url)
-        return response
+        return self._post_json(url, payload, retry)
+
+    def post_json_to_endpoint(
+        self, endpoint: str, data: bytes, retry: bool = False
+    ) -> Response:
+        """
+        Performs **POST** request with an already encoded JSON body against
+        **endpoint**.
+
+        This is equivalent to :meth:`post_to_endpoint`, but avoids encoding the
+        payload again if the caller already has its JSON encoding.
+
+        .. versionadded:: 0.16.0
+
+        :param endpoint: Path component of URL
+        :param data: Body of the request as UTF-8 encoded JSON.
+        :param retry: whether to retry on failed requests. Defaults to False.
+        :return: :py:class:`requests.Response`
+        :raise: DARHTTPException
+        :raise: RequestException
+        """
+        url = self.base_url + endpoint
+        return self._post_encoded_json(url, data, retry)
 
     def post_data_to_endpoint(
         self, endpoint: str, data_stream: typing.BinaryIO
@@ -147,6 +305,10 @@ class DARSession:
         or a compatible object. Effectively, the **data_stream** should have a
         **read()** method which returns `byte`, not `str`.
 
+        If request compression is enabled, the stream is compressed into a temporary
+        file before the request is sent. Unlike a body compressed while it is sent,
+        the file can be sent again if the request is retried.
+
         :param endpoint: Path component of URL
         :param data_stream: data to be uploaded as a file-like object
         :return: :py:class:`requests.Response`
@@ -154,9 +316,14 @@ class DARSession:
         :raise: RequestException
         """
         url = self.base_url + endpoint
-        response = self.http.post(url, headers=self._get_headers(), data=data_stream)
-        self._check_status_code(response, url)
-        return response
+        headers = self._get_headers()
+        if not self._compression_enabled(url):
+            return self._send(self.http.post, url, headers=headers, data=data_stream)
+        headers["Content-Encoding"] = "gzip"
+        with tempfile.TemporaryFile() as compressed:
+            _compress_stream(data_stream, compressed)
+            compressed.seek(0)
+            return self._send(self.http.post, url, headers=headers, data=compressed)
 
     def post_to_url(self, url: str, payload: dict, retry: bool = False) -> Response:
         """
@@ -166,13 +333,76 @@ class DARSession:
         :param payload: request body
         :param retry: enables retrying a failed request
         """
-        connection = self.http
-        if retry:
-            connection = self.http_post_retry
-        response = connection.post(url, headers=self._get_headers(), json=payload)
+        return self._post_json(url, payload, retry)
+
+    def _post_json(self, url: str, payload: dict, retry: bool) -> Response:
+        if json_codec.is_fast() or self._compression_enabled(url):
+            return self._post_encoded_json(url, json_codec.dumps(payload), retry)
+        connection = self.http_post_retry if retry else self.http
+        return self._send(
+            connection.post, url, headers=self._get_headers(), json=payload
+        )
+
+    def _post_encoded_json(self, url: str, data: bytes, retry: bool) -> Response:
+        connection = self.http_post_retry if retry else self.http
+        headers = self._get_headers()
+        headers["Content-Type"] = "application/json"
+        if self._compression_enabled(url) and len(data) >= self.compression_threshold:
+            data = gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+            headers["Content-Encoding"] = "gzip"
+        return self._send(connection.post, url, headers=headers, data=data)
+
+    def _send(
+        self, method: typing.Callable[..., Response], url: str, **kwargs
+    ) -> Response:
+        breaker = None
+        if self.circuit_breakers is not None:
+            breaker = self.circuit_breakers.get(url)
+            if not breaker.allow_request():
+                raise CircuitBreakerOpen(url, breaker.remaining_open_time())
+        self._wait_for_rate_limit()
+        try:
+            response = method(url, **kwargs)
+        except RequestException:
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        except BaseException:
+            if breaker is not None:
+                breaker.release()
+            raise
+        if breaker is not None:
+            if _is_service_failure(response.status_code):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
         self._check_status_code(response, url)
         return response
 
+    def _compression_enabled(self, url: str) -> bool:
+        if not self.compress_requests:
+            return False
+        path = urlsplit(url).path
+        return not any(
+            path.startswith(urlsplit(self.base_url + endpoint).path)
+            for endpoint in self.uncompressed_endpoints
+        )
+
+
+def _is_service_failure(status_code: int) -> bool:
+    return status_code == 429 or status_code >= 500
+
+
+def _compress_stream(data_stream: typing.BinaryIO, target: typing.IO[bytes]) -> None:
+    # wbits=31 produces the gzip format
+    compressor = zlib.compressobj(COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+    while True:
+        chunk = data_stream.read(STREAM_CHUNK_SIZE)
+        if not chunk:
+            break
+        target.write(compressor.compress(chunk))
+    target.write(compressor.flush())
+
 
 def _get_requests_version():
     requests_version = None
@@ -131,6 +131,67 @@ class InvalidWorkerCount(DARException):
     """
 
 
+class JournalMismatch(DARException):
+    """
+    A bulk inference journal belongs to a different job.
+
+    .. versionadded:: 0.16.0
+    """
+
+
+class CircuitBreakerOpen(DARException):
+    """
+    A request was not sent because the circuit breaker for its endpoint is open.
+
+    See :class:`~sap.aibus.dar.client.util.circuit_breaker.CircuitBreaker`.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, url: str, retry_after: float):
+        """
+        Constructor.
+
+        :param url: URL of the request which was not sent
+        :param retry_after: seconds until probe requests will be sent again
+        """
+        msg = "Circuit breaker is open for '%s'. Retry in %.1f seconds." % (
+            url,
+            retry_after,
+        )
+        super().__init__(msg)
+        self.url = url
+        self.retry_after = retry_after
+
+
+class DownloadVerificationFailed(DARException):
+    """
+    A downloaded file does not have the expected size or checksum.
+
+    The partially downloaded file is deleted, so that the next attempt starts
+    from scratch.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, url: str, local_path: str, reason: str):
+        """
+        Constructor.
+
+        :param url: URL of the download
+        :param local_path: path the file was downloaded to
+        :param reason: description of the mismatch
+        """
+        msg = "Download of '%s' to '%s' failed verification: %s" % (
+            url,
+            local_path,
+            reason,
+        )
+        super().__init__(msg)
+        self.url = url
+        self.local_path = local_path
+
+
 class ModelAlreadyExists(DARException):
     """
     Model already exists and must be deleted first.
@@ -231,7 +292,10 @@ class DARHTTPException(DARException):
         # request's Response.raise_for_status implementation indicates
         # that the Response.reason can be a bytes object, so we attempt
         # to decode similar to Response.raise_for_status.
-        reason = self.response.reason
+        reason = getattr(self.response, "reason", None)
+        if reason is None:
+            # httpx.Response, as used by the asyncio API
+            return getattr(self.response, "reason_phrase", "")
         if isinstance(reason, str):
             return reason
         try:
@@ -0,0 +1,398 @@
+"""
+Client-side caching of inference results.
+"""
+import copy
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+from sap.aibus.dar.client.inference_client import TOP_N, InferenceClient
+from sap.aibus.dar.client.util.concurrency import AdaptiveConcurrencyLimit
+from sap.aibus.dar.client.util.features import features_fingerprint
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+#: Maximum number of predictions held by a cache by default
+DEFAULT_MAX_SIZE = 100000
+
+
+class InferenceCache:
+    """
+    Abstract base class for caches of ObjectPrediction dictionaries.
+
+    Implementations evict entries once more than *max_size* entries are stored,
+    starting with the least recently used entry. Entries older than *ttl* seconds
+    are never returned.
+    """
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Returns the cached prediction for *key*.
+
+        Must be implemented by subclasses.
+
+        :param key: cache key
+        :return: the cached prediction or None if there is no valid entry
+        """
+        raise NotImplementedError
+
+    def put(self, key: str, prediction: dict) -> None:
+        """
+        Stores *prediction* under *key*.
+
+        Must be implemented by subclasses.
+
+        :param key: cache key
+        :param prediction: the prediction to be stored
+        :return: None
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        """
+        Removes all entries.
+
+        Must be implemented by subclasses.
+
+        :return: None
+        """
+        raise NotImplementedError
+
+
+class InMemoryInferenceCache(InferenceCache):
+    """
+    A thread-safe in-memory LRU cache with optional expiry.
+    """
+
+    def __init__(
+        self,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: Optional[float] = None,
+        timer: Optional[Callable[[], float]] = None,
+    ):
+        """
+        Constructor.
+
+        :param max_size: maximum number of entries
+        :param ttl: Optional: time in seconds after which an entry expires
+        :param timer: Optional: Timer function, mainly useful for unit tests
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be > 0, not {}".format(max_size))
+        self.max_size = max_size
+        self.ttl = ttl
+        self.timer = time.monotonic if timer is None else timer
+        self._entries = OrderedDict()  # type: OrderedDict
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, prediction = entry
+            if self.ttl is not None and self.timer() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            # Callers may modify the returned prediction.
+            return copy.deepcopy(prediction)
+
+    def put(self, key: str, prediction: dict) -> None:
+        # Callers may modify the stored prediction after the call.
+        prediction = copy.deepcopy(prediction)
+        with self._lock:
+            self._entries[key] = (self.timer(), prediction)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SqliteInferenceCache(InferenceCache):
+    """
+    A thread-safe LRU cache with optional expiry persisted in a SQLite database.
+
+    The cache survives restarts of the process and can be shared by several
+    processes on the same host.
+
+    Least recently used entries are evicted in bulk, so the number of entries
+    can exceed *max_size* by up to one percent.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int = DEFAULT_MAX_SIZE,
+        ttl: Optional[float] = None,
+        timer: Optional[Callable[[], float]] = None,
+    ):
+        """
+        Constructor.
+
+        :param path: file name of the SQLite database. Will be created if missing.
+        :param max_size: maximum number of entries
+        :param ttl: Optional: time in seconds after which an entry expires
+        :param timer: Optional: Timer function, mainly useful for unit tests. Must
+            return wall clock time if the cache is shared between processes.
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be > 0, not {}".format(max_size))
+        self.path = path
+        self.max_size = max_size
+        self.ttl = ttl
+        self.timer = time.time if timer is None else timer
+        self._lock = threading.Lock()
+        self._puts_since_eviction = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS predictions ("
+                " key TEXT PRIMARY KEY,"
+                " prediction TEXT NOT NULL,"
+                " stored_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS predictions_accessed_at"
+                " ON predictions (accessed_at)"
+            )
+
+    def get(self, key: str) -> Optional[dict]:
+        now = self.timer()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT prediction, stored_at FROM predictions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            prediction, stored_at = row
+            if self.ttl is not None and now - stored_at > self.ttl:
+                self._connection.execute(
+                    "DELETE FROM predictions WHERE key = ?", (key,)
+                )
+                return None
+            self._connection.execute(
+                "UPDATE predictions SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return json.loads(prediction)
+
+    def put(self, key: str, prediction: dict) -> None:
+        now = self.timer()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                (key, json.dumps(prediction), now, now),
+            )
+            # Finding the entries to evict requires a scan over max_size rows. To
+            # keep inserts cheap, this is done only once per percent of max_size.
+            self._puts_since_eviction += 1
+            if self._puts_since_eviction < max(1, self.max_size // 100):
+                return
+            self._puts_since_eviction = 0
+            self._connection.execute(
+                "DELETE FROM predictions WHERE key IN ("
+                " SELECT key FROM predictions ORDER BY accessed_at DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.max_size,),
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM predictions")
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+
+        :return: None
+        """
+        self._connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._connection.execute(
+                "SELECT COUNT(*) FROM predictions"
+            ).fetchone()
+        return count
+
+
+class CachingInferenceClient(LoggerMixin):
+    """
+    Wraps an :class:`InferenceClient` with a client-side cache of predictions.
+
+    Predictions are cached per model name, *top_n* and features of the inference
+    object; see :func:`~sap.aibus.dar.client.util.features.features_fingerprint`.
+    Only objects which are not in the cache are sent to the service. The
+    predictions are merged back in the original order, and the *objectId* of each
+    prediction is taken from the corresponding input object.
+
+    Placeholder predictions for failed requests are not cached.
+
+    .. note::
+
+        A cached prediction is returned even if the model was re-trained or
+        re-deployed in the meantime under the same name. Use the *ttl* parameter of
+        the cache or call its *clear* method after re-deployment.
+
+    Example usage:
+
+    .. code-block:: python
+
+        inference_client = InferenceClient.construct_from_service_key(key)
+        client = CachingInferenceClient(
+            inference_client, SqliteInferenceCache("predictions.db", ttl=24 * 3600)
+        )
+        predictions = client.do_bulk_inference("my-model", objects)
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, inference_client: InferenceClient, cache: InferenceCache):
+        """
+        Constructor.
+
+        :param inference_client: client used for cache misses
+        :param cache: the cache backend
+        """
+        self.inference_client = inference_client
+        self.cache = cache
+
+    @staticmethod
+    def cache_key(model_name: str, top_n: int, inference_object: dict) -> str:
+        """
+        Returns the cache key of an inference object.
+
+        :param model_name: name of the model used for inference
+        :param top_n: How many predictions to return per object
+        :param inference_object: the object to be classified
+        :return: the cache key
+        """
+        return "{}:{}:{}".format(
+            model_name, top_n, features_fingerprint(inference_object)
+        )
+
+    def create_inference_request(
+        self,
+        model_name: str,
+        objects: List[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+    ) -> dict:
+        """
+        Performs inference for the given *objects* with *model_name*.
+
+        See :meth:`InferenceClient.create_inference_request`. If all *objects*
+        are found in the cache, no request is made and the *id* and *processedTime*
+        keys of the returned dictionary are `None`.
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :return: API response
+        """
+        response = {
+            "id": None,
+            "status": "DONE",
+            "processedTime": None,
+        }  # type: dict
+
+        def fetch(misses: List[dict]) -> List[dict]:
+            api_response = self.inference_client.create_inference_request(
+                model_name, misses, top_n=top_n, retry=retry
+            )
+            response.update(api_response)
+            return api_response["predictions"]
+
+        response["predictions"] = self._predict(model_name, objects, top_n, fetch)
+        return response
+
+    def do_bulk_inference(
+        self,
+        model_name: str,
+        objects: List[dict],
+        top_n: int = TOP_N,
+        retry: bool = True,
+        worker_count: int = 4,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        deduplicate: bool = False,
+        resubmit_rounds: int = 0,
+        max_payload_bytes: Optional[int] = None,
+    ) -> List[dict]:
+        """
+        Performs bulk inference for larger collections.
+
+        See :meth:`InferenceClient.do_bulk_inference`. Only the objects which are
+        not found in the cache are sent to the service.
+
+        :param model_name: name of the model used for inference
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param worker_count: maximum number of concurrent requests
+        :param concurrency_limit: Optional: adaptive limit for concurrent requests
+        :param deduplicate: whether to send cache misses with identical features
+            only once. Default: False
+        :param resubmit_rounds: how often to re-submit failed cache misses.
+            Default: 0
+        :param max_payload_bytes: Optional: maximum size of a request body in bytes
+        :raises: InvalidWorkerCount if worker_count param is incorrect
+        :return: the aggregated ObjectPrediction dictionaries
+        """
+        # pylint: disable=too-many-arguments
+
+        def fetch(misses: List[dict]) -> List[dict]:
+            return self.inference_client.do_bulk_inference(
+                model_name,
+                misses,
+                top_n=top_n,
+                retry=retry,
+                worker_count=worker_count,
+                concurrency_limit=concurrency_limit,
+                deduplicate=deduplicate,
+                resubmit_rounds=resubmit_rounds,
+                max_payload_bytes=max_payload_bytes,
+            )
+
+        return self._predict(model_name, objects, top_n, fetch)
+
+    def _predict(
+        self,
+        model_name: str,
+        objects: List[dict],
+        top_n: int,
+        fetch: Callable[[List[dict]], List[dict]],
+    ) -> List[dict]:
+        keys = [self.cache_key(model_name, top_n, obj) for obj in objects]
+        results = [None] * len(objects)  # type: List[Optional[dict]]
+        miss_positions = []
+        for idx, (key, inference_object) in enumerate(zip(keys, objects)):
+            cached = self.cache.get(key)
+            if cached is None:
+                miss_positions.append(idx)
+            else:
+                results[idx] = dict(cached, objectId=inference_object.get("objectId"))
+
+        self.log.debug(
+            "Prediction cache: %s hits, %s misses",
+            len(objects) - len(miss_positions),
+            len(miss_positions),
+        )
+        if miss_positions:
+            predictions = fetch([objects[idx] for idx in miss_positions])
+            for idx, prediction in zip(miss_positions, predictions):
+                results[idx] = prediction
+                if prediction.get("labels") is not None:
+                    cached = dict(prediction)
+                    cached.pop("objectId", None)
+                    self.cache.put(keys[idx], cached)
+        return results  # type: ignore
@@ -1,26 +1,60 @@
 """
 Client API for the Inference microservice.
 """
-from concurrent.futures import ThreadPoolExecutor
-from typing import List, Union
-
-from requests import RequestException
-
-from sap.aibus.dar.client.base_client import BaseClientWithSession
-from sap.aibus.dar.client.exceptions import DARHTTPException, InvalidWorkerCount
-from sap.aibus.dar.client.inference_constants import InferencePaths
+import copy
+import time
+from typing import (
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from requests import RequestException, Response, Timeout
+
+from sap.aibus.dar.client.bulk_inference import (
+    Batch,
+    BaseBulkInferenceClient,
+    is_failed,
+    plan_batches,
+)
+from sap.aibus.dar.client.exceptions import CircuitBreakerOpen, DARHTTPException
+
+# LIMIT_OBJECTS_PER_CALL is imported for backwards compatibility.
+# pylint: disable=unused-import
+from sap.aibus.dar.client.inference_constants import (  # noqa: F401
+    LIMIT_OBJECTS_PER_CALL,
+)
+
+# pylint: enable=unused-import
+from sap.aibus.dar.client.inference_constants import TOP_N, InferencePaths
+from sap.aibus.dar.client.inference_requests import (
+    InferenceRequestMixin,
+    error_predictions,
+)
+from sap.aibus.dar.client.inference_results import ColumnarPredictions, _require
+from sap.aibus.dar.client.util.batching import InferenceBatch
+from sap.aibus.dar.client.util.concurrency import AdaptiveConcurrencyLimit
+from sap.aibus.dar.client.util.features import features_fingerprint
+from sap.aibus.dar.client.util.hedging import HedgingPolicy
 from sap.aibus.dar.client.util.lists import split_list
 
-#: How many objects can be processed per inference request
-LIMIT_OBJECTS_PER_CALL = 50
+#: Delay in seconds before the first round of re-submitting failed batches in
+#: bulk inference. The delay doubles with each further round.
+RESUBMIT_BACKOFF_SECONDS = 10
 
-#: How many labels to predict for a single object by default
-TOP_N = 1
+#: HTTP status codes which indicate that the service is overloaded
+OVERLOAD_STATUS_CODES = frozenset([429, 503])
 
 # pylint: disable=too-many-arguments
 
 
-class InferenceClient(BaseClientWithSession):
+class InferenceClient(InferenceRequestMixin, BaseBulkInferenceClient):
     """
     A client for the DAR Inference microservice.
 
@@ -28,6 +62,24 @@ class InferenceClient(BaseClientWithSession):
     which wrap individual API calls.
 
     If the API call fails, all methods will raise an :exc:`DARHTTPException`.
+
+    To limit the number of objects sent per second, assign a
+    :class:`~sap.aibus.dar.client.util.rate_limiting.RateLimiter` to
+    :attr:`object_rate_limiter`. Before each inference request, the number of
+    objects in the request is taken from the rate limiter. The number of requests
+    per second is limited by the *rate_limiter* of the :attr:`session`:
+
+    .. code-block:: python
+
+        client = InferenceClient.construct_from_service_key(key)
+        client.object_rate_limiter = TokenBucket(rate=500)
+        client.session.rate_limiter = TokenBucket(rate=10)
+
+    The bulk inference methods which consume *objects* lazily are inherited from
+    :class:`~sap.aibus.dar.client.bulk_inference.BaseBulkInferenceClient`.
+
+    .. versionadded:: 0.16.0
+        The *object_rate_limiter* attribute.
     """
 
     def create_inference_request(
@@ -36,6 +88,7 @@ class InferenceClient(BaseClientWithSession):
         objects: List[dict],
         top_n: int = TOP_N,
         retry: bool = True,
+        hedging: Optional[HedgingPolicy] = None,
     ) -> dict:
         """
         Performs inference for the given *objects* with *model_name*.
@@ -56,26 +109,29 @@ class InferenceClient(BaseClientWithSession):
            The *retry* parameter now defaults to true. This increases reliability of the
            call. See corresponding note on :meth:`do_bulk_inference`.
 
+        .. versionadded:: 0.16.0
+           The *hedging* parameter. If a
+           :class:`~sap.aibus.dar.client.util.hedging.HedgingPolicy` is given, a
+           second, identical request is sent if the response to the first request
+           takes longer than usual, and the first response to arrive is returned.
+           This reduces the latency of the slowest requests at the cost of
+           additional requests. See :ref:`hedging`.
+
         :param model_name: name of the model used for inference
         :param objects: Objects to be classified
         :param top_n: How many predictions to return per object
         :param retry: whether to retry on errors. Default: True
+        :param hedging: Optional: policy for hedged requests
         :return: API response
         """
-        self.log.debug(
-            "Submitting Inference request for model '%s' with '%s'"
-            " objects and top_n '%s' ",
-            model_name,
-            len(objects),
-            top_n,
-        )
-        endpoint = InferencePaths.format_inference_endpoint_by_name(model_name)
-        response = self.session.post_to_endpoint(
-            endpoint, payload={"topN": top_n, "objects": objects}, retry=retry
-        )
-        as_json = response.json()
-        self.log.debug("Inference response ID: %s", as_json["id"])
-        return as_json
+        endpoint, payload = self._prepare_model_request(model_name, objects, top_n)
+
+        def send() -> Response:
+            self._wait_for_rate_limit(len(objects))
+            return self.session.post_to_endpoint(endpoint, payload=payload, retry=retry)
+
+        response = send() if hedging is None else hedging.call(send)
+        return self._parse_inference_response(response)
 
     def do_bulk_inference(
         self,
@@ -84,7 +140,11 @@ class InferenceClient(BaseClientWithSession):
         top_n: int = TOP_N,
         retry: bool = True,
         worker_count: int = 4,
-    ) -> List[Union[dict, None]]:
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        deduplicate: bool = False,
+        resubmit_rounds: int = 0,
+        max_payload_bytes: Optional[int] = None,
+    ) -> List[dict]:
         """
         Performs bulk inference for larger collections.
 
@@ -158,62 +218,334 @@ class InferenceClient(BaseClientWithSession):
            request threads. Set `worker_count` to `1` to disable concurrent execution of
            requests.
 
+        .. versionadded:: 0.16.0
+           The `concurrency_limit` parameter enables adaptive concurrency. Instead of
+           a fixed `worker_count`, an
+           :class:`~sap.aibus.dar.client.util.concurrency.AdaptiveConcurrencyLimit`
+           grows the number of concurrent requests up to its configurable
+           `max_limit`, which may exceed four, while the service responds quickly.
+           It shrinks the number of concurrent requests if the service
+           slows down or responds with HTTP status code 429 or 503. Once this method
+           returns, the `limit` attribute of the `concurrency_limit` holds the level
+           of concurrency it settled on. Use this only with non-trial service
+           instances.
+
+        .. versionadded:: 0.16.0
+           The `deduplicate` parameter collapses objects with identical features
+           before they are sent to the service. Each unique set of features is only
+           sent once, and its prediction is copied to every object with the same
+           features, using the `objectId` of the respective object. This saves
+           requests and cost in proportion to the number of duplicates. Objects are
+           considered identical if
+           :func:`~sap.aibus.dar.client.util.features.features_fingerprint`
+           returns the same value.
+
+        .. versionadded:: 0.16.0
+           The `resubmit_rounds` parameter enables a second phase in which
+           batches which failed in the first pass are submitted again, for up to
+           `resubmit_rounds` rounds. Before each round, the method waits
+           *RESUBMIT_BACKOFF_SECONDS*, doubling the delay with each round. A batch
+           which fails again is split in half for the next round. This isolates
+           individual objects which cannot be processed by the service, so that
+           they do not prevent predictions for the other objects of their batch.
+           Note that each round adds requests and thus cost for non-trial service
+           instances: with *n* rounds, a batch which keeps failing is sent up to
+           :math:`2^n` times in smaller parts.
+
+        .. versionadded:: 0.16.0
+           The `max_payload_bytes` parameter limits the size of each request body
+           in addition to the number of objects. Batches are filled with up to
+           *LIMIT_OBJECTS_PER_CALL* objects as long as the JSON encoded request
+           stays within `max_payload_bytes`. This avoids HTTP status code 413 and
+           read timeouts for objects with long text features. An object which
+           exceeds the limit on its own is sent in a request of its own. See
+           :class:`~sap.aibus.dar.client.util.batching.InferenceBatchPlanner`.
 
         :param model_name: name of the model used for inference
         :param objects: Objects to be classified
         :param top_n: How many predictions to return per object
         :param retry: whether to retry on errors. Default: True
-        :param worker_count: maximum number of concurrent requests
+        :param worker_count: maximum number of concurrent requests. Ignored if
+            *concurrency_limit* is given.
+        :param concurrency_limit: Optional: adaptive limit for concurrent requests
+        :param deduplicate: whether to send objects with identical features only
+            once. Default: False
+        :param resubmit_rounds: how often to re-submit failed batches after the
+            first pass. Default: 0
+        :param max_payload_bytes: Optional: maximum size of a request body in bytes
         :raises: InvalidWorkerCount if worker_count param is incorrect
+        :raises: ValueError if resubmit_rounds is negative
         :return: the aggregated ObjectPrediction dictionaries
         """
+        # pylint: disable=too-many-locals
+
+        self._validate_worker_count(worker_count)
+        if resubmit_rounds < 0:
+            raise ValueError(
+                "resubmit_rounds must be >= 0, not {}".format(resubmit_rounds)
+            )
 
-        if worker_count is None:
-            raise InvalidWorkerCount("worker_count cannot be None!")
+        positions = None  # type: Optional[List[int]]
+        unique_objects = objects
+        if deduplicate:
+            unique_objects, positions = _deduplicate(objects)
+            self.log.debug(
+                "Deduplication reduced %s objects to %s unique objects",
+                len(objects),
+                len(unique_objects),
+            )
 
-        if worker_count > 4:
-            msg = "worker_count too high: %s. Up to 4 allowed." % worker_count
-            raise InvalidWorkerCount(msg)
+        results = []  # type: List[dict]
+        failed_ranges = []  # type: List[Tuple[int, int]]
+        batch_predictions = self._iter_batch_predictions(
+            model_name,
+            plan_batches(unique_objects, top_n, max_payload_bytes, split_list),
+            top_n=top_n,
+            retry=retry,
+            worker_count=worker_count,
+            concurrency_limit=concurrency_limit,
+        )
+        for predictions in batch_predictions:
+            if is_failed(predictions):
+                failed_ranges.append((len(results), len(results) + len(predictions)))
+            results.extend(predictions)
+
+        if resubmit_rounds:
+            self._resubmit_failed(
+                model_name,
+                unique_objects,
+                results,
+                failed_ranges,
+                top_n=top_n,
+                retry=retry,
+                worker_count=worker_count,
+                concurrency_limit=concurrency_limit,
+                rounds=resubmit_rounds,
+            )
 
-        if worker_count <= 0:
-            msg = "worker_count must be greater than 0!"
-            raise InvalidWorkerCount(msg)
+        if concurrency_limit is not None:
+            self.log.info(
+                "Bulk inference finished with a concurrency limit of %s",
+                concurrency_limit.limit,
+            )
+        if positions is not None:
+            return _fan_out(objects, results, positions)
+        return results
 
-        def predict_call(work_package):
-            try:
+    def do_dataframe_inference(
+        self,
+        model_name: str,
+        data_frame,
+        features: Union[Mapping[str, str], Sequence[str]],
+        top_n: int = TOP_N,
+        retry: bool = True,
+        worker_count: int = 4,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+        max_payload_bytes: Optional[int] = None,
+    ):
+        """
+        Performs bulk inference for the rows of a :class:`pandas.DataFrame`.
+
+        The features of each inference object are taken from the columns of
+        *data_frame*. *features* maps the feature names of the model to column
+        names. A list of column names can be passed if the columns are named like
+        the features. Missing values are sent as empty strings.
+
+        Returns a DataFrame with the same index as *data_frame* and one row per
+        row of the input. For each label and rank, it has a categorical column
+        with the predicted value and a column with its probability; see
+        :meth:`~sap.aibus.dar.client.inference_results.ColumnarPredictions.to_wide_pandas`.
+        For *top_n* of two and a label *category*, the columns are *category*,
+        *category_probability*, *category_2* and *category_2_probability*. If the
+        inference request for a row fails, its prediction columns are empty and
+        the *error* column contains the error.
+
+        Example usage:
+
+        .. code-block:: python
+
+            predictions = client.do_dataframe_inference(
+                "my-model", data_frame, {"description": "product_text"}
+            )
+            data_frame = data_frame.join(predictions)
+
+        The input columns are converted to strings once per column instead of
+        once per row, and the predictions are collected in a
+        :class:`~sap.aibus.dar.client.inference_results.ColumnarPredictions`
+        container. The result is then built with array operations instead of
+        flattening a dictionary for each row.
+
+        Requires the optional `pandas` dependency.
+
+        .. versionadded:: 0.16.0
+
+        :param model_name: name of the model used for inference
+        :param data_frame: the rows to be classified
+        :param features: mapping of feature names to column names, or a list of
+            column names
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param worker_count: maximum number of concurrent requests. Ignored if
+            *concurrency_limit* is given.
+        :param concurrency_limit: Optional: adaptive limit for concurrent requests,
+            see :meth:`do_bulk_inference`
+        :param max_payload_bytes: Optional: maximum size of a request body in bytes,
+            see :meth:`do_bulk_inference`
+        :raises: InvalidWorkerCount if worker_count param is incorrect
+        :return: a DataFrame with the predictions
+        """
+        _require("pandas", "pandas")
+        if not isinstance(features, Mapping):
+            features = {column: column for column in features}
+        feature_names = list(features.keys())
+        feature_values = [
+            data_frame[column].fillna("").astype(str).tolist()
+            for column in features.values()
+        ]
+
+        def generate_objects() -> Iterator[dict]:
+            for idx, values in enumerate(zip(*feature_values)):
+                yield {
+                    "objectId": str(idx),
+                    "features": [
+                        {"name": name, "value": value}
+                        for name, value in zip(feature_names, values)
+                    ],
+                }
+
+        predictions = ColumnarPredictions.from_predictions(
+            self.do_streaming_bulk_inference(
+                model_name,
+                generate_objects(),
+                top_n=top_n,
+                retry=retry,
+                worker_count=worker_count,
+                concurrency_limit=concurrency_limit,
+                max_payload_bytes=max_payload_bytes,
+            )
+        )
+        result = predictions.to_wide_pandas(index=data_frame.index)
+        return result.drop(columns="objectId")
+
+    def _resubmit_failed(
+        self,
+        model_name: str,
+        objects: List[dict],
+        results: List[dict],
+        pending: List[Tuple[int, int]],
+        top_n: int,
+        retry: bool,
+        worker_count: int,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit],
+        rounds: int,
+    ) -> None:
+        """
+        Re-submits the *pending* index ranges of failed batches and updates
+        *results*.
+
+        Batches which fail again are bisected for the next round.
+        """
+        for round_number in range(1, rounds + 1):
+            if not pending:
+                return
+            delay = RESUBMIT_BACKOFF_SECONDS * 2 ** (round_number - 1)
+            self.log.info(
+                "Re-submitting %s failed batches in %s seconds (round %s of %s)",
+                len(pending),
+                delay,
+                round_number,
+                rounds,
+            )
+            self._sleep(delay)
+
+            batch_predictions = self._iter_batch_predictions(
+                model_name,
+                (objects[start:stop] for start, stop in pending),
+                top_n=top_n,
+                retry=retry,
+                worker_count=worker_count,
+                concurrency_limit=concurrency_limit,
+            )
+            pending = _merge_resubmitted(results, pending, batch_predictions)
+
+        if pending:
+            self.log.warning(
+                "%s batches still failed after %s rounds", len(pending), rounds
+            )
+
+    def _wait_for_rate_limit(self, object_count: int) -> None:
+        if self.object_rate_limiter is not None:
+            self.object_rate_limiter.acquire(object_count)
+
+    @staticmethod
+    def _sleep(how_long: float) -> None:
+        time.sleep(how_long)
+
+    def _predict_batch(
+        self,
+        model_name: str,
+        work_package: Batch,
+        top_n: int,
+        retry: bool,
+        concurrency_limit: Optional[AdaptiveConcurrencyLimit] = None,
+    ) -> List[dict]:
+        """
+        Runs inference for a single batch.
+
+        An :class:`InferenceBatch` is sent with its existing JSON encoding. If the
+        request fails, returns placeholder predictions instead of raising.
+        """
+        if isinstance(work_package, InferenceBatch):
+            objects = work_package.objects
+        else:
+            objects = work_package
+        started_at = 0.0
+        if concurrency_limit is not None:
+            started_at = concurrency_limit.acquire()
+        overloaded = False
+        try:
+            if isinstance(work_package, InferenceBatch):
+                response = self._create_inference_request_from_batch(
+                    model_name, work_package, retry=retry
+                )
+            else:
                 response = self.create_inference_request(
                     model_name, work_package, top_n=top_n, retry=retry
                 )
-                return response["predictions"]
-            except (DARHTTPException, RequestException) as exc:
-                self.log.warning(
-                    "Caught %s during bulk inference. "
-                    "Setting results to None for this batch!",
-                    exc,
-                    exc_info=True,
-                )
-
-                prediction_error = [
-                    {
-                        "objectId": inference_object.get("objectId", None),
-                        "labels": None,
-                        "_sdk_error": "{}: {}".format(exc.__class__.__name__, str(exc)),
-                    }
-                    for inference_object in work_package
-                ]
-                return prediction_error
-
-        results = []
-
-        with ThreadPoolExecutor(max_workers=worker_count) as pool:
-            results_iterator = pool.map(
-                predict_call, split_list(objects, LIMIT_OBJECTS_PER_CALL)
+            return response["predictions"]
+        except CircuitBreakerOpen as exc:
+            self.log.warning("%s Setting results to None for this batch!", exc)
+            overloaded = True
+            return error_predictions(objects, exc)
+        except (DARHTTPException, RequestException, ValueError) as exc:
+            # ValueError: the response body is not valid JSON. Depending on the
+            # JSON backend, this is not a RequestException.
+            overloaded = isinstance(exc, Timeout) or (
+                isinstance(exc, DARHTTPException)
+                and exc.status_code in OVERLOAD_STATUS_CODES
             )
+            return self._failed_batch_predictions(objects, exc)
+        finally:
+            if concurrency_limit is not None:
+                concurrency_limit.release(started_at, overloaded=overloaded)
 
-            for predictions in results_iterator:
-                results.extend(predictions)
-
-        return results
+    def _create_inference_request_from_batch(
+        self, model_name: str, batch: InferenceBatch, retry: bool
+    ) -> dict:
+        self.log.debug(
+            "Submitting Inference request for model '%s' with '%s'"
+            " objects, top_n '%s' and %s bytes",
+            model_name,
+            len(batch),
+            batch.top_n,
+            batch.size,
+        )
+        endpoint = InferencePaths.format_inference_endpoint_by_name(model_name)
+        self._wait_for_rate_limit(len(batch))
+        response = self.session.post_json_to_endpoint(
+            endpoint, batch.to_json(), retry=retry
+        )
+        return self._parse_inference_response(response)
 
     def create_inference_request_with_url(
         self,
@@ -221,6 +553,7 @@ class InferenceClient(BaseClientWithSession):
         objects: List[dict],
         top_n: int = TOP_N,
         retry: bool = True,
+        hedging: Optional[HedgingPolicy] = None,
     ) -> dict:
         """
         Performs inference for the given *objects* against fully-qualified URL.
@@ -231,22 +564,81 @@ class InferenceClient(BaseClientWithSession):
            The *retry* parameter now defaults to true. This increases reliability of the
            call. See corresponding note on :meth:`do_bulk_inference`.
 
+        .. versionadded:: 0.16.0
+           The *hedging* parameter, see :meth:`create_inference_request`.
+
         :param url: fully-qualified inference URL
         :param objects: Objects to be classified
         :param top_n: How many predictions to return per object
         :param retry: whether to retry on errors. Default: True
+        :param hedging: Optional: policy for hedged requests
         :return: API response
         """
-        self.log.debug(
-            "Submitting Inference request with '%s'"
-            " objects and top_n '%s' to url %s",
-            len(objects),
-            top_n,
-            url,
-        )
-        response = self.session.post_to_url(
-            url, payload={"topN": top_n, "objects": objects}, retry=retry
-        )
-        as_json = response.json()
-        self.log.debug("Inference response ID: %s", as_json["id"])
-        return as_json
+        payload = self._prepare_url_request(url, objects, top_n)
+
+        def send() -> Response:
+            self._wait_for_rate_limit(len(objects))
+            return self.session.post_to_url(url, payload=payload, retry=retry)
+
+        response = send() if hedging is None else hedging.call(send)
+        return self._parse_inference_response(response)
+
+
+def _merge_resubmitted(
+    results: List[dict],
+    pending: List[Tuple[int, int]],
+    batch_predictions: Iterable[List[dict]],
+) -> List[Tuple[int, int]]:
+    """
+    Writes the predictions for the re-submitted *pending* index ranges into
+    *results* and returns the ranges to re-submit in the next round: each range
+    which failed again is bisected.
+    """
+    still_failing = []  # type: List[Tuple[int, int]]
+    for (start, stop), predictions in zip(pending, batch_predictions):
+        results[start:stop] = predictions
+        if not is_failed(predictions):
+            continue
+        if stop - start > 1:
+            middle = (start + stop) // 2
+            still_failing.extend([(start, middle), (middle, stop)])
+        else:
+            still_failing.append((start, stop))
+    return still_failing
+
+
+def _deduplicate(objects: List[dict]) -> Tuple[List[dict], List[int]]:
+    """
+    Returns the objects with unique features and, for each of the original objects,
+    the position of the corresponding unique object.
+    """
+    unique_objects = []  # type: List[dict]
+    positions = []  # type: List[int]
+    seen = {}  # type: Dict[str, int]
+    for inference_object in objects:
+        fingerprint = features_fingerprint(inference_object)
+        position = seen.get(fingerprint)
+        if position is None:
+            position = seen[fingerprint] = len(unique_objects)
+            unique_objects.append(inference_object)
+        positions.append(position)
+    return unique_objects, positions
+
+
+def _fan_out(
+    objects: List[dict], predictions: List[dict], positions: List[int]
+) -> List[dict]:
+    """
+    Inverts :func:`_deduplicate`: returns one prediction per original object.
+    """
+    results = []
+    used = [False] * len(predictions)
+    for inference_object, position in zip(objects, positions):
+        prediction = predictions[position]
+        if used[position]:
+            # Do not hand out the same mutable labels to several objects.
+            prediction = copy.deepcopy(prediction)
+        used[position] = True
+        prediction["objectId"] = inference_object.get("objectId", None)
+        results.append(prediction)
+    return results
@@ -2,6 +2,12 @@
 Constants for the InferenceClient.
 """
 
+#: How many objects can be processed per inference request
+LIMIT_OBJECTS_PER_CALL = 50
+
+#: How many labels to predict for a single object by default
+TOP_N = 1
+
 
 class InferencePaths:
     """
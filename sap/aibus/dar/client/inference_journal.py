@@ -0,0 +1,153 @@
+"""
+Journal of completed bulk inference batches, used to resume interrupted jobs.
+"""
+import hashlib
+import json
+import os
+from typing import Dict, List, Tuple
+
+from sap.aibus.dar.client.exceptions import JournalMismatch
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+
+class BulkInferenceJournal(LoggerMixin):
+    """
+    An append-only JSONL file recording the results of completed batches.
+
+    The first line of the file is a header identifying the job by model name and
+    *top_n*. Each following line records one completed batch::
+
+        {"batch": 3, "fingerprint": "<sha256>", "predictions": [...]}
+
+    The *fingerprint* identifies the objects in the batch. When the journal is
+    reopened, a recorded batch is only reused if the batch at the same index has the
+    same fingerprint. A line which was only partially written, for example because
+    the process was killed, is ignored. If this happened to the header, the journal
+    is started over.
+
+    Each record is flushed to disk before the next batch is recorded.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, path: str, model_name: str, top_n: int):
+        """
+        Constructor.
+
+        Opens the journal at *path*, creating it if necessary.
+
+        :param path: file name of the journal
+        :param model_name: name of the model used for inference
+        :param top_n: How many predictions to return per object
+        :raises JournalMismatch: if the journal belongs to a different job
+        """
+        self.path = path
+        self.header = {"modelName": model_name, "topN": top_n}
+        self.completed = {}  # type: Dict[int, Tuple[str, List[dict]]]
+
+        if os.path.exists(path) and os.path.getsize(path) > 0 and self._load():
+            self._file = open(path, "a", encoding="utf-8")
+        else:
+            self._file = open(path, "w", encoding="utf-8")
+            self._write(self.header)
+
+    @staticmethod
+    def fingerprint(batch: List[dict]) -> str:
+        """
+        Returns a hash identifying the objects in *batch*.
+
+        :param batch: objects of a batch
+        :return: hex digest
+        """
+        encoded = json.dumps(batch, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    def get(self, batch_index: int, fingerprint: str):
+        """
+        Returns the recorded predictions for a batch, if any.
+
+        :param batch_index: index of the batch
+        :param fingerprint: fingerprint of the batch as returned by
+            :meth:`fingerprint`
+        :return: the predictions or None if the batch was not recorded
+        """
+        entry = self.completed.get(batch_index)
+        if entry is None or entry[0] != fingerprint:
+            return None
+        return entry[1]
+
+    def record(
+        self, batch_index: int, fingerprint: str, predictions: List[dict]
+    ) -> None:
+        """
+        Appends the predictions of a completed batch to the journal.
+
+        :param batch_index: index of the batch
+        :param fingerprint: fingerprint of the batch
+        :param predictions: predictions of the batch
+        :return: None
+        """
+        self._write(
+            {
+                "batch": batch_index,
+                "fingerprint": fingerprint,
+                "predictions": predictions,
+            }
+        )
+        self.completed[batch_index] = (fingerprint, predictions)
+
+    def close(self) -> None:
+        """
+        Closes the journal file.
+
+        :return: None
+        """
+        self._file.close()
+
+    def __enter__(self) -> "BulkInferenceJournal":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _write(self, entry: dict) -> None:
+        self._file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _load(self) -> bool:
+        """
+        Reads the completed batches from the journal.
+
+        Returns False if the header was only partially written, in which case the
+        journal has to be started over.
+        """
+        with open(self.path, "r", encoding="utf-8") as journal_file:
+            lines = journal_file.readlines()
+        try:
+            header = json.loads(lines[0])
+        except ValueError:
+            self.log.warning("Discarding incomplete header of journal '%s'", self.path)
+            return False
+        if header != self.header:
+            raise JournalMismatch(
+                "Journal '{}' was written for {}, not for {}.".format(
+                    self.path, header, self.header
+                )
+            )
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                self.log.warning("Ignoring incomplete line in journal '%s'", self.path)
+                continue
+            self.completed[entry["batch"]] = (
+                entry["fingerprint"],
+                entry["predictions"],
+            )
+        if lines[-1] and not lines[-1].endswith("\n"):
+            # Terminate a partially written line so the next record starts on
+            # its own line.
+            with open(self.path, "a", encoding="utf-8") as journal_file:
+                journal_file.write("\n")
+        return True
@@ -0,0 +1,116 @@
+"""
+Request building and response handling shared by the inference clients.
+"""
+from typing import List, Tuple
+
+from sap.aibus.dar.client.inference_constants import InferencePaths
+from sap.aibus.dar.client.util import json_codec
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+
+def inference_payload(objects: List[dict], top_n: int) -> dict:
+    """
+    Returns the body of an inference request.
+
+    .. doctest::
+
+        >>> inference_payload([{"features": []}], 2)
+        {'topN': 2, 'objects': [{'features': []}]}
+
+    :param objects: Objects to be classified
+    :param top_n: How many predictions to return per object
+    :return: the request body
+    """
+    return {"topN": top_n, "objects": objects}
+
+
+def error_predictions(work_package: List[dict], exc: Exception) -> List[dict]:
+    """
+    Returns placeholder predictions for the objects of a failed inference request.
+
+    The placeholders follow the format of the ObjectPrediction dictionaries
+    returned by the service, with `labels` set to `None` and an additional
+    `_sdk_error` key which describes *exc*.
+
+    .. doctest::
+
+        >>> error_predictions([{"objectId": "a"}, {}], ValueError("boom"))
+        ... # doctest: +NORMALIZE_WHITESPACE
+        [{'objectId': 'a', 'labels': None, '_sdk_error': 'ValueError: boom'},
+         {'objectId': None, 'labels': None, '_sdk_error': 'ValueError: boom'}]
+
+    :param work_package: objects of the failed request
+    :param exc: the error
+    :return: one placeholder prediction per object
+    """
+    return [
+        {
+            "objectId": inference_object.get("objectId", None),
+            "labels": None,
+            "_sdk_error": "{}: {}".format(exc.__class__.__name__, str(exc)),
+        }
+        for inference_object in work_package
+    ]
+
+
+class InferenceRequestMixin(LoggerMixin):
+    """
+    Prepares inference requests and handles their responses.
+
+    Used by :class:`~sap.aibus.dar.client.inference_client.InferenceClient` and
+    :class:`~sap.aibus.dar.client.async_inference_client.AsyncInferenceClient`,
+    which only differ in how the request is sent.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def _prepare_model_request(
+        self, model_name: str, objects: List[dict], top_n: int
+    ) -> Tuple[str, dict]:
+        """
+        Returns endpoint and body of an inference request for *model_name*.
+        """
+        self.log.debug(
+            "Submitting Inference request for model '%s' with '%s'"
+            " objects and top_n '%s' ",
+            model_name,
+            len(objects),
+            top_n,
+        )
+        endpoint = InferencePaths.format_inference_endpoint_by_name(model_name)
+        return endpoint, inference_payload(objects, top_n)
+
+    def _prepare_url_request(self, url: str, objects: List[dict], top_n: int) -> dict:
+        """
+        Returns the body of an inference request to a fully-qualified URL.
+        """
+        self.log.debug(
+            "Submitting Inference request with '%s'"
+            " objects and top_n '%s' to url %s",
+            len(objects),
+            top_n,
+            url,
+        )
+        return inference_payload(objects, top_n)
+
+    def _parse_inference_response(self, response) -> dict:
+        """
+        Decodes the JSON body of an inference response.
+        """
+        as_json = json_codec.response_json(response)
+        self.log.debug("Inference response ID: %s", as_json["id"])
+        return as_json
+
+    def _failed_batch_predictions(
+        self, objects: List[dict], exc: Exception
+    ) -> List[dict]:
+        """
+        Logs a failed inference request of a bulk inference and returns the
+        placeholder predictions for its *objects*.
+        """
+        self.log.warning(
+            "Caught %s during bulk inference. Setting results to None for this batch!",
+            exc,
+            exc_info=True,
+        )
+        return error_predictions(objects, exc)
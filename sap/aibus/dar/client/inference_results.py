@@ -0,0 +1,359 @@
+"""
+Columnar storage of inference results.
+"""
+import importlib
+from array import array
+from collections.abc import Sequence
+from typing import Dict, Hashable, Iterable, List, Optional
+
+
+def _require(module_name: str, extra: str):
+    try:
+        return importlib.import_module(module_name)
+    except ImportError as exc:
+        raise ImportError(
+            "This method requires the '{}' package. Install it with"
+            " 'pip install data-attribute-recommendation-sdk[{}]'.".format(
+                module_name, extra
+            )
+        ) from exc
+
+
+def prediction_column_name(label_name: str, rank: int) -> str:
+    """
+    Returns the name of the column holding the prediction of the given rank for a
+    label in wide tabular output.
+
+    The probability of the prediction is stored in a column with the suffix
+    *_probability*.
+
+    .. doctest::
+
+        >>> prediction_column_name("category", 0)
+        'category'
+        >>> prediction_column_name("category", 1)
+        'category_2'
+
+    :param label_name: name of the label
+    :param rank: zero-based rank of the prediction
+    :return: the column name
+    """
+    if rank == 0:
+        return label_name
+    return "{}_{}".format(label_name, rank + 1)
+
+
+class _Vocabulary:
+    """
+    Assigns consecutive integer codes to distinct values.
+    """
+
+    def __init__(self):
+        self.items = []  # type: List[Hashable]
+        self._codes = {}  # type: Dict[Hashable, int]
+
+    def code(self, item: Hashable) -> int:
+        """
+        Returns the code of *item*, assigning the next free code to new items.
+
+        :param item: the value to be encoded
+        :return: the integer code
+        """
+        code = self._codes.get(item)
+        if code is None:
+            code = self._codes[item] = len(self.items)
+            self.items.append(item)
+        return code
+
+
+class ColumnarPredictions(Sequence):
+    """
+    A compact container for the ObjectPrediction dictionaries of bulk inference.
+
+    Instead of one nested dictionary per object, the predictions are stored in
+    columns with one entry per object, label and rank:
+
+    * :attr:`object_index`: position of the object in the input
+    * :attr:`label_codes`: index into :attr:`label_names`
+    * :attr:`ranks`: rank of the prediction for the label, starting at zero
+    * :attr:`value_codes`: index into :attr:`values`
+    * :attr:`probabilities`: probability of the prediction
+
+    Numeric columns are :class:`array.array` buffers, and label names and predicted
+    values are stored once in a dictionary. :meth:`to_pandas` and :meth:`to_arrow`
+    build a table directly from these buffers without iterating over the rows.
+
+    For compatibility with code written for the list returned by
+    :meth:`~sap.aibus.dar.client.inference_client.InferenceClient.do_bulk_inference`,
+    the container is a sequence of ObjectPrediction dictionaries: ``result[i]``
+    returns the prediction for the *i*-th object. The dictionary is
+    created on access.
+
+    Objects for which inference failed have no rows in the columns. Their error
+    messages are available in :attr:`errors`. Indexing returns the same
+    placeholder prediction as
+    :meth:`~sap.aibus.dar.client.inference_client.InferenceClient.do_bulk_inference`.
+
+    Example usage:
+
+    .. code-block:: python
+
+        predictions = ColumnarPredictions.from_predictions(
+            client.do_streaming_bulk_inference("my-model", objects)
+        )
+        data_frame = predictions.to_pandas()
+
+    .. note::
+
+        The arrays of :meth:`to_pandas` and :meth:`to_arrow` share memory with this
+        container. While they are alive, :meth:`append` raises a
+        :exc:`BufferError`.
+
+    .. versionadded:: 0.16.0
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self):
+        """
+        Constructor. Creates an empty container.
+        """
+        self.object_ids = []  # type: List[Optional[str]]
+        self.errors = {}  # type: Dict[int, str]
+        self.object_index = array("q")
+        self.label_codes = array("i")
+        self.ranks = array("i")
+        self.value_codes = array("i")
+        self.probabilities = array("d")
+        self._offsets = array("q", [0])
+        self._label_names = _Vocabulary()
+        self._values = _Vocabulary()
+
+    @classmethod
+    def from_predictions(cls, predictions: Iterable[dict]) -> "ColumnarPredictions":
+        """
+        Creates a container from ObjectPrediction dictionaries.
+
+        The *predictions* are consumed one at a time, so a generator such as the
+        one returned by
+        :meth:`~sap.aibus.dar.client.inference_client.InferenceClient.do_streaming_bulk_inference`
+        is never materialized as a list.
+
+        :param predictions: ObjectPrediction dictionaries
+        :return: the container
+        """
+        result = cls()
+        for prediction in predictions:
+            result.append(prediction)
+        return result
+
+    @property
+    def label_names(self) -> List[str]:
+        """
+        The distinct label names, indexed by :attr:`label_codes`.
+
+        :return: list of label names
+        """
+        return self._label_names.items  # type: ignore
+
+    @property
+    def values(self) -> List[str]:
+        """
+        The distinct predicted values, indexed by :attr:`value_codes`.
+
+        :return: list of predicted values
+        """
+        return self._values.items  # type: ignore
+
+    def append(self, prediction: dict) -> None:
+        """
+        Adds an ObjectPrediction dictionary.
+
+        :param prediction: prediction for the next object
+        :return: None
+        """
+        index = len(self.object_ids)
+        self.object_ids.append(prediction.get("objectId"))
+        if "_sdk_error" in prediction:
+            self.errors[index] = prediction["_sdk_error"]
+        for label in prediction.get("labels") or []:
+            label_code = self._label_names.code(label["name"])
+            for rank, result in enumerate(label["results"]):
+                self.object_index.append(index)
+                self.label_codes.append(label_code)
+                self.ranks.append(rank)
+                self.value_codes.append(self._values.code(result["value"]))
+                self.probabilities.append(result.get("probability", float("nan")))
+        self._offsets.append(len(self.object_index))
+
+    def to_pandas(self):
+        """
+        Returns the predictions as a :class:`pandas.DataFrame`.
+
+        The DataFrame has one row per object, label and rank, with the columns
+        *objectIndex*, *objectId*, *label*, *rank*, *value* and *probability*.
+        The *label* and *value* columns are categorical.
+
+        Requires the optional `pandas` dependency.
+
+        :return: the DataFrame
+        """
+        numpy = _require("numpy", "pandas")
+        pandas = _require("pandas", "pandas")
+        object_index = numpy.frombuffer(self.object_index, dtype=numpy.int64)
+        object_ids = numpy.asarray(self.object_ids, dtype=object)
+        return pandas.DataFrame(
+            {
+                "objectIndex": object_index,
+                "objectId": object_ids[object_index],
+                "label": pandas.Categorical.from_codes(
+                    numpy.frombuffer(self.label_codes, dtype=numpy.int32),
+                    categories=self.label_names,
+                ),
+                "rank": numpy.frombuffer(self.ranks, dtype=numpy.int32),
+                "value": pandas.Categorical.from_codes(
+                    numpy.frombuffer(self.value_codes, dtype=numpy.int32),
+                    categories=self.values,
+                ),
+                "probability": numpy.frombuffer(
+                    self.probabilities, dtype=numpy.float64
+                ),
+            },
+            copy=False,
+        )
+
+    def to_wide_pandas(self, index=None):
+        """
+        Returns the predictions as a :class:`pandas.DataFrame` with one row per
+        object.
+
+        The DataFrame has the columns *objectId*, a value and a probability column
+        per label and rank as named by :func:`prediction_column_name`, and *error*.
+        Value columns are categorical. Cells for which no prediction exists, for
+        example because the request for the object failed, are empty. The
+        *error* column holds the error message for failed objects and None
+        otherwise.
+
+        The table is built with array operations on the columns of this container,
+        without iterating over the rows.
+
+        Requires the optional `pandas` dependency.
+
+        :param index: Optional: index of the DataFrame. Defaults to the position of
+            the object.
+        :return: the DataFrame
+        """
+        numpy = _require("numpy", "pandas")
+        pandas = _require("pandas", "pandas")
+
+        rank_count, value_codes, probabilities = self._to_slots(numpy)
+        errors = numpy.full(len(self), None, dtype=object)
+        errors[list(self.errors.keys())] = list(self.errors.values())
+
+        columns = {"objectId": numpy.asarray(self.object_ids, dtype=object)}
+        for label_code, label_name in enumerate(self.label_names):
+            for rank in range(rank_count):
+                slot = label_code * rank_count + rank
+                name = prediction_column_name(label_name, rank)
+                columns[name] = pandas.Categorical.from_codes(
+                    value_codes[:, slot], categories=self.values
+                )
+                columns[name + "_probability"] = probabilities[:, slot]
+        columns["error"] = errors
+        return pandas.DataFrame(columns, index=index)
+
+    def _to_slots(self, numpy):
+        """
+        Scatters value codes and probabilities into one column ("slot") per label
+        and rank, and one row per object.
+
+        Returns the number of ranks and the two matrices. Empty cells have value
+        code -1 and probability NaN.
+        """
+        object_index = numpy.frombuffer(self.object_index, dtype=numpy.int64)
+        label_codes = numpy.frombuffer(self.label_codes, dtype=numpy.int32)
+        ranks = numpy.frombuffer(self.ranks, dtype=numpy.int32)
+        rank_count = int(ranks.max()) + 1 if len(ranks) else 0
+        slot_count = len(self.label_names) * rank_count
+
+        slots = label_codes.astype(numpy.int64) * rank_count + ranks
+        value_codes = numpy.full((len(self), slot_count), -1, dtype=numpy.int32)
+        value_codes[object_index, slots] = numpy.frombuffer(
+            self.value_codes, dtype=numpy.int32
+        )
+        probabilities = numpy.full((len(self), slot_count), numpy.nan)
+        probabilities[object_index, slots] = numpy.frombuffer(
+            self.probabilities, dtype=numpy.float64
+        )
+        return rank_count, value_codes, probabilities
+
+    def to_arrow(self):
+        """
+        Returns the predictions as a :class:`pyarrow.Table`.
+
+        The table has the same columns as the DataFrame returned by
+        :meth:`to_pandas`. The *label* and *value* columns are dictionary-encoded.
+
+        Requires the optional `pyarrow` dependency.
+
+        :return: the table
+        """
+        pyarrow = _require("pyarrow", "arrow")
+
+        def from_buffer(data_type, values: array):
+            return pyarrow.Array.from_buffers(
+                data_type, len(values), [None, pyarrow.py_buffer(values)]
+            )
+
+        object_index = from_buffer(pyarrow.int64(), self.object_index)
+        object_ids = pyarrow.array(self.object_ids, type=pyarrow.string())
+        return pyarrow.table(
+            {
+                "objectIndex": object_index,
+                "objectId": object_ids.take(object_index),
+                "label": pyarrow.DictionaryArray.from_arrays(
+                    from_buffer(pyarrow.int32(), self.label_codes),
+                    pyarrow.array(self.label_names, type=pyarrow.string()),
+                ),
+                "rank": from_buffer(pyarrow.int32(), self.ranks),
+                "value": pyarrow.DictionaryArray.from_arrays(
+                    from_buffer(pyarrow.int32(), self.value_codes),
+                    pyarrow.array(self.values, type=pyarrow.string()),
+                ),
+                "probability": from_buffer(pyarrow.float64(), self.probabilities),
+            }
+        )
+
+    def __len__(self) -> int:
+        return len(self.object_ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[idx] for idx in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("prediction index out of range")
+        return self._prediction(index)
+
+    def _prediction(self, index: int) -> dict:
+        object_id = self.object_ids[index]
+        if index in self.errors:
+            return {
+                "objectId": object_id,
+                "labels": None,
+                "_sdk_error": self.errors[index],
+            }
+        labels = []  # type: List[dict]
+        for row in range(self._offsets[index], self._offsets[index + 1]):
+            if self.ranks[row] == 0:
+                labels.append(
+                    {"name": self.label_names[self.label_codes[row]], "results": []}
+                )
+            labels[-1]["results"].append(
+                {
+                    "value": self.values[self.value_codes[row]],
+                    "probability": self.probabilities[row],
+                }
+            )
+        return {"objectId": object_id, "labels": labels}
@@ -0,0 +1,281 @@
+"""
+This module contains asyncio-based counterparts of the HTTP sessions in
+:mod:`sap.aibus.dar.client.util.http_transport`.
+
+The sessions are implemented on top of the optional `httpx`_ library, which can be
+installed together with the SDK as follows::
+
+    pip install data-attribute-recommendation-sdk[async]
+
+.. _httpx: https://www.python-httpx.org/
+"""
+import asyncio
+import email.utils
+import random
+import time
+from typing import Optional, Tuple
+
+from sap.aibus.dar.client.util.http_transport import (
+    BACKOFF_MAX,
+    CONNECT_TIMEOUT,
+    NUM_REQUEST_RETRIES,
+    READ_TIMEOUT,
+    RETRY_AFTER_STATUS_CODES,
+    RetryBudget,
+    enforce_https_except_localhost,
+)
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    HTTPX_AVAILABLE = False
+else:
+    HTTPX_AVAILABLE = True
+
+#: Maximum number of connections kept by the connection pool of a session
+MAX_CONNECTIONS = 100
+
+
+def require_httpx() -> None:
+    """
+    Raises an ImportError if the optional `httpx` dependency is not installed.
+
+    :return: None
+    :raises ImportError: if `httpx` is missing
+    """
+    if not HTTPX_AVAILABLE:
+        raise ImportError(
+            "The asyncio API requires the 'httpx' package. Install it with"
+            " 'pip install data-attribute-recommendation-sdk[async]'."
+        )
+
+
+class AsyncTimeoutRetrySession(LoggerMixin):
+    """
+    An asyncio HTTP session combining timeout and retry policies.
+
+    This mirrors :class:`~sap.aibus.dar.client.util.http_transport.TimeoutRetrySession`
+    and uses the same defaults: requests are retried up to *num_retries* times on
+    connection errors, read errors and on the status codes in *status_forcelist*,
+    with an exponential backoff between attempts. As in
+    :class:`~sap.aibus.dar.client.util.http_transport.JitteredRetry`, the backoff is
+    capped at *max_backoff* seconds and randomized with full jitter. A *Retry-After*
+    header sent along with a 413, 429 or 503 response is honored, up to
+    *max_backoff* seconds.
+
+    If a :class:`~sap.aibus.dar.client.util.http_transport.RetryBudget` is given,
+    each retry is taken from the budget. Once the budget is exhausted, the error or
+    the failed response is passed to the caller as if all retries had been used up.
+    A budget can be shared with synchronous sessions.
+
+    Like the synchronous implementation, retries for errors which occur after the
+    connection has been established are only performed for the *GET*, *PUT* and
+    *DELETE* methods. Errors occurring before the connection is established are
+    always retried.
+
+    While waiting for a response or a retry, the event loop is free to run other
+    requests. A single session can be shared by many concurrent tasks.
+
+    .. versionadded:: 0.16.0
+        The *max_backoff*, *jitter* and *retry_budget* parameters. The delay
+        between retries is now randomized by default.
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+
+    def __init__(
+        self,
+        num_retries: int = NUM_REQUEST_RETRIES,
+        connect_timeout: float = CONNECT_TIMEOUT,
+        read_timeout: float = READ_TIMEOUT,
+        backoff_factor: float = 0.05,
+        status_forcelist: Tuple = (413, 429, 500, 502, 503, 504),
+        client: "Optional[httpx.AsyncClient]" = None,
+        max_backoff: float = BACKOFF_MAX,
+        jitter: bool = True,
+        retry_budget: Optional[RetryBudget] = None,
+    ):
+        """
+        Constructor.
+
+        :param num_retries: number of retries
+        :param connect_timeout: timeout for the connection
+        :param read_timeout: maximum time between bytes after connect
+        :param backoff_factor: factor that controls delay between retry attempts
+        :param status_forcelist: HTTP response codes that will lead to a retry
+        :param client: Optional: the `httpx.AsyncClient` to be used
+        :param max_backoff: upper bound for the delay between two retries, in seconds
+        :param jitter: whether to randomize the delay between retries
+        :param retry_budget: Optional: limits the share of retried requests
+        """
+        require_httpx()
+        self.num_retries = num_retries
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.backoff_factor = backoff_factor
+        self.status_forcelist = frozenset(status_forcelist)
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_budget = retry_budget
+        self.client = client or httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_CONNECTIONS,
+            ),
+        )
+
+    @staticmethod
+    def _get_method_whitelist():
+        return frozenset(["GET", "PUT", "DELETE"])
+
+    @staticmethod
+    async def sleep(how_long: float) -> None:
+        """
+        Sleeps for a certain amount of time without blocking the event loop.
+
+        :param how_long: how long to sleep, in seconds
+        :return: None
+        """
+        await asyncio.sleep(how_long)
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        r"""
+        Performs a request, retrying according to the retry policy.
+
+        :param method: HTTP method
+        :param url: URL of the request
+        :param \**kwargs: Any keyword args to be passed to *httpx.AsyncClient.request*
+        :return: the final `httpx.Response`
+        :raise: httpx.HTTPError if retries are exhausted without a response
+        """
+        enforce_https_except_localhost(url)
+        method = method.upper()
+        retry_allowed = method in self._get_method_whitelist()
+        if self.retry_budget is not None:
+            self.retry_budget.record_request()
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as exc:
+                if not self._may_retry(attempt):
+                    raise
+                self.log.debug("Retrying %s %s after %r", method, url, exc)
+            except (httpx.TimeoutException, httpx.NetworkError) as exc:
+                if not retry_allowed or not self._may_retry(attempt):
+                    raise
+                self.log.debug("Retrying %s %s after %r", method, url, exc)
+            else:
+                if (
+                    not retry_allowed
+                    or response.status_code not in self.status_forcelist
+                    or not self._may_retry(attempt)
+                ):
+                    return response
+                self.log.debug(
+                    "Retrying %s %s after status %s", method, url, response.status_code
+                )
+                retry_after = self._parse_retry_after(response)
+                await response.aclose()
+                if retry_after is not None:
+                    attempt += 1
+                    await self.sleep(retry_after)
+                    continue
+            attempt += 1
+            await self.sleep(self._get_backoff_time(attempt))
+
+    def _may_retry(self, attempt: int) -> bool:
+        if attempt >= self.num_retries:
+            return False
+        return self.retry_budget is None or self.retry_budget.try_spend()
+
+    def _get_backoff_time(self, attempt: int) -> float:
+        # Same formula as urllib3: no delay before the first retry.
+        if attempt <= 1:
+            return 0
+        backoff = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        if self.jitter:
+            # Not used for cryptographic purposes.
+            backoff = random.uniform(0, backoff)  # nosec
+        return backoff
+
+    def _parse_retry_after(self, response: "httpx.Response") -> Optional[float]:
+        if response.status_code not in RETRY_AFTER_STATUS_CODES:
+            return None
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                parsed = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            seconds = parsed.timestamp() - time.time()
+        return max(0.0, min(seconds, self.max_backoff))
+
+    async def get(self, url: str, **kwargs) -> "httpx.Response":
+        r"""
+        Performs a *GET* request.
+
+        :param url: URL of the request
+        :param \**kwargs: Any keyword args to be passed to *httpx.AsyncClient.request*
+        :return: the `httpx.Response`
+        """
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> "httpx.Response":
+        r"""
+        Performs a *POST* request.
+
+        :param url: URL of the request
+        :param \**kwargs: Any keyword args to be passed to *httpx.AsyncClient.request*
+        :return: the `httpx.Response`
+        """
+        return await self.request("POST", url, **kwargs)
+
+    async def put(self, url: str, **kwargs) -> "httpx.Response":
+        r"""
+        Performs a *PUT* request.
+
+        :param url: URL of the request
+        :param \**kwargs: Any keyword args to be passed to *httpx.AsyncClient.request*
+        :return: the `httpx.Response`
+        """
+        return await self.request("PUT", url, **kwargs)
+
+    async def delete(self, url: str, **kwargs) -> "httpx.Response":
+        r"""
+        Performs a *DELETE* request.
+
+        :param url: URL of the request
+        :param \**kwargs: Any keyword args to be passed to *httpx.AsyncClient.request*
+        :return: the `httpx.Response`
+        """
+        return await self.request("DELETE", url, **kwargs)
+
+    async def aclose(self) -> None:
+        """
+        Closes all connections of the underlying connection pool.
+
+        :return: None
+        """
+        await self.client.aclose()
+
+
+class AsyncTimeoutPostRetrySession(AsyncTimeoutRetrySession):
+    """
+    An AsyncTimeoutRetrySession which retries on *POST*.
+
+    This is the asyncio counterpart of
+    :class:`~sap.aibus.dar.client.util.http_transport.TimeoutPostRetrySession`. See
+    the remarks on :class:`~sap.aibus.dar.client.util.http_transport.PostRetrySession`
+    and :ref:`retry` for the trade-offs involved.
+    """
+
+    @staticmethod
+    def _get_method_whitelist():
+        return frozenset(["GET", "PUT", "DELETE", "POST"])
@@ -0,0 +1,155 @@
+"""
+This module plans inference requests by number of objects and payload size.
+"""
+from typing import Iterable, Iterator, List, Optional
+
+from sap.aibus.dar.client.util import json_codec
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+
+def encode_object(inference_object: dict) -> bytes:
+    """
+    Returns the compact JSON encoding of an inference object.
+
+    See :func:`~sap.aibus.dar.client.util.json_codec.dumps`.
+
+    :param inference_object: the object to be encoded
+    :return: UTF-8 encoded JSON
+    """
+    return json_codec.dumps(inference_object)
+
+
+class InferenceBatch:
+    """
+    The objects of a single inference request together with their JSON encoding.
+
+    The request body is assembled from the encodings of the individual objects,
+    so that each object is encoded exactly once.
+
+    .. doctest::
+
+        >>> batch = InferenceBatch(top_n=1)
+        >>> batch.append({"objectId": "1"}, encode_object({"objectId": "1"}))
+        >>> batch.to_json()
+        b'{"topN":1,"objects":[{"objectId":"1"}]}'
+        >>> batch.size == len(batch.to_json())
+        True
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, top_n: int):
+        """
+        Constructor.
+
+        :param top_n: How many predictions to return per object
+        """
+        self.top_n = top_n
+        self.objects = []  # type: List[dict]
+        self.encoded_objects = []  # type: List[bytes]
+        self._prefix = '{{"topN":{},"objects":['.format(top_n).encode("utf-8")
+        self._suffix = b"]}"
+        self.size = len(self._prefix) + len(self._suffix)
+
+    def size_with(self, encoded_object: bytes) -> int:
+        """
+        Returns the size of the request body if *encoded_object* were appended.
+
+        :param encoded_object: JSON encoding of an object
+        :return: size in bytes
+        """
+        separator = 1 if self.objects else 0
+        return self.size + separator + len(encoded_object)
+
+    def append(self, inference_object: dict, encoded_object: bytes) -> None:
+        """
+        Adds an object and its JSON encoding to the batch.
+
+        :param inference_object: the object to be classified
+        :param encoded_object: JSON encoding of the object
+        :return: None
+        """
+        self.size = self.size_with(encoded_object)
+        self.objects.append(inference_object)
+        self.encoded_objects.append(encoded_object)
+
+    def to_json(self) -> bytes:
+        """
+        Returns the JSON request body for the inference endpoint.
+
+        :return: UTF-8 encoded JSON
+        """
+        return self._prefix + b",".join(self.encoded_objects) + self._suffix
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+
+class InferenceBatchPlanner(LoggerMixin):
+    """
+    Splits inference objects into requests by number of objects and payload size.
+
+    Each batch contains at most *max_objects* objects, and its request body is at
+    most *max_bytes* bytes long. Objects are added to the current batch in input
+    order until one of the limits would be exceeded. An object which exceeds
+    *max_bytes* on its own is sent in a batch of its own, so that the service can
+    decide whether to accept it.
+
+    Example usage:
+
+    .. code-block:: python
+
+        planner = InferenceBatchPlanner(max_objects=50, max_bytes=512 * 1024)
+        for batch in planner.plan(objects, top_n=1):
+            session.post_json_to_endpoint(endpoint, batch.to_json())
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, max_objects: int, max_bytes: Optional[int] = None):
+        """
+        Constructor.
+
+        :param max_objects: maximum number of objects per batch
+        :param max_bytes: Optional: maximum size of the request body in bytes
+        """
+        if max_objects < 1:
+            raise ValueError("max_objects must be > 0, not {}".format(max_objects))
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be > 0, not {}".format(max_bytes))
+        self.max_objects = max_objects
+        self.max_bytes = max_bytes
+
+    def plan(self, objects: Iterable[dict], top_n: int) -> Iterator[InferenceBatch]:
+        """
+        Yields batches of *objects*.
+
+        The *objects* are consumed lazily. An empty *objects* iterable yields
+        nothing.
+
+        :param objects: Objects to be classified
+        :param top_n: How many predictions to return per object
+        :return: a generator of :class:`InferenceBatch`
+        """
+        batch = InferenceBatch(top_n)
+        for inference_object in objects:
+            encoded_object = encode_object(inference_object)
+            if batch.objects and (
+                len(batch) >= self.max_objects or not self._fits(batch, encoded_object)
+            ):
+                yield batch
+                batch = InferenceBatch(top_n)
+            if not batch.objects and not self._fits(batch, encoded_object):
+                self.log.warning(
+                    "Object '%s' exceeds the maximum payload size of %s bytes",
+                    inference_object.get("objectId"),
+                    self.max_bytes,
+                )
+            batch.append(inference_object, encoded_object)
+        if batch.objects:
+            yield batch
+
+    def _fits(self, batch: InferenceBatch, encoded_object: bytes) -> bool:
+        return self.max_bytes is None or (
+            batch.size_with(encoded_object) <= self.max_bytes
+        )
@@ -0,0 +1,272 @@
+"""
+This module contains a circuit breaker which lets requests fail fast while the
+DAR service is unavailable.
+"""
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+#: The circuit is closed: requests are sent.
+CLOSED = "closed"
+
+#: The circuit is open: requests fail immediately.
+OPEN = "open"
+
+#: The circuit is half-open: a limited number of probe requests is sent.
+HALF_OPEN = "half-open"
+
+
+class CircuitBreaker(LoggerMixin):
+    """
+    Tracks the outcome of requests and stops sending requests while most fail.
+
+    The circuit breaker has three states:
+
+    * *closed*: requests are sent and their outcome is recorded. If at least
+      *minimum_requests* requests finished within the last *window* seconds and at
+      least *failure_rate_threshold* of them failed, the circuit opens.
+    * *open*: :meth:`allow_request` returns False, so that the caller can fail
+      immediately instead of waiting for timeouts and retries. After
+      *open_duration* seconds, the circuit becomes half-open.
+    * *half-open*: up to *half_open_requests* probe requests are allowed at a time.
+      If a probe succeeds, the circuit closes. If it fails, the circuit opens again.
+
+    Instances are thread-safe.
+
+    .. versionadded:: 0.16.0
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+
+    def __init__(
+        self,
+        failure_rate_threshold: float = 0.5,
+        minimum_requests: int = 10,
+        window: float = 60.0,
+        open_duration: float = 30.0,
+        half_open_requests: int = 1,
+        timer: Optional[Callable[[], float]] = None,
+    ):
+        """
+        Constructor.
+
+        :param failure_rate_threshold: share of failed requests at which the
+            circuit opens, between 0 and 1
+        :param minimum_requests: minimum number of requests within the window
+            before the circuit can open
+        :param window: length of the sliding window in seconds
+        :param open_duration: time in seconds until an open circuit lets probe
+            requests pass
+        :param half_open_requests: number of concurrent probe requests
+        :param timer: Optional: Timer function, mainly useful for unit tests
+        """
+        if not 0 < failure_rate_threshold <= 1:
+            raise ValueError(
+                "failure_rate_threshold must be in (0, 1], not {}".format(
+                    failure_rate_threshold
+                )
+            )
+        if minimum_requests < 1:
+            raise ValueError(
+                "minimum_requests must be > 0, not {}".format(minimum_requests)
+            )
+        if half_open_requests < 1:
+            raise ValueError(
+                "half_open_requests must be > 0, not {}".format(half_open_requests)
+            )
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_requests = minimum_requests
+        self.window = window
+        self.open_duration = open_duration
+        self.half_open_requests = half_open_requests
+        self.timer = time.monotonic if timer is None else timer
+
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes = 0
+        # (timestamp, failed) per finished request in the closed state
+        self._outcomes = deque()  # type: deque
+        self._failures = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """
+        The current state: *closed*, *open* or *half-open*.
+
+        :return: the state
+        """
+        with self._lock:
+            self._update_state()
+            return self._state
+
+    def remaining_open_time(self) -> float:
+        """
+        Returns the time in seconds until an open circuit becomes half-open.
+
+        :return: remaining time, or zero if the circuit is not open
+        """
+        with self._lock:
+            self._update_state()
+            if self._state != OPEN:
+                return 0.0
+            return self._opened_at + self.open_duration - self.timer()
+
+    def allow_request(self) -> bool:
+        """
+        Returns whether a request may be sent.
+
+        If this method returns True, the outcome of the request must be reported
+        with :meth:`record_success`, :meth:`record_failure` or :meth:`release`.
+
+        :return: True if the request may be sent
+        """
+        with self._lock:
+            self._update_state()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_requests:
+                self._probes += 1
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """
+        Records a successful request.
+
+        :return: None
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self.log.info("Probe request succeeded, closing circuit")
+                self._state = CLOSED
+                self._probes = 0
+            elif self._state == CLOSED:
+                self._record_outcome(failed=False)
+
+    def record_failure(self) -> None:
+        """
+        Records a failed request.
+
+        :return: None
+        """
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self.log.warning("Probe request failed, opening circuit again")
+                self._open()
+                return
+            if self._state == CLOSED:
+                self._record_outcome(failed=True)
+                if self._should_open():
+                    self.log.warning(
+                        "%s of %s requests failed, opening circuit for %s seconds",
+                        self._failures,
+                        len(self._outcomes),
+                        self.open_duration,
+                    )
+                    self._open()
+
+    def release(self) -> None:
+        """
+        Reports that a request allowed by :meth:`allow_request` finished without
+        a meaningful outcome, e.g. because of a programming error.
+
+        :return: None
+        """
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self.timer()
+        self._probes = 0
+        self._outcomes.clear()
+        self._failures = 0
+
+    def _update_state(self) -> None:
+        if self._state == OPEN and self.timer() >= self._opened_at + self.open_duration:
+            self._state = HALF_OPEN
+            self._probes = 0
+
+    def _record_outcome(self, failed: bool) -> None:
+        now = self.timer()
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        while self._outcomes and self._outcomes[0][0] <= now - self.window:
+            _, expired_failed = self._outcomes.popleft()
+            self._failures -= expired_failed
+
+    def _should_open(self) -> bool:
+        count = len(self._outcomes)
+        return (
+            count >= self.minimum_requests
+            and self._failures >= self.failure_rate_threshold * count
+        )
+
+
+class CircuitBreakerRegistry:
+    """
+    Holds one :class:`CircuitBreaker` per host and endpoint family.
+
+    The endpoint family is the first component of the URL path, such as
+    *inference*, *data-manager* or *model-manager*. An outage of one family thus
+    does not stop requests to the others.
+
+    All circuit breakers are created with the keyword arguments passed to the
+    constructor. Share an instance between several sessions to share the circuit
+    breakers as well.
+
+    .. doctest::
+
+        >>> registry = CircuitBreakerRegistry(open_duration=10)
+        >>> breaker = registry.get("https://example.com/inference/api/v3/models")
+        >>> breaker is registry.get("https://example.com/inference/api/v3/jobs")
+        True
+        >>> breaker is registry.get("https://example.com/model-manager/api/v3/jobs")
+        False
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, **breaker_kwargs):
+        r"""
+        Constructor.
+
+        :param \**breaker_kwargs: keyword args for :class:`CircuitBreaker`
+        """
+        # Fail early on invalid arguments.
+        CircuitBreaker(**breaker_kwargs)
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers = {}  # type: Dict[Tuple[str, str], CircuitBreaker]
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(url: str) -> Tuple[str, str]:
+        """
+        Returns the host and endpoint family of a URL.
+
+        :param url: a fully-qualified URL
+        :return: tuple of host and first path component
+        """
+        parts = urlsplit(url)
+        family = parts.path.lstrip("/").split("/", 1)[0]
+        return parts.netloc, family
+
+    def get(self, url: str) -> CircuitBreaker:
+        """
+        Returns the circuit breaker responsible for a URL.
+
+        :param url: a fully-qualified URL
+        :return: the circuit breaker
+        """
+        key = self.key(url)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(**self.breaker_kwargs)
+            return breaker
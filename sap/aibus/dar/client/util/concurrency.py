@@ -0,0 +1,151 @@
+"""
+This module contains an adaptive concurrency limit for parallel requests.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+#: Latency relative to the fastest observed request above which a request is
+#: considered slow, if no explicit latency threshold is configured.
+LATENCY_TOLERANCE = 2.0
+
+
+class AdaptiveConcurrencyLimit(LoggerMixin):
+    """
+    Limits the number of concurrent requests using an AIMD algorithm.
+
+    AIMD stands for *additive increase, multiplicative decrease*, the algorithm used
+    by TCP congestion control. While requests succeed quickly, the limit grows by
+    about one request per round-trip. If a request is rejected because the service is
+    overloaded or the request is slow, the limit is multiplied by *decrease_factor*.
+    The limit always stays between *min_limit* and *max_limit*.
+
+    A request counts as slow if it takes longer than *latency_threshold* seconds. If
+    no threshold is given, a request is slow if it takes longer than
+    *LATENCY_TOLERANCE* times the fastest request observed so far.
+
+    To avoid overreacting, the limit is decreased at most once for all requests which
+    were started before the previous decrease.
+
+    The current value is exposed via :attr:`limit`. After a bulk operation,
+    it reflects the level of concurrency the algorithm settled on.
+
+    Instances are thread-safe. A single instance can be shared between several bulk
+    operations, in which case the limit applies to all of them together and the
+    learned limit carries over from one operation to the next.
+
+    .. versionadded:: 0.16.0
+    """
+
+    # pylint: disable=too-many-instance-attributes,too-many-arguments
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        max_limit: int = 16,
+        min_limit: int = 1,
+        latency_threshold: Optional[float] = None,
+        decrease_factor: float = 0.5,
+        timer: Optional[Callable[[], float]] = None,
+    ):
+        """
+        Constructor.
+
+        :param initial_limit: concurrency limit to start with
+        :param max_limit: ceiling for the concurrency limit
+        :param min_limit: floor for the concurrency limit
+        :param latency_threshold: Optional: latency in seconds above which a request
+            is considered slow
+        :param decrease_factor: factor applied to the limit on overload
+        :param timer: Optional: Timer function, mainly useful for unit tests
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError(
+                "Expected 1 <= min_limit <= initial_limit <= max_limit, got"
+                " {} / {} / {}".format(min_limit, initial_limit, max_limit)
+            )
+        if not 0 < decrease_factor < 1:
+            raise ValueError(
+                "decrease_factor must be in (0, 1), not {}".format(decrease_factor)
+            )
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_threshold = latency_threshold
+        self.decrease_factor = decrease_factor
+        self.timer = time.monotonic if timer is None else timer
+
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._min_latency = None  # type: Optional[float]
+        self._last_decrease = float("-inf")
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """
+        The current concurrency limit.
+
+        :return: maximum number of concurrent requests at this point in time
+        """
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of currently acquired slots.
+
+        :return: number of requests in flight
+        """
+        return self._in_flight
+
+    def acquire(self) -> float:
+        """
+        Blocks until a request may be started and acquires a slot for it.
+
+        Each call must be followed by a call to :meth:`release`.
+
+        :return: start timestamp of the request, to be passed to :meth:`release`
+        """
+        with self._condition:
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+            self._in_flight += 1
+            return self.timer()
+
+    def release(self, started_at: float, overloaded: bool = False) -> None:
+        """
+        Releases the slot of a finished request and adjusts the limit.
+
+        :param started_at: the value returned by the corresponding :meth:`acquire`
+        :param overloaded: whether the service indicated that it is overloaded, e.g.
+            by returning HTTP status code 429 or 503 or by timing out
+        :return: None
+        """
+        with self._condition:
+            self._in_flight -= 1
+            now = self.timer()
+            latency = now - started_at
+            if not overloaded:
+                if self._min_latency is None or latency < self._min_latency:
+                    self._min_latency = latency
+                overloaded = latency > self._get_latency_threshold()
+
+            if overloaded:
+                if started_at >= self._last_decrease:
+                    self._last_decrease = now
+                    self._limit = max(
+                        float(self.min_limit), self._limit * self.decrease_factor
+                    )
+                    self.log.debug("Decreased concurrency limit to %s", self.limit)
+            else:
+                self._limit = min(float(self.max_limit), self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+    def _get_latency_threshold(self) -> float:
+        if self.latency_threshold is not None:
+            return self.latency_threshold
+        if self._min_latency is None:
+            return float("inf")
+        return self._min_latency * LATENCY_TOLERANCE
@@ -0,0 +1,43 @@
+"""
+Utilities for the features of inference objects.
+"""
+import hashlib
+import json
+
+
+def features_fingerprint(inference_object: dict) -> str:
+    """
+    Returns a canonical hash of the features of an inference object.
+
+    Two objects have the same fingerprint if they have the same feature names and
+    values, regardless of the order of the features and of any other keys such as
+    the *objectId*.
+
+    .. doctest::
+
+        >>> first = {
+        ...     "objectId": "1",
+        ...     "features": [
+        ...         {"name": "manufacturer", "value": "ACME"},
+        ...         {"name": "description", "value": "Anvil"},
+        ...     ],
+        ... }
+        >>> second = {
+        ...     "objectId": "2",
+        ...     "features": [
+        ...         {"name": "description", "value": "Anvil"},
+        ...         {"name": "manufacturer", "value": "ACME"},
+        ...     ],
+        ... }
+        >>> features_fingerprint(first) == features_fingerprint(second)
+        True
+
+    :param inference_object: an object as passed to the inference endpoint
+    :return: hex digest identifying the features
+    """
+    features = sorted(
+        (feature["name"], feature["value"])
+        for feature in inference_object.get("features", [])
+    )
+    encoded = json.dumps(features, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,167 @@
+"""
+This module implements hedged requests to reduce tail latency.
+"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Optional, TypeVar
+
+from sap.aibus.dar.client.util.http_transport import RetryBudget
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+Result = TypeVar("Result")
+
+
+class HedgingPolicy(LoggerMixin):
+    """
+    Sends a duplicate ("hedged") request if the first request is slow and uses
+    whichever response arrives first.
+
+    Most requests finish quickly, but a small share takes much longer, for example
+    because it hit a busy instance of the service. If the response to a request has
+    not arrived after a delay, a hedged request is sent. The caller receives the
+    first successful response; the other response is discarded. If both requests
+    fail, the error of the first request is raised.
+
+    By default, the delay is the *percentile* of the latencies observed so far, so
+    that only the slowest requests are hedged. Until *min_samples* latencies have
+    been observed, *initial_delay* is used. A fixed *delay* can be configured
+    instead.
+
+    Each hedged request is an additional request to the service, which is charged
+    for non-trial service instances. To cap the cost, at most *max_extra_ratio*
+    hedged requests per request are sent within a sliding window of *window*
+    seconds. See :ref:`hedging` for the trade-offs involved.
+
+    Keep a single instance for all requests of a kind: the observed latencies and
+    the budget for hedged requests are stored in the instance. Instances are
+    thread-safe.
+
+    Example usage:
+
+    .. code-block:: python
+
+        hedging = HedgingPolicy(percentile=95, max_extra_ratio=0.05)
+        response = client.create_inference_request(
+            "my-model", objects, hedging=hedging
+        )
+
+    .. versionadded:: 0.16.0
+    """
+
+    # pylint: disable=too-many-arguments,too-many-instance-attributes
+
+    def __init__(
+        self,
+        percentile: float = 95,
+        delay: Optional[float] = None,
+        initial_delay: float = 1.0,
+        min_samples: int = 20,
+        max_samples: int = 1000,
+        max_extra_ratio: float = 0.05,
+        window: float = 60.0,
+        timer: Optional[Callable[[], float]] = None,
+    ):
+        """
+        Constructor.
+
+        :param percentile: percentile of observed latencies after which a hedged
+            request is sent, between 0 and 100
+        :param delay: Optional: fixed delay in seconds after which a hedged
+            request is sent. Overrides *percentile*.
+        :param initial_delay: delay in seconds used until *min_samples* latencies
+            have been observed
+        :param min_samples: number of observed latencies required before the
+            percentile is used
+        :param max_samples: number of most recent latencies kept
+        :param max_extra_ratio: maximum number of hedged requests per request
+        :param window: length in seconds of the sliding window in which
+            *max_extra_ratio* is enforced
+        :param timer: Optional: Timer function, mainly useful for unit tests
+        """
+        if not 0 < percentile <= 100:
+            raise ValueError(
+                "percentile must be in (0, 100], not {}".format(percentile)
+            )
+        if delay is not None and delay < 0:
+            raise ValueError("delay must be >= 0, not {}".format(delay))
+        if min_samples < 1 or max_samples < min_samples:
+            raise ValueError(
+                "Expected 1 <= min_samples <= max_samples, got {} / {}".format(
+                    min_samples, max_samples
+                )
+            )
+        self.percentile = percentile
+        self.delay = delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_extra_ratio = max_extra_ratio
+        self.timer = time.monotonic if timer is None else timer
+        self.hedged_count = 0
+        self._budget = RetryBudget(
+            ratio=max_extra_ratio, min_retries=0, window=window, timer=self.timer
+        )
+        self._latencies = deque(maxlen=max_samples)  # type: deque
+        self._lock = threading.Lock()
+
+    def current_delay(self) -> float:
+        """
+        Returns the delay after which a hedged request is sent.
+
+        :return: delay in seconds
+        """
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.initial_delay
+            latencies = sorted(self._latencies)
+        index = math.ceil(len(latencies) * self.percentile / 100) - 1
+        return latencies[max(0, index)]
+
+    def call(self, func: Callable[[], Result]) -> Result:
+        """
+        Calls *func*, and calls it a second time in parallel if the first call
+        does not return within :meth:`current_delay`.
+
+        *func* must be safe to call twice.
+
+        :param func: function which sends the request
+        :return: the result of the call which finished first without an error
+        """
+        delay = self.current_delay()
+        self._budget.record_request()
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            primary = self._submit(executor, func)
+            done, _ = wait([primary], timeout=delay)
+            if done or not self._budget.try_spend():
+                return primary.result()
+
+            with self._lock:
+                self.hedged_count += 1
+            self.log.debug("No response after %.3f seconds, hedging request", delay)
+            pending = {primary, self._submit(executor, func)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        return future.result()
+            return primary.result()
+        finally:
+            # Do not wait for the slower request.
+            executor.shutdown(wait=False)
+
+    def _submit(self, executor: ThreadPoolExecutor, func: Callable) -> Future:
+        started_at = self.timer()
+        future = executor.submit(func)
+
+        def record_latency(finished: Future) -> None:
+            if finished.exception() is None:
+                with self._lock:
+                    self._latencies.append(self.timer() - started_at)
+
+        future.add_done_callback(record_latency)
+        return future
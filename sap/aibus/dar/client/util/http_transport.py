@@ -5,15 +5,22 @@
 This module contains implementations of best practices
 for the interaction with other services over HTTP.
 """
-from typing import Tuple
+import random
+import threading
+import time
+from collections import deque
+from itertools import takewhile
+from typing import Callable, Optional, Tuple
 
 from requests.adapters import HTTPAdapter
 from requests import Session, Response
 from typing_extensions import Protocol
 
 from urllib3 import Retry
+from urllib3.exceptions import MaxRetryError, ResponseError
 
 from sap.aibus.dar.client.exceptions import HTTPSRequired
+from sap.aibus.dar.client.util.logging import LoggerMixin
 
 READ_TIMEOUT = 240
 
@@ -21,6 +28,16 @@ CONNECT_TIMEOUT = 240
 
 NUM_REQUEST_RETRIES = 7  # total number of request retries
 
+#: Upper bound for the delay between two retries, in seconds
+BACKOFF_MAX = 120
+
+#: Status codes for which a *Retry-After* header sent by the server is honored
+RETRY_AFTER_STATUS_CODES = frozenset([413, 429, 503])
+
+#: Default number of connections kept open per host, and default number of hosts
+#: for which connections are kept open
+DEFAULT_POOL_SIZE = 10
+
 
 class HttpMethodsProtocol(Protocol):
     """
@@ -151,19 +168,235 @@ class HttpMethodsMixin(HttpMethodsProtocol):
         return self.session.adapters
 
 
-class RetrySession(HttpMethodsMixin):  # pylint: disable=too-few-public-methods
+class RetryBudget(LoggerMixin):
+    """
+    Limits the share of retries among all requests.
+
+    If the service is degraded, each client retrying each failed request several
+    times multiplies the load on the service. A retry budget caps this
+    amplification: within a sliding window of *window* seconds, at most
+    *min_retries* plus *ratio* times the number of requests are retried. Once the
+    budget is spent, failed requests are not retried until older requests and
+    retries have left the window.
+
+    A single budget can be shared by several sessions, for example by all sessions
+    of a :class:`~sap.aibus.dar.client.dar_session.DARSession`, so that it applies
+    to the client as a whole. Instances are thread-safe.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(
+        self,
+        ratio: float = 0.2,
+        min_retries: int = 10,
+        window: float = 10.0,
+        timer: Optional[Callable[[], float]] = None,
+    ):
+        """
+        Constructor.
+
+        :param ratio: maximum number of retries per request within the window,
+            in addition to *min_retries*
+        :param min_retries: number of retries permitted within the window
+            irrespective of the number of requests
+        :param window: length of the sliding window in seconds
+        :param timer: Optional: Timer function, mainly useful for unit tests
+        """
+        if ratio < 0:
+            raise ValueError("ratio must be >= 0, not {}".format(ratio))
+        if min_retries < 0:
+            raise ValueError("min_retries must be >= 0, not {}".format(min_retries))
+        if window <= 0:
+            raise ValueError("window must be > 0, not {}".format(window))
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self.timer = time.monotonic if timer is None else timer
+        self._requests = deque()  # type: deque
+        self._retries = deque()  # type: deque
+        self._lock = threading.Lock()
+
+    def record_request(self) -> None:
+        """
+        Records an initial request, which increases the budget.
+
+        :return: None
+        """
+        with self._lock:
+            self._requests.append(self.timer())
+
+    def try_spend(self) -> bool:
+        """
+        Records a retry if the budget permits it.
+
+        :return: True if the retry may be performed
+        """
+        with self._lock:
+            now = self.timer()
+            for timestamps in (self._requests, self._retries):
+                while timestamps and timestamps[0] <= now - self.window:
+                    timestamps.popleft()
+            if len(self._retries) >= self.min_retries + self.ratio * len(
+                self._requests
+            ):
+                self.log.debug("Retry budget exhausted, not retrying")
+                return False
+            self._retries.append(now)
+            return True
+
+
+class JitteredRetry(Retry):
+    """
+    A :class:`urllib3.util.retry.Retry` with full-jitter backoff, a maximum delay
+    and an optional retry budget.
+
+    With exponential backoff alone, clients which failed at the same time retry at
+    the same time, too. With full jitter, the delay before a retry is chosen
+    uniformly at random between zero and the exponential backoff time, which is
+    capped at *max_backoff* seconds. This spreads retries over time.
+
+    A *Retry-After* header sent along with status code 413, 429 or 503 takes
+    precedence over the backoff, but is capped at *max_backoff* as well.
+
+    If a :class:`RetryBudget` is given, each retry is taken from the budget. Once
+    the budget is exhausted, the error or the failed response is passed to the
+    caller as if all retries had been used up.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(
+        self,
+        *args,
+        max_backoff: float = BACKOFF_MAX,
+        jitter: bool = True,
+        retry_budget: Optional[RetryBudget] = None,
+        **kwargs,
+    ):
+        r"""
+        Constructor.
+
+        :param \*args: positional args for :class:`urllib3.util.retry.Retry`
+        :param max_backoff: upper bound for the delay between two retries
+        :param jitter: whether to randomize the delay between retries
+        :param retry_budget: Optional: budget shared with other requests
+        :param \**kwargs: keyword args for :class:`urllib3.util.retry.Retry`
+        """
+        super().__init__(*args, **kwargs)
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_budget = retry_budget
+
+    def new(self, **kw):
+        kw.setdefault("max_backoff", self.max_backoff)
+        kw.setdefault("jitter", self.jitter)
+        kw.setdefault("retry_budget", self.retry_budget)
+        return super().new(**kw)
+
+    def get_backoff_time(self) -> float:
+        # Same as urllib3: no delay before the first retry of a series of errors.
+        consecutive_errors = len(
+            list(
+                takewhile(lambda x: x.redirect_location is None, reversed(self.history))
+            )
+        )
+        if consecutive_errors <= 1:
+            return 0
+        backoff = min(
+            self.max_backoff, self.backoff_factor * (2 ** (consecutive_errors - 1))
+        )
+        if self.jitter:
+            # Not used for cryptographic purposes.
+            backoff = random.uniform(0, backoff)  # nosec
+        return backoff
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, self.max_backoff)
+
+    def increment(  # pylint: disable=too-many-arguments
+        self,
+        method=None,
+        url=None,
+        response=None,
+        error=None,
+        _pool=None,
+        _stacktrace=None,
+    ):
+        new_retry = super().increment(
+            method=method,
+            url=url,
+            response=response,
+            error=error,
+            _pool=_pool,
+            _stacktrace=_stacktrace,
+        )
+        if self.retry_budget is not None and not self.retry_budget.try_spend():
+            reason = error or ResponseError("retry budget exhausted")
+            raise MaxRetryError(_pool, url, reason) from reason
+        return new_retry
+
+
+class _RetryBudgetAdapter(HTTPAdapter):
+    """
+    Records each request sent via the adapter in a :class:`RetryBudget`.
+    """
+
+    def __init__(self, retry_budget: RetryBudget, **kwargs):
+        self.retry_budget = retry_budget
+        super().__init__(**kwargs)
+
+    def send(self, request, *args, **kwargs):  # pylint: disable=arguments-differ
+        self.retry_budget.record_request()
+        return super().send(request, *args, **kwargs)
+
+
+class RetrySession(HttpMethodsMixin, LoggerMixin):
     """
     HTTP connection with retry built-in.
 
     Retry is allowed for GET, PUT and DELETE HTTP method verbs.
+
+    The delay between retries grows exponentially with *backoff_factor* up to
+    *max_backoff* seconds and is randomized with full jitter, see
+    :class:`JitteredRetry`. A *Retry-After* header in a response with status code
+    413, 429 or 503 is honored.
+
+    Connections are kept open and reused for subsequent requests to the same host.
+    At most *pool_maxsize* idle connections are kept per host; additional
+    connections needed by concurrent requests are closed after use, so that the next
+    request has to establish a new connection, including the TLS handshake. If
+    *pool_block* is True, concurrent requests wait for a free connection instead.
+    The pool can be enlarged later with :meth:`ensure_pool_size`. If *keep_alive* is
+    False, each connection is closed after a single request.
+
+    .. versionadded:: 0.16.0
+        The *max_backoff*, *jitter* and *retry_budget* parameters. The delay
+        between retries is now randomized by default.
+
+    .. versionadded:: 0.16.0
+        The *pool_connections*, *pool_maxsize*, *pool_block* and *keep_alive*
+        parameters.
     """
 
+    # pylint: disable=too-many-arguments,too-many-locals
+
     def __init__(
         self,
         num_retries: int,
         session: Session = None,
         backoff_factor: float = 0.05,
         status_forcelist: Tuple = (413, 429, 500, 502, 503, 504),
+        max_backoff: float = BACKOFF_MAX,
+        jitter: bool = True,
+        retry_budget: Optional[RetryBudget] = None,
+        pool_connections: int = DEFAULT_POOL_SIZE,
+        pool_maxsize: int = DEFAULT_POOL_SIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True,
     ):
         """
         Constructor.
@@ -174,10 +407,24 @@ class RetrySession(HttpMethodsMixin):  # pylint: disable=too-few-public-methods
         :param backoff_factor: factor that controls delay between single retry attempts
         :param status_forcelist: a set of integer HTTP response codes that will lead
             to retry.
+        :param max_backoff: upper bound for the delay between two retries, in seconds
+        :param jitter: whether to randomize the delay between retries
+        :param retry_budget: Optional: limits the share of retried requests
+        :param pool_connections: number of hosts for which connections are kept open
+        :param pool_maxsize: number of connections kept open per host
+        :param pool_block: whether to wait for a free connection if *pool_maxsize*
+            connections to a host are in use
+        :param keep_alive: whether to reuse connections for subsequent requests
         """
         super().__init__()
+        for name, size in [
+            ("pool_connections", pool_connections),
+            ("pool_maxsize", pool_maxsize),
+        ]:
+            if size < 1:
+                raise ValueError("{} must be > 0, not {}".format(name, size))
         session = session or Session()
-        retry = Retry(
+        retry = JitteredRetry(
             total=num_retries,
             read=num_retries,
             connect=num_retries,
@@ -186,12 +433,65 @@ class RetrySession(HttpMethodsMixin):  # pylint: disable=too-few-public-methods
             allowed_methods=self._get_method_whitelist(),
             status_forcelist=status_forcelist,
             raise_on_status=False,
+            max_backoff=max_backoff,
+            jitter=jitter,
+            retry_budget=retry_budget,
         )
-        adapter = HTTPAdapter(max_retries=retry)
+        if retry_budget is not None:
+            adapter = _RetryBudgetAdapter(
+                retry_budget,
+                max_retries=retry,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )  # type: HTTPAdapter
+        else:
+            adapter = HTTPAdapter(
+                max_retries=retry,
+                pool_connections=pool_connections,
+                pool_maxsize=pool_maxsize,
+                pool_block=pool_block,
+            )
         session.mount("http://", adapter)
         session.mount("https://", adapter)
+        if not keep_alive:
+            session.headers["Connection"] = "close"
 
         self.session = session
+        self.adapter = adapter
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self._pool_lock = threading.Lock()
+
+    def ensure_pool_size(self, pool_maxsize: int) -> None:
+        """
+        Enlarges the connection pool to keep at least *pool_maxsize* connections
+        per host open.
+
+        Does nothing if the pool is already large enough. Otherwise, idle
+        connections are closed and new connections are opened as needed.
+
+        .. versionadded:: 0.16.0
+
+        :param pool_maxsize: number of connections kept open per host
+        :return: None
+        """
+        with self._pool_lock:
+            if pool_maxsize <= self.pool_maxsize:
+                return
+            self.log.debug(
+                "Enlarging connection pool from %s to %s connections per host",
+                self.pool_maxsize,
+                pool_maxsize,
+            )
+            old_pool_manager = self.adapter.poolmanager
+            self.adapter.init_poolmanager(
+                self.pool_connections, pool_maxsize, block=self.pool_block
+            )
+            self.pool_maxsize = pool_maxsize
+            # Connections currently in use are closed when they are returned.
+            old_pool_manager.clear()
 
     @staticmethod
     def _get_method_whitelist():
@@ -286,11 +586,20 @@ class TimeoutRetrySession(HttpMethodsMixin):
         requests.exceptions.ConnectionError: ... Max retries exceeded with url: ...
     """
 
+    # pylint: disable=too-many-arguments
+
     def __init__(
         self,
         num_retries: int = NUM_REQUEST_RETRIES,
         connect_timeout: float = CONNECT_TIMEOUT,
         read_timeout: float = READ_TIMEOUT,
+        max_backoff: float = BACKOFF_MAX,
+        jitter: bool = True,
+        retry_budget: Optional[RetryBudget] = None,
+        pool_connections: int = DEFAULT_POOL_SIZE,
+        pool_maxsize: int = DEFAULT_POOL_SIZE,
+        pool_block: bool = False,
+        keep_alive: bool = True,
     ):
         """
         Constructor.
@@ -301,19 +610,49 @@ class TimeoutRetrySession(HttpMethodsMixin):
             num_retries: Number of retries
             connect_timeout: connect timeout
             read_timeout: read timeout
+            max_backoff: upper bound for the delay between two retries, in seconds
+            jitter: whether to randomize the delay between retries
+            retry_budget: Optional: limits the share of retried requests, see
+                :class:`RetryBudget`
+            pool_connections: number of hosts for which connections are kept open
+            pool_maxsize: number of connections kept open per host
+            pool_block: whether to wait for a free connection if *pool_maxsize*
+                connections to a host are in use
+            keep_alive: whether to reuse connections for subsequent requests
         """
         super().__init__()
-        retry_session = self._make_retry_session(num_retries)
+        retry_session = self._make_retry_session(
+            num_retries,
+            max_backoff=max_backoff,
+            jitter=jitter,
+            retry_budget=retry_budget,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+            keep_alive=keep_alive,
+        )
         timeout_session = TimeoutSession(
             session=retry_session,
             connect_timeout=connect_timeout,
             read_timeout=read_timeout,
         )
         self.session = timeout_session
+        self.retry_session = retry_session
+
+    def ensure_pool_size(self, pool_maxsize: int) -> None:
+        """
+        Enlarges the connection pool, see :meth:`RetrySession.ensure_pool_size`.
+
+        .. versionadded:: 0.16.0
+
+        :param pool_maxsize: number of connections kept open per host
+        :return: None
+        """
+        self.retry_session.ensure_pool_size(pool_maxsize)
 
     @staticmethod
-    def _make_retry_session(num_retries):
-        return RetrySession(num_retries)
+    def _make_retry_session(num_retries, **kwargs):
+        return RetrySession(num_retries, **kwargs)
 
 
 class TimeoutPostRetrySession(TimeoutRetrySession):
@@ -328,8 +667,8 @@ class TimeoutPostRetrySession(TimeoutRetrySession):
     """
 
     @staticmethod
-    def _make_retry_session(num_retries):
-        return PostRetrySession(num_retries)
+    def _make_retry_session(num_retries, **kwargs):
+        return PostRetrySession(num_retries, **kwargs)
 
 
 def enforce_https_except_localhost(url: str):
@@ -342,3 +681,22 @@ def enforce_https_except_localhost(url: str):
     """
     if not url.startswith("https") and not url.startswith("http://localhost"):
         raise HTTPSRequired
+
+
+def normalize_base_url(base_url: str) -> str:
+    """
+    Removes a trailing slash from the base URL of a service and enforces HTTPS.
+
+    .. doctest::
+
+        >>> normalize_base_url("https://example.com/")
+        'https://example.com'
+
+    :param base_url: Base URL of the service
+    :return: the normalized URL
+    :raises HTTPSRequired: if given url does not start with https
+    """
+    if base_url[-1] == "/":
+        base_url = base_url[:-1]
+    enforce_https_except_localhost(base_url)
+    return base_url
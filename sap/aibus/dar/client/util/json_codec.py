@@ -0,0 +1,107 @@
+"""
+This module encodes and decodes JSON with the fastest available library.
+
+If the optional `orjson`_ or `ujson`_ package is installed, it is used to encode
+request bodies and to decode inference responses. Otherwise, the :mod:`json`
+module of the standard library is used. To install `orjson` together with the
+SDK::
+
+    pip install data-attribute-recommendation-sdk[fast-json]
+
+.. _orjson: https://github.com/ijl/orjson
+.. _ujson: https://github.com/ultrajson/ultrajson
+"""
+import json
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    _ORJSON_AVAILABLE = False
+else:
+    _ORJSON_AVAILABLE = True
+
+try:
+    import ujson
+except ImportError:  # pragma: no cover
+    _UJSON_AVAILABLE = False
+else:
+    _UJSON_AVAILABLE = True
+
+
+def _select_backend() -> str:
+    if _ORJSON_AVAILABLE:
+        return "orjson"
+    if _UJSON_AVAILABLE:  # pragma: no cover
+        return "ujson"
+    return "json"  # pragma: no cover
+
+
+#: Name of the library used for encoding and decoding: "orjson", "ujson" or "json"
+BACKEND = _select_backend()
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Returns the compact UTF-8 encoded JSON representation of *obj*.
+
+    Non-ASCII characters are not escaped. The output is identical for all
+    backends as long as *obj* only contains JSON types.
+
+    .. doctest::
+
+        >>> dumps({"name": "café", "value": [1, 2]})
+        b'{"name":"caf\\xc3\\xa9","value":[1,2]}'
+
+    :param obj: the object to be encoded
+    :return: UTF-8 encoded JSON
+    """
+    if BACKEND == "orjson":
+        return orjson.dumps(obj)
+    if BACKEND == "ujson":
+        return ujson.dumps(
+            obj, ensure_ascii=False, escape_forward_slashes=False
+        ).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """
+    Decodes a JSON document.
+
+    :param data: UTF-8 encoded JSON
+    :return: the decoded object
+    """
+    if BACKEND == "orjson":
+        return orjson.loads(data)
+    if BACKEND == "ujson":
+        return ujson.loads(data)
+    return json.loads(data)
+
+
+def is_fast() -> bool:
+    """
+    Returns whether a faster library than the standard library is used.
+
+    :return: True if `orjson` or `ujson` is used
+    """
+    return BACKEND != "json"
+
+
+def response_json(response) -> Any:
+    """
+    Decodes the JSON body of a response.
+
+    With the standard library backend, this is equivalent to
+    :meth:`requests.Response.json`.
+
+    All backends raise a :exc:`ValueError` if the body is not valid JSON, but
+    only the standard library backend raises the `JSONDecodeError` of `requests`.
+
+    :param response: a :class:`requests.Response` or :class:`httpx.Response`
+    :return: the decoded body
+    :raises ValueError: if the body is not valid JSON
+    """
+    if not is_fast():
+        return response.json()
+    return loads(response.content)
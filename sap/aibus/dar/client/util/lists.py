@@ -1,7 +1,8 @@
 """
 Utilities for lists.
 """
-from typing import List, TypeVar, Iterator
+from itertools import islice
+from typing import Iterable, Iterator, List, TypeVar
 
 Item = TypeVar("Item")
 
@@ -22,3 +23,26 @@ def split_list(input_list: List[Item], slice_size: int) -> Iterator[List[Item]]:
 
     for idx in range(0, len(input_list), slice_size):
         yield input_list[idx : idx + slice_size]
+
+
+def split_iterable(iterable: Iterable[Item], slice_size: int) -> Iterator[List[Item]]:
+    """
+    Yields lists of up to *slice_size* items consumed lazily from *iterable*.
+
+    Unlike :func:`split_list`, the input does not need to be a list and is never
+    fully materialized: at most *slice_size* items are held at a time. An empty
+    *iterable* yields nothing.
+
+    :param iterable: iterable or iterator to be divided
+    :param slice_size: maximum size of each yielded list
+    :return: a generator
+    """
+    if slice_size < 1:
+        raise ValueError("slice_size must be > 0, not {}".format(slice_size))
+
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, slice_size))
+        if not chunk:
+            return
+        yield chunk
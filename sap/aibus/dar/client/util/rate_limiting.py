@@ -0,0 +1,259 @@
+"""
+This module contains client-side rate limiters for requests to the DAR service.
+
+A rate limiter smooths the load generated by a client: instead of sending a burst
+of requests which the service rejects with HTTP status code 429 and which then
+have to be retried, requests are delayed on the client side.
+
+:class:`TokenBucket` limits the rate within a single process.
+:class:`SqliteTokenBucket` keeps its state in a SQLite database, so that several
+processes on the same host can share one limit.
+"""
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from sap.aibus.dar.client.util.logging import LoggerMixin
+
+#: How long in seconds to wait for another process to release the lock on the
+#: database of a :class:`SqliteTokenBucket`
+SQLITE_LOCK_TIMEOUT = 30.0
+
+
+class RateLimiter:
+    """
+    Abstract base class for rate limiters.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def acquire(self, amount: float = 1) -> float:
+        """
+        Blocks until *amount* units may be consumed, e.g. one request or the
+        number of objects in a request.
+
+        Must be implemented by subclasses.
+
+        :param amount: number of units to consume
+        :return: the time in seconds spent waiting
+        """
+        raise NotImplementedError
+
+
+class _TokenBucketBase(RateLimiter, LoggerMixin):
+    """
+    Settings and refill logic shared by :class:`TokenBucket` and
+    :class:`SqliteTokenBucket`.
+    """
+
+    # pylint: disable=abstract-method
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float],
+        timer: Callable[[], float],
+        sleep: Optional[Callable[[float], None]],
+    ):
+        if rate <= 0:
+            raise ValueError("rate must be > 0, not {}".format(rate))
+        if capacity is None:
+            capacity = max(1.0, rate)
+        if capacity <= 0:
+            raise ValueError("capacity must be > 0, not {}".format(capacity))
+        self.rate = rate
+        self.capacity = capacity
+        self.timer = timer
+        self.sleep = time.sleep if sleep is None else sleep
+
+    def _take_tokens(
+        self, tokens: float, updated_at: float, now: float, amount: float
+    ) -> Tuple[float, float]:
+        """
+        Refills a bucket holding *tokens* at *updated_at* up to *now* and takes
+        *amount* tokens from it.
+
+        The bucket may go into debt: the returned delay is the time it takes to
+        refill the missing tokens.
+
+        :return: the remaining tokens and the delay in seconds
+        """
+        tokens = (
+            min(self.capacity, tokens + max(0.0, now - updated_at) * self.rate) - amount
+        )
+        delay = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, delay
+
+    def _wait(self, delay: float) -> float:
+        if delay > 0:
+            self.log.debug("Rate limit reached, waiting %.3f seconds", delay)
+            self.sleep(delay)
+        return delay
+
+
+class TokenBucket(_TokenBucketBase):
+    """
+    Limits the rate of requests or objects within a process.
+
+    The bucket holds up to *capacity* tokens and is refilled with *rate* tokens per
+    second. Each call to :meth:`acquire` takes tokens from the bucket. If not
+    enough tokens are available, the caller sleeps until the bucket has been
+    refilled. Bursts of up to *capacity* units are thus sent without delay, while
+    the long-term rate does not exceed *rate* units per second.
+
+    An *amount* larger than *capacity* is permitted: the bucket goes into debt, and
+    subsequent callers wait until the debt has been paid off. Callers are served in
+    the order in which they call :meth:`acquire`.
+
+    Instances are thread-safe. Share a single instance to limit the combined rate
+    of several clients.
+
+    .. doctest::
+
+        >>> bucket = TokenBucket(rate=10, capacity=5)
+        >>> bucket.acquire(5)
+        0.0
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: Optional[float] = None,
+        timer: Optional[Callable[[], float]] = None,
+        sleep: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        Constructor.
+
+        :param rate: number of units per second
+        :param capacity: Optional: maximum burst size. Defaults to *rate*, i.e. to
+            one second worth of units, but at least 1.
+        :param timer: Optional: Timer function, mainly useful for unit tests
+        :param sleep: Optional: Sleep function, mainly useful for unit tests
+        """
+        super().__init__(
+            rate, capacity, time.monotonic if timer is None else timer, sleep
+        )
+        self._tokens = float(self.capacity)
+        self._updated_at = self.timer()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float = 1) -> float:
+        with self._lock:
+            now = self.timer()
+            self._tokens, delay = self._take_tokens(
+                self._tokens, self._updated_at, now, amount
+            )
+            self._updated_at = now
+        return self._wait(delay)
+
+
+class SqliteTokenBucket(_TokenBucketBase):
+    """
+    A :class:`TokenBucket` persisted in a SQLite database.
+
+    All instances with the same *path* and *name* share one bucket, even if they
+    live in different processes on the same host. Each call to :meth:`acquire`
+    updates the bucket in a single transaction, so the processes are serialized by
+    the database lock.
+
+    The first instance to use a bucket creates it with its *rate* and *capacity*.
+    Later instances adopt their own *rate* and *capacity*, so all processes sharing
+    a bucket should be configured identically.
+
+    Instances can be pickled: the copy opens its own database connection. This
+    allows passing the bucket to worker processes, see
+    :meth:`~sap.aibus.dar.client.inference_client.InferenceClient.do_multiprocess_bulk_inference`.
+
+    .. versionadded:: 0.16.0
+    """
+
+    # pylint: disable=too-many-arguments
+
+    def __init__(
+        self,
+        path: str,
+        rate: float,
+        capacity: Optional[float] = None,
+        name: str = "default",
+        timer: Optional[Callable[[], float]] = None,
+        sleep: Optional[Callable[[float], None]] = None,
+    ):
+        """
+        Constructor.
+
+        :param path: file name of the SQLite database. Will be created if missing.
+        :param rate: number of units per second
+        :param capacity: Optional: maximum burst size. Defaults to *rate*, but at
+            least 1.
+        :param name: name of the bucket within the database
+        :param timer: Optional: Timer function, mainly useful for unit tests. Must
+            return wall clock time if the bucket is shared between processes.
+        :param sleep: Optional: Sleep function, mainly useful for unit tests
+        """
+        super().__init__(rate, capacity, time.time if timer is None else timer, sleep)
+        self.path = path
+        self.name = name
+        self._lock = threading.Lock()
+        self._connection = self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Transactions are managed explicitly in acquire().
+        connection = sqlite3.connect(
+            self.path,
+            timeout=SQLITE_LOCK_TIMEOUT,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS token_buckets ("
+            " name TEXT PRIMARY KEY,"
+            " tokens REAL NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        return connection
+
+    def acquire(self, amount: float = 1) -> float:
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock before reading, so that no other
+            # process can take tokens between the SELECT and the UPDATE.
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.timer()
+                row = self._connection.execute(
+                    "SELECT tokens, updated_at FROM token_buckets WHERE name = ?",
+                    (self.name,),
+                ).fetchone()
+                tokens, updated_at = row if row else (self.capacity, now)
+                tokens, delay = self._take_tokens(tokens, updated_at, now, amount)
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO token_buckets VALUES (?, ?, ?)",
+                    (self.name, tokens, now),
+                )
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+        return self._wait(delay)
+
+    def close(self) -> None:
+        """
+        Closes the database connection.
+
+        :return: None
+        """
+        self._connection.close()
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        del state["_connection"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._connection = self._connect()
@@ -0,0 +1,270 @@
+"""
+Run inference for all records of a CSV or JSONL file.
+"""
+import csv
+import gzip
+import json
+import typing
+
+from sap.aibus.dar.client.base_client import BaseClient
+from sap.aibus.dar.client.inference_client import TOP_N, InferenceClient
+from sap.aibus.dar.client.inference_results import prediction_column_name
+from sap.aibus.dar.client.util.credentials import CredentialsSource
+
+#: File formats supported by :class:`FileInference`
+FORMATS = ("csv", "jsonl")
+
+# pylint: disable=too-many-arguments
+
+
+def detect_format(path: str) -> str:
+    """
+    Derives the file format from the file name extension.
+
+    A *.gz* suffix is ignored: files ending in *.gz* are (de)compressed with gzip.
+
+    .. doctest::
+
+        >>> detect_format("objects.csv.gz")
+        'csv'
+        >>> detect_format("predictions.ndjson")
+        'jsonl'
+
+    :param path: file name
+    :return: "csv" or "jsonl"
+    :raises ValueError: if the format cannot be determined
+    """
+    name = path.lower()
+    if name.endswith(".gz"):
+        name = name[: -len(".gz")]
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    raise ValueError(
+        "Cannot determine file format of '{}'. Expected one of: {}".format(
+            path, ", ".join(FORMATS)
+        )
+    )
+
+
+def _open_text(path: str, mode: str) -> typing.IO[str]:
+    if not path.lower().endswith(".gz"):
+        return open(path, mode, encoding="utf-8", newline="")
+    # Literal modes let type checkers pick the text mode overload of gzip.open.
+    if mode == "w":
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return gzip.open(path, "rt", encoding="utf-8", newline="")
+
+
+class FileInference(BaseClient):
+    """
+    This class runs inference for all records of a CSV or JSONL file and writes
+    the predictions to another CSV or JSONL file.
+
+    The input file is read incrementally and predictions are written as soon as
+    they are available, so memory usage does not depend on the size of the file.
+    Files ending in *.gz* are read and written with gzip compression.
+
+    The features of each inference object are taken from the columns of a record
+    as described by the *features* of a DatasetSchema, in the same format as
+    used by :class:`~sap.aibus.dar.client.workflow.model.ModelCreator`:
+
+    .. code-block:: python
+
+        dataset_schema = {
+            "features": [{"label": "title", "type": "TEXT"}],
+            "labels": [{"label": "label1", "type": "CATEGORY"}],
+            "name": "arxiv-multilabel-prediction",
+        }
+        file_inference = FileInference.construct_from_service_key(key)
+        file_inference.run(
+            "my-model", "arxiv.csv", "predictions.csv", dataset_schema
+        )
+
+    To construct an instance of this class, see the various *construct_* methods
+    such as
+    :meth:`~sap.aibus.dar.client.base_client.BaseClient.construct_from_credentials`
+    in :class:`~sap.aibus.dar.client.base_client.BaseClient`.
+
+    Internally, the class wraps :class:`InferenceClient`.
+
+    .. versionadded:: 0.16.0
+    """
+
+    def __init__(self, url: str, source: CredentialsSource):
+        self.inference_client = InferenceClient(url=url, credentials_source=source)
+
+    def run(
+        self,
+        model_name: str,
+        input_path: str,
+        output_path: str,
+        dataset_schema: dict,
+        id_column: typing.Optional[str] = None,
+        top_n: int = TOP_N,
+        retry: bool = True,
+        worker_count: int = 4,
+        max_payload_bytes: typing.Optional[int] = None,
+    ) -> dict:
+        """
+        Classifies all records in *input_path* and writes the predictions to
+        *output_path*.
+
+        The file formats are derived from the file names, see
+        :func:`detect_format`. In a JSONL input file, each line must contain a
+        JSON object with one key per column.
+
+        The objectId of each object is taken from the *id_column* of the input. If
+        no *id_column* is given, the zero-based index of the record in the input
+        file is used.
+
+        A JSONL output file contains one ObjectPrediction dictionary per line, as
+        returned by
+        :meth:`~sap.aibus.dar.client.inference_client.InferenceClient.do_bulk_inference`.
+        A CSV output file contains the columns *objectId*, one column per label in
+        the *dataset_schema* and rank, one column with the probability of each of
+        these, and *error*. For the label *category* and *top_n* of two, these
+        are *category*, *category_probability*, *category_2* and
+        *category_2_probability*. The *error* column is empty unless the inference
+        request for the object failed.
+
+        Predictions are written in the order of the input.
+
+        :param model_name: name of the model used for inference
+        :param input_path: file name of the input file
+        :param output_path: file name of the output file
+        :param dataset_schema: DatasetSchema as dict
+        :param id_column: Optional: column which contains the objectId
+        :param top_n: How many predictions to return per object
+        :param retry: whether to retry on errors. Default: True
+        :param worker_count: maximum number of concurrent requests
+        :param max_payload_bytes: Optional: maximum size of a request body in bytes,
+            see
+            :meth:`~sap.aibus.dar.client.inference_client.InferenceClient.do_bulk_inference`
+        :raises ValueError: if a file format is not supported or a column is missing
+        :return: a dictionary with the number of objects processed in *objectCount*
+            and the number of objects for which inference failed in *failedCount*
+        """
+        input_format = detect_format(input_path)
+        output_format = detect_format(output_path)
+
+        with _open_text(input_path, "r") as input_file:
+            predictions = self.inference_client.do_streaming_bulk_inference(
+                model_name,
+                self._read_objects(input_file, input_format, dataset_schema, id_column),
+                top_n=top_n,
+                retry=retry,
+                worker_count=worker_count,
+                max_payload_bytes=max_payload_bytes,
+            )
+            counts = self._write_predictions(
+                predictions, output_path, output_format, dataset_schema, top_n
+            )
+
+        self.log.info(
+            "Wrote %s predictions to '%s', %s failed",
+            counts["objectCount"],
+            output_path,
+            counts["failedCount"],
+        )
+        return counts
+
+    def _read_objects(
+        self,
+        input_file: typing.IO[str],
+        input_format: str,
+        dataset_schema: dict,
+        id_column: typing.Optional[str],
+    ) -> typing.Iterator[dict]:
+        feature_names = [feature["label"] for feature in dataset_schema["features"]]
+        records = self._read_records(input_file, input_format)
+        for idx, record in enumerate(records):
+            yield self._to_inference_object(idx, record, feature_names, id_column)
+
+    def _write_predictions(
+        self,
+        predictions: typing.Iterable[dict],
+        output_path: str,
+        output_format: str,
+        dataset_schema: dict,
+        top_n: int,
+    ) -> dict:
+        label_names = [label["label"] for label in dataset_schema["labels"]]
+        object_count = 0
+        failed_count = 0
+        with _open_text(output_path, "w") as output_file:
+            write = self._writer(output_file, output_format, label_names, top_n)
+            for prediction in predictions:
+                write(prediction)
+                object_count += 1
+                if prediction["labels"] is None:
+                    failed_count += 1
+        return {"objectCount": object_count, "failedCount": failed_count}
+
+    @staticmethod
+    def _read_records(
+        input_file: typing.IO[str], input_format: str
+    ) -> typing.Iterator[dict]:
+        if input_format == "csv":
+            yield from csv.DictReader(input_file)
+            return
+        for line in input_file:
+            if line.strip():
+                yield json.loads(line)
+
+    @staticmethod
+    def _to_inference_object(
+        idx: int,
+        record: dict,
+        feature_names: typing.List[str],
+        id_column: typing.Optional[str],
+    ) -> dict:
+        for column in feature_names + ([id_column] if id_column else []):
+            if column not in record:
+                raise ValueError("Record {} has no column '{}'".format(idx, column))
+        features = []
+        for name in feature_names:
+            value = record[name]
+            if value is None:
+                value = ""
+            features.append({"name": name, "value": str(value)})
+        object_id = str(record[id_column]) if id_column else str(idx)
+        return {"objectId": object_id, "features": features}
+
+    @staticmethod
+    def _writer(
+        output_file: typing.IO[str],
+        output_format: str,
+        label_names: typing.List[str],
+        top_n: int,
+    ) -> typing.Callable[[dict], None]:
+        if output_format == "jsonl":
+
+            def write_jsonl(prediction: dict) -> None:
+                output_file.write(json.dumps(prediction, ensure_ascii=False) + "\n")
+
+            return write_jsonl
+
+        columns = ["objectId"]
+        for label_name in label_names:
+            for rank in range(top_n):
+                name = prediction_column_name(label_name, rank)
+                columns.extend([name, name + "_probability"])
+        columns.append("error")
+        writer = csv.DictWriter(output_file, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+
+        def write_csv(prediction: dict) -> None:
+            row = {
+                "objectId": prediction.get("objectId"),
+                "error": prediction.get("_sdk_error"),
+            }
+            for label in prediction["labels"] or []:
+                for rank, result in enumerate(label["results"]):
+                    name = prediction_column_name(label["name"], rank)
+                    row[name] = result["value"]
+                    row[name + "_probability"] = result.get("probability")
+            writer.writerow(row)
+
+        return write_csv
@@ -34,6 +34,12 @@ setup(
         "ai-api-client-sdk~=2.4",
         "aenum==3.1.12",
     ],
+    extras_require={
+        "async": ["httpx>=0.23"],
+        "pandas": ["pandas>=1.1"],
+        "arrow": ["pyarrow>=5.0"],
+        "fast-json": ["orjson>=3"],
+    },
     packages=find_packages(exclude=["tests"]),
     include_package_data=True,
     python_requires="~=3.6",
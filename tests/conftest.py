@@ -0,0 +1,45 @@
+import pytest
+
+from sap.aibus.dar.client.util import json_codec
+
+
+@pytest.fixture
+def stdlib_json_backend(monkeypatch):
+    """
+    Uses the standard library JSON backend regardless of installed packages.
+
+    Opt in with ``@pytest.mark.usefixtures("stdlib_json_backend")`` for tests which
+    mock `requests` and assert on `json=` arguments and `.json()` calls: these are
+    only used with the standard library backend. All other tests run with the
+    backend users get by default.
+    """
+    monkeypatch.setattr(json_codec, "BACKEND", "json")
+
+
+class FakeTimer:
+    """
+    Manually advanced replacement for :func:`time.monotonic`.
+
+    Set or increment :attr:`now` to let time pass. :meth:`sleep` records the
+    requested delay and advances the time accordingly.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, how_long):
+        self.sleeps.append(how_long)
+        self.now += how_long
+
+
+@pytest.fixture
+def fake_timer():
+    """
+    Returns a :class:`FakeTimer` to pass as *timer* (and *sleep*) to the
+    component under test.
+    """
+    return FakeTimer()
@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import pytest
+
+from sap.aibus.dar.client.async_dar_session import AsyncDARSession
+from sap.aibus.dar.client.exceptions import DARHTTPException, HTTPSRequired
+from sap.aibus.dar.client.util.credentials import StaticCredentialsSource
+from sap.aibus.dar.client.util.http_transport import RetryBudget
+
+httpx = pytest.importorskip("httpx")
+
+DAR_URL = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+
+
+def prepare_session(handler) -> AsyncDARSession:
+    sess = AsyncDARSession(DAR_URL, StaticCredentialsSource("12345"))
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    sess.http.client = client
+    sess.http_post_retry.client = client
+    return sess
+
+
+class TestAsyncDARSession:
+    expected_headers = {
+        "authorization": "Bearer 12345",
+        "user-agent": "DAR-SDK httpx/" + httpx.__version__,
+        "accept": "application/json;q=0.9,text/plain",
+    }
+
+    def _recording_handler(self, status_code=200):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(
+                status_code,
+                json={"ping": "pong"},
+                headers={"X-Correlation-ID": "TEST"},
+            )
+
+        return handler, requests
+
+    def _assert_headers(self, request):
+        for key, value in self.expected_headers.items():
+            assert request.headers[key] == value
+
+    def test_constructor(self):
+        sess = AsyncDARSession(DAR_URL, StaticCredentialsSource("12345"))
+        assert sess.base_url == DAR_URL[:-1]
+        # Both sessions share one connection pool
+        assert sess.http.client is sess.http_post_retry.client
+
+    def test_retry_budget_is_shared(self):
+        budget = RetryBudget()
+        sess = AsyncDARSession(
+            DAR_URL, StaticCredentialsSource("12345"), retry_budget=budget
+        )
+        assert sess.http.retry_budget is budget
+        assert sess.http_post_retry.retry_budget is budget
+
+    def test_constructor_enforces_https(self):
+        with pytest.raises(HTTPSRequired):
+            AsyncDARSession("http://insecure/", StaticCredentialsSource("12345"))
+
+    def test_get_from_endpoint(self):
+        handler, requests = self._recording_handler()
+        sess = prepare_session(handler)
+
+        response = asyncio.run(sess.get_from_endpoint("/data-manager/api/v3/x"))
+
+        assert response.json() == {"ping": "pong"}
+        assert len(requests) == 1
+        assert requests[0].method == "GET"
+        assert str(requests[0].url) == DAR_URL + "data-manager/api/v3/x"
+        self._assert_headers(requests[0])
+
+    def test_delete_from_endpoint(self):
+        handler, requests = self._recording_handler()
+        sess = prepare_session(handler)
+
+        asyncio.run(sess.delete_from_endpoint("/data-manager/api/v3/x"))
+
+        assert requests[0].method == "DELETE"
+        self._assert_headers(requests[0])
+
+    def test_post_to_endpoint(self):
+        handler, requests = self._recording_handler()
+        sess = prepare_session(handler)
+        payload = {"a": 1, "b": "ok!"}
+
+        asyncio.run(sess.post_to_endpoint("/inference/x", payload=payload))
+
+        assert requests[0].method == "POST"
+        assert str(requests[0].url) == DAR_URL + "inference/x"
+        assert json.loads(requests[0].content) == payload
+        self._assert_headers(requests[0])
+
+    def test_post_to_url_retry_uses_post_retry_session(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(503)
+            return httpx.Response(200, json={})
+
+        sess = prepare_session(handler)
+        sess.http_post_retry.sleep = sess.http.sleep = _no_sleep
+
+        with pytest.raises(DARHTTPException):
+            asyncio.run(
+                sess.post_to_url(DAR_URL + "inference/x", payload={}, retry=False)
+            )
+        assert len(calls) == 1
+
+        calls.clear()
+        response = asyncio.run(
+            sess.post_to_url(DAR_URL + "inference/x", payload={}, retry=True)
+        )
+        assert response.status_code == 200
+        assert len(calls) == 2
+
+    def test_error_handling(self):
+        handler, _ = self._recording_handler(status_code=404)
+        sess = prepare_session(handler)
+
+        with pytest.raises(DARHTTPException) as exc_info:
+            asyncio.run(sess.get_from_endpoint("/data-manager/api/v3/x"))
+
+        exc = exc_info.value
+        assert exc.status_code == 404
+        assert exc.url == DAR_URL + "data-manager/api/v3/x"
+        assert exc.correlation_id == "TEST"
+        assert exc.response_reason == "Not Found"
+        assert "Method: 'GET'" in exc.debug_message
+
+    def test_context_manager_closes_client(self):
+        handler, _ = self._recording_handler()
+        sess = prepare_session(handler)
+
+        async def use_session():
+            async with sess:
+                pass
+
+        asyncio.run(use_session())
+        assert sess.http.client.is_closed
+
+
+async def _no_sleep(how_long):
+    pass
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+import pytest
+
+from sap.aibus.dar.client.async_inference_client import AsyncInferenceClient
+from sap.aibus.dar.client.exceptions import InvalidWorkerCount
+from sap.aibus.dar.client.util.credentials import StaticCredentialsSource
+
+httpx = pytest.importorskip("httpx")
+
+DAR_URL = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+INFERENCE_URL = DAR_URL + "inference/api/v3/models/test-model/versions/1"
+
+
+def make_objects(count, object_id="b5cbcb34-7ab9-4da5-b7ec-654c90757eb9"):
+    return [
+        {
+            "objectId": object_id,
+            "features": [{"name": "manufacturer", "value": "ACME"}],
+        }
+        for _ in range(count)
+    ]
+
+
+def make_response(objects):
+    return {
+        "id": "8ba8d237-7625-4986-8b31-ab5dca5cdd80",
+        "status": "DONE",
+        "processedTime": "2018-08-31T11:45:54.727934+00:00",
+        "predictions": [
+            {
+                "objectId": obj.get("objectId"),
+                "labels": [{"name": "category", "value": "ANVIL"}],
+            }
+            for obj in objects
+        ],
+    }
+
+
+def prepare_client(handler) -> AsyncInferenceClient:
+    client = AsyncInferenceClient(DAR_URL, StaticCredentialsSource("abcd"))
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    client.session.http.client = http_client
+    client.session.http_post_retry.client = http_client
+    return client
+
+
+def echo_handler(requests):
+    def handler(request):
+        payload = json.loads(request.content)
+        requests.append(payload)
+        if payload["objects"] and payload["objects"][0]["objectId"] == "fail":
+            return httpx.Response(400, json={"error": "bad"})
+        if payload["objects"] and payload["objects"][0]["objectId"] == "garbage":
+            return httpx.Response(200, content=b"<html>Bad Gateway</html>")
+        return httpx.Response(200, json=make_response(payload["objects"]))
+
+    return handler
+
+
+class TestAsyncInferenceClient:
+    def test_construct_from_jwt(self):
+        client = AsyncInferenceClient.construct_from_jwt(DAR_URL, "abcd")
+        assert client.credentials_source.token() == "abcd"
+
+    def test_create_inference_request(self):
+        requests = []
+        client = prepare_client(echo_handler(requests))
+
+        response = asyncio.run(
+            client.create_inference_request("test-model", make_objects(2), top_n=3)
+        )
+
+        assert response == make_response(make_objects(2))
+        assert requests == [{"topN": 3, "objects": make_objects(2)}]
+
+    def test_create_inference_request_with_url(self):
+        requests = []
+        client = prepare_client(echo_handler(requests))
+
+        response = asyncio.run(
+            client.create_inference_request_with_url(INFERENCE_URL, make_objects(1))
+        )
+
+        assert response == make_response(make_objects(1))
+        assert requests == [{"topN": 1, "objects": make_objects(1)}]
+
+    def test_do_bulk_inference(self):
+        requests = []
+        client = prepare_client(echo_handler(requests))
+        objects = [
+            {"objectId": str(idx), "features": [{"name": "f", "value": str(idx)}]}
+            for idx in range(175)
+        ]
+
+        predictions = asyncio.run(
+            client.do_bulk_inference("test-model", objects, concurrency=3)
+        )
+
+        assert [p["objectId"] for p in predictions] == [str(i) for i in range(175)]
+        assert sorted(len(r["objects"]) for r in requests) == [25, 50, 50, 50]
+
+    def test_do_bulk_inference_error(self):
+        requests = []
+        client = prepare_client(echo_handler(requests))
+        objects = make_objects(50) + make_objects(20, object_id="fail")
+
+        predictions = asyncio.run(client.do_bulk_inference("test-model", objects))
+
+        assert predictions[:50] == make_response(make_objects(50))["predictions"]
+        for prediction in predictions[50:]:
+            assert prediction["objectId"] == "fail"
+            assert prediction["labels"] is None
+            assert prediction["_sdk_error"].startswith("DARHTTPException")
+
+    def test_do_bulk_inference_invalid_json(self):
+        requests = []
+        client = prepare_client(echo_handler(requests))
+        objects = make_objects(50) + make_objects(20, object_id="garbage")
+
+        predictions = asyncio.run(client.do_bulk_inference("test-model", objects))
+
+        assert predictions[:50] == make_response(make_objects(50))["predictions"]
+        for prediction in predictions[50:]:
+            assert prediction["objectId"] == "garbage"
+            assert prediction["labels"] is None
+            assert prediction["_sdk_error"].startswith("JSONDecodeError")
+
+    def test_do_bulk_inference_invalid_concurrency(self):
+        client = prepare_client(echo_handler([]))
+        for invalid in [0, -1, None]:
+            with pytest.raises(InvalidWorkerCount):
+                asyncio.run(
+                    client.do_bulk_inference(
+                        "test-model", make_objects(1), concurrency=invalid
+                    )
+                )
@@ -1,8 +1,21 @@
+import hashlib
 import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import MagicMock, ANY, patch
+
+import pytest
+import requests
 from requests.models import Response
 from sap.aibus.dar.client.aiapi.dar_ai_api_file_upload_client import (
     DARAIAPIFileUploadClient,
+    FileDownload,
+    file_sha256,
+)
+from sap.aibus.dar.client.exceptions import (
+    DARHTTPException,
+    DownloadVerificationFailed,
 )
 import json
 
@@ -10,6 +23,335 @@ BASE_URL = "https://dar-dummy.cfapps.sap.hana.ondemand.com/model-manager/v2/lm"
 AUTH_URL = "https://dummy.authentication.sap.hana.ondemand.com/oauth/token"
 
 
+class _FileHandler(BaseHTTPRequestHandler):
+    """
+    Records the client port of each request and fails the first request to
+    paths containing "flaky". Paths containing "exists" are rejected with 409
+    unless overwrite is requested; paths containing "broken" with 400.
+
+    GET requests to paths in server.files are answered with the file content and
+    an ETag derived from it, honoring Range and If-Range headers. For paths in
+    server.interrupted, the connection is closed halfway through the first
+    response.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        content = server.files.get(self.path)
+        if content is None:
+            self._respond()
+            return
+        with server.lock:
+            server.requests.append((self.command, self.path, self.headers["Range"]))
+            server.if_range.append(self.headers["If-Range"])
+            interrupt = self.path in server.interrupted
+            server.interrupted.discard(self.path)
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:16])
+        start = 0
+        match = re.match(r"bytes=(\d+)-$", self.headers.get("Range") or "")
+        if match and self.headers.get("If-Range", etag) != etag:
+            # The client's partial copy is outdated: send the entire file.
+            match = None
+        if match:
+            start = int(match.group(1))
+            if start >= len(content):
+                self.send_response(416)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header(
+                "Content-Range",
+                "bytes {}-{}/{}".format(start, len(content) - 1, len(content)),
+            )
+        else:
+            self.send_response(200)
+        body = content[start:]
+        self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if interrupt:
+            self.wfile.write(body[: len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        server = self.server
+        with server.lock:
+            server.client_ports.add(self.client_address[1])
+            server.requests.append((self.command, self.path, body))
+            fail = "flaky" in self.path and self.path not in server.failed_paths
+            if fail:
+                server.failed_paths.add(self.path)
+        status = 503 if fail else 200
+        if "exists" in self.path and "overwrite=True" not in self.path:
+            status = 409
+        elif "broken" in self.path:
+            status = 400
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    do_PUT = do_DELETE = _respond
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def file_server():
+    server = ThreadingHTTPServer(("localhost", 0), _FileHandler)
+    server.lock = threading.Lock()
+    server.client_ports = set()
+    server.requests = []
+    server.failed_paths = set()
+    server.files = {}
+    server.interrupted = set()
+    server.if_range = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class TestDARAIAPIFileUploadClientTransport:
+    def create_client(self, server):
+        base_url = "http://localhost:{}/lm".format(server.server_address[1])
+        return DARAIAPIFileUploadClient(base_url=base_url, get_token=lambda: "token")
+
+    def test_connection_is_reused(self, file_server, tmp_path):
+        local_path = tmp_path / "data.csv"
+        local_path.write_bytes(b"a,b")
+
+        with self.create_client(file_server) as client:
+            client.put_file(str(local_path), "/data.csv", overwrite=True)
+            client.get_file_from_url(client.base_url + "/data.csv")
+            client.delete_file("/data.csv")
+
+        assert [(method, path) for method, path, _ in file_server.requests] == [
+            ("PUT", "/lm/files/data.csv?overwrite=True"),
+            ("GET", "/lm/files/data.csv"),
+            ("DELETE", "/lm/files/data.csv"),
+        ]
+        assert file_server.requests[0][2] == b"a,b"
+        assert len(file_server.client_ports) == 1
+
+    def test_server_errors_are_retried(self, file_server, tmp_path):
+        local_path = tmp_path / "data.csv"
+        local_path.write_bytes(b"a,b")
+
+        with self.create_client(file_server) as client:
+            response = client.put_file(str(local_path), "/flaky.csv")
+
+        assert response.status_code == 200
+        # The file is sent again in full.
+        assert [body for _, _, body in file_server.requests] == [b"a,b", b"a,b"]
+
+    def test_put_directory(self, file_server, tmp_path):
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.csv").write_bytes(b"a" * 10)
+        (tmp_path / "sub" / "b.csv").write_bytes(b"b" * 20)
+        (tmp_path / "sub" / "exists.csv").write_bytes(b"c")
+        (tmp_path / "broken.csv").write_bytes(b"d")
+
+        with self.create_client(file_server) as client:
+            report = client.put_directory(str(tmp_path), "/data/", worker_count=2)
+
+        assert sorted(report.uploaded) == ["/data/a.csv", "/data/sub/b.csv"]
+        assert report.skipped == ["/data/sub/exists.csv"]
+        assert list(report.failed) == ["/data/broken.csv"]
+        assert report.failed["/data/broken.csv"].status_code == 400
+        assert report.bytes_uploaded == 30
+        assert report.throughput > 0
+        assert sorted(path for _, path, _ in file_server.requests) == [
+            "/lm/files/data/a.csv?overwrite=False",
+            "/lm/files/data/broken.csv?overwrite=False",
+            "/lm/files/data/sub/b.csv?overwrite=False",
+            "/lm/files/data/sub/exists.csv?overwrite=False",
+        ]
+
+    def test_put_many_overwrite(self, file_server, tmp_path):
+        local_path = tmp_path / "exists.csv"
+        local_path.write_bytes(b"abc")
+
+        with self.create_client(file_server) as client:
+            report = client.put_many(
+                [(str(local_path), "/exists.csv"), (str(tmp_path / "x"), "/x")],
+                overwrite=True,
+            )
+
+        assert report.uploaded == ["/exists.csv"]
+        assert report.skipped == []
+        # The missing local file is reported, not raised.
+        assert isinstance(report.failed["/x"], OSError)
+
+    def test_put_many_invalid_arguments(self, tmp_path):
+        client = DARAIAPIFileUploadClient(BASE_URL, get_token=lambda: "token")
+
+        with pytest.raises(ValueError):
+            client.put_many([], worker_count=0)
+        with pytest.raises(ValueError):
+            client.put_directory(str(tmp_path / "missing"), "/data")
+
+    def test_sync_directory(self, file_server, tmp_path):
+        local_dir = tmp_path / "data"
+        local_dir.mkdir()
+        (local_dir / "a.csv").write_bytes(b"a")
+        (local_dir / "b.csv").write_bytes(b"b")
+        manifest_path = str(tmp_path / "manifest.json")
+
+        with self.create_client(file_server) as client:
+            first = client.sync_directory(str(local_dir), "/data", manifest_path)
+            second = client.sync_directory(str(local_dir), "/data", manifest_path)
+            (local_dir / "b.csv").write_bytes(b"changed")
+            os.utime(str(local_dir / "b.csv"), ns=(0, 10**9))
+            third = client.sync_directory(str(local_dir), "/data", manifest_path)
+
+        assert sorted(first.uploaded) == ["/data/a.csv", "/data/b.csv"]
+        assert second.uploaded == []
+        assert sorted(second.skipped) == ["/data/a.csv", "/data/b.csv"]
+        assert third.uploaded == ["/data/b.csv"]
+        assert [path for _, path, _ in file_server.requests[2:]] == [
+            "/lm/files/data/b.csv?overwrite=True"
+        ]
+
+    def test_download_file(self, file_server, tmp_path):
+        content = os.urandom(100000)
+        file_server.files["/lm/files/model.bin"] = content
+        local_path = str(tmp_path / "out" / "model.bin")
+
+        with self.create_client(file_server) as client:
+            size = client.download_file(
+                client.base_url + "/model.bin",
+                local_path,
+                sha256=hashlib.sha256(content).hexdigest(),
+                chunk_size=4096,
+            )
+
+        assert size == len(content)
+        with open(local_path, "rb") as file:
+            assert file.read() == content
+        assert not os.path.exists(local_path + ".part")
+        assert file_sha256(local_path) == hashlib.sha256(content).hexdigest()
+
+    def test_download_is_resumed_after_interruption(self, file_server, tmp_path):
+        content = os.urandom(100000)
+        file_server.files["/lm/files/model.bin"] = content
+        file_server.interrupted.add("/lm/files/model.bin")
+        local_path = str(tmp_path / "model.bin")
+
+        with self.create_client(file_server) as client:
+            client.download_file(
+                client.base_url + "/model.bin", local_path, chunk_size=4096
+            )
+
+        with open(local_path, "rb") as file:
+            assert file.read() == content
+        first_range, second_range = [
+            range_header for _, _, range_header in file_server.requests
+        ]
+        assert first_range is None
+        # Resumed after the complete chunks received before the interruption.
+        offset = int(re.match(r"bytes=(\d+)-$", second_range).group(1))
+        assert 0 < offset <= 50000
+        etag = '"{}"'.format(hashlib.sha256(content).hexdigest()[:16])
+        assert file_server.if_range == [None, etag]
+        assert os.listdir(str(tmp_path)) == ["model.bin"]
+
+    def test_changed_remote_file_restarts_download(self, file_server, tmp_path):
+        content = b"0123456789"
+        file_server.files["/lm/files/data.csv"] = content
+        local_path = str(tmp_path / "data.csv")
+        with open(local_path + ".part", "wb") as file:
+            file.write(b"abcd")
+        with open(local_path + ".part.validator", "w") as file:
+            file.write('"outdated"')
+
+        with self.create_client(file_server) as client:
+            client.download_file(client.base_url + "/data.csv", local_path)
+
+        with open(local_path, "rb") as file:
+            assert file.read() == content
+        assert file_server.if_range == ['"outdated"']
+        assert os.listdir(str(tmp_path)) == ["data.csv"]
+
+    def test_partial_download_is_resumed(self, file_server, tmp_path):
+        content = b"0123456789"
+        file_server.files["/lm/files/data.csv"] = content
+        local_path = str(tmp_path / "data.csv")
+        with open(local_path + ".part", "wb") as file:
+            file.write(b"0123")
+
+        with self.create_client(file_server) as client:
+            client.download_file(client.base_url + "/data.csv", local_path, size=10)
+            with open(local_path + ".part", "wb") as file:
+                file.write(b"too long for the remote file")
+            client.download_file(client.base_url + "/data.csv", local_path)
+
+        with open(local_path, "rb") as file:
+            assert file.read() == content
+        ranges = [range_header for _, _, range_header in file_server.requests]
+        assert ranges == ["bytes=4-", "bytes=28-", None]
+
+    def test_download_verification(self, file_server, tmp_path):
+        file_server.files["/lm/files/data.csv"] = b"0123456789"
+        local_path = str(tmp_path / "data.csv")
+
+        with self.create_client(file_server) as client:
+            url = client.base_url + "/data.csv"
+            with pytest.raises(DownloadVerificationFailed):
+                client.download_file(url, local_path, sha256="0" * 64)
+            with pytest.raises(DownloadVerificationFailed):
+                client.download_file(url, local_path, size=11)
+
+        assert os.listdir(str(tmp_path)) == []
+
+    def test_download_many(self, file_server, tmp_path):
+        file_server.files["/lm/files/a.csv"] = b"a" * 10
+        file_server.files["/lm/files/b.csv"] = b"b" * 20
+        base_url = "http://localhost:{}/lm/files".format(file_server.server_address[1])
+
+        with self.create_client(file_server) as client:
+            report = client.download_many(
+                [
+                    (base_url + "/a.csv", str(tmp_path / "a.csv")),
+                    FileDownload(
+                        base_url + "/b.csv",
+                        str(tmp_path / "b.csv"),
+                        sha256=hashlib.sha256(b"b" * 20).hexdigest(),
+                    ),
+                    (base_url + "/broken.csv", str(tmp_path / "broken.csv")),
+                ],
+                worker_count=2,
+            )
+
+        assert sorted(report.downloaded) == [
+            str(tmp_path / "a.csv"),
+            str(tmp_path / "b.csv"),
+        ]
+        error = report.failed[str(tmp_path / "broken.csv")]
+        assert isinstance(error, DARHTTPException)
+        assert error.status_code == 400
+        assert report.bytes_downloaded == 30
+
+    def test_close(self):
+        client = DARAIAPIFileUploadClient(BASE_URL, get_token=lambda: "token")
+
+        with patch.object(requests.Session, "close") as mock_close:
+            with client:
+                pass
+
+        mock_close.assert_called_once_with()
+
+
 class TestDARAIAPIFileUploadClient:
     base_url = BASE_URL
     token = "1234567890"
@@ -356,4 +698,6 @@ class TestDARAIAPIFileUploadClient:
         assert response.status_code == 200
         assert response.json() == {"message": "Success"}
 
-        mock_send.assert_called_once()
+        mock_send.assert_called_once_with(
+            ANY, verify=True, timeout=client.timeout, stream=False
+        )
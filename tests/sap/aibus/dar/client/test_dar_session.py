@@ -1,5 +1,10 @@
+import gzip
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from io import BytesIO
+import json
 import re
+import threading
+import timeit
 from unittest.mock import create_autospec, Mock, call
 
 import httpretty
@@ -7,18 +12,29 @@ import pytest
 import requests
 from requests.structures import CaseInsensitiveDict
 
-from sap.aibus.dar.client.util.credentials import StaticCredentialsSource
+from sap.aibus.dar.client.util.credentials import (
+    CredentialsSource,
+    StaticCredentialsSource,
+)
 from sap.aibus.dar.client.dar_session import DARSession
 from sap.aibus.dar.client.exceptions import (
+    CircuitBreakerOpen,
     DARException,
     DARHTTPException,
     HTTPSRequired,
 )
+from sap.aibus.dar.client.util import json_codec
+from sap.aibus.dar.client.util.circuit_breaker import (
+    CLOSED,
+    OPEN,
+    CircuitBreakerRegistry,
+)
 from sap.aibus.dar.client.util.http_transport import (
     HttpMethodsProtocol,
     TimeoutRetrySession,
     TimeoutPostRetrySession,
 )
+from sap.aibus.dar.client.util.rate_limiting import RateLimiter
 
 
 # TODO: test kwargs as they are API
@@ -40,6 +56,7 @@ def create_mock_response():
     return mock_response
 
 
+@pytest.mark.usefixtures("stdlib_json_backend")
 class TestDARSession:
     dar_url = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
     credentials_source = StaticCredentialsSource("12345")
@@ -135,6 +152,27 @@ class TestDARSession:
             ]
             assert response == sess.http_post_retry.post.return_value
 
+    def test_post_json_to_endpoint(self):
+        for retry in [False, True]:
+            sess = self._prepare()
+            connection = sess.http_post_retry if retry else sess.http
+            connection.post.return_value.status_code = 200
+
+            endpoint = "/inference/api/v3/models/my-model/versions/1"
+            data = b'{"topN":1,"objects":[]}'
+
+            response = sess.post_json_to_endpoint(endpoint, data, retry=retry)
+
+            expected_headers = dict(self.expected_headers)
+            expected_headers["Content-Type"] = "application/json"
+            expected_http_call = call(
+                self.dar_url[:-1] + endpoint,
+                headers=expected_headers,
+                data=data,
+            )
+            assert connection.post.call_args_list == [expected_http_call]
+            assert response == connection.post.return_value
+
     def test_post_data_to_endpoint(self):
         for allowed_status_code in range(200, 300):
             sess = self._prepare()
@@ -386,3 +424,364 @@ class TestRetryErrorRaisesDARHTTPException:
         exc = exc_info.value
         assert exc.status_code == 500
         assert exc.correlation_id == "TEST"
+
+
+class TestDARSessionFastJson:
+    dar_url = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+
+    def test_post_to_endpoint_and_url_with_fast_json(self, monkeypatch):
+        pytest.importorskip("orjson")
+        monkeypatch.setattr(json_codec, "BACKEND", "orjson")
+        sess = DARSession(self.dar_url, StaticCredentialsSource("12345"))
+        sess.http = create_mock_session()
+        sess.http_post_retry = create_mock_session()
+        sess.http.post.return_value = create_mock_response()
+        sess.http_post_retry.post.return_value = create_mock_response()
+        payload = {"a": 1, "b": "ök!"}
+
+        sess.post_to_endpoint("/endpoint", payload)
+        sess.post_to_url(self.dar_url + "other", payload, retry=True)
+
+        expected_headers = dict(TestDARSession.expected_headers)
+        expected_headers["Content-Type"] = "application/json"
+        assert sess.http.post.call_args_list == [
+            call(
+                self.dar_url[:-1] + "/endpoint",
+                headers=expected_headers,
+                data='{"a":1,"b":"ök!"}'.encode("utf-8"),
+            )
+        ]
+        assert sess.http_post_retry.post.call_args_list == [
+            call(
+                self.dar_url + "other",
+                headers=expected_headers,
+                data='{"a":1,"b":"ök!"}'.encode("utf-8"),
+            )
+        ]
+
+
+@pytest.mark.usefixtures("stdlib_json_backend")
+class TestDARSessionCompression:
+    dar_url = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+    endpoint = "/inference/api/v3/models/my-model/versions/1"
+
+    def _prepare(self, **kwargs):
+        sess = DARSession(self.dar_url, StaticCredentialsSource("12345"), **kwargs)
+        sess.http = create_mock_session()
+        sess.http_post_retry = create_mock_session()
+        sess.http.post.return_value = create_mock_response()
+        sess.http_post_retry.post.return_value = create_mock_response()
+        return sess
+
+    def test_disabled_by_default(self):
+        sess = self._prepare()
+        payload = {"text": "x" * 100000}
+
+        sess.post_to_endpoint(self.endpoint, payload)
+
+        assert sess.http.post.call_args == call(
+            self.dar_url[:-1] + self.endpoint,
+            headers=TestDARSession.expected_headers,
+            json=payload,
+        )
+
+    def test_post_to_endpoint_above_threshold(self):
+        sess = self._prepare(compress_requests=True, compression_threshold=1000)
+        payload = {"text": "x" * 1000}
+
+        sess.post_to_endpoint(self.endpoint, payload, retry=True)
+
+        _, kwargs = sess.http_post_retry.post.call_args
+        assert kwargs["headers"]["Content-Encoding"] == "gzip"
+        assert kwargs["headers"]["Content-Type"] == "application/json"
+        assert len(kwargs["data"]) < 1000
+        assert json.loads(gzip.decompress(kwargs["data"])) == payload
+
+    def test_post_to_url_below_threshold(self):
+        sess = self._prepare(compress_requests=True, compression_threshold=1000)
+        payload = {"text": "x"}
+
+        sess.post_to_url(self.dar_url + "inference", payload)
+
+        _, kwargs = sess.http.post.call_args
+        assert "Content-Encoding" not in kwargs["headers"]
+        assert json.loads(kwargs["data"]) == payload
+
+    def test_post_json_to_endpoint(self):
+        sess = self._prepare(compress_requests=True, compression_threshold=10)
+        data = b'{"topN":1,"objects":[]}'
+
+        sess.post_json_to_endpoint(self.endpoint, data)
+
+        _, kwargs = sess.http.post.call_args
+        assert kwargs["headers"]["Content-Encoding"] == "gzip"
+        assert gzip.decompress(kwargs["data"]) == data
+
+    def test_disable_compression_for_endpoint(self):
+        sess = self._prepare(compress_requests=True, compression_threshold=10)
+        sess.disable_compression("/inference/api/v3/models/")
+        payload = {"text": "x" * 1000}
+
+        sess.post_to_endpoint(self.endpoint, payload)
+        sess.post_to_url(self.dar_url[:-1] + self.endpoint, payload)
+        sess.post_to_endpoint("/data-manager/api/v3/datasets", payload)
+
+        calls = sess.http.post.call_args_list
+        assert "Content-Encoding" not in calls[0][1]["headers"]
+        assert "Content-Encoding" not in calls[1][1]["headers"]
+        assert calls[2][1]["headers"]["Content-Encoding"] == "gzip"
+
+    def test_post_data_to_endpoint_streaming(self, monkeypatch):
+        monkeypatch.setattr("sap.aibus.dar.client.dar_session.STREAM_CHUNK_SIZE", 1000)
+        sess = self._prepare(compress_requests=True)
+        data = b"manufacturer,description\n" + b"ACME,Anvil\n" * 10000
+        data_stream = BytesIO(data)
+
+        bodies = []
+
+        def post(url, headers, data):
+            # A retried request reads the body again from the start.
+            for _ in range(2):
+                data.seek(0)
+                bodies.append(data.read())
+            return create_mock_response()
+
+        sess.http.post.side_effect = post
+
+        sess.post_data_to_endpoint("/data-manager/api/v3/datasets/1/data", data_stream)
+
+        _, kwargs = sess.http.post.call_args
+        assert kwargs["headers"]["Content-Encoding"] == "gzip"
+        assert kwargs["data"].closed
+        assert bodies[0] == bodies[1]
+        assert gzip.decompress(bodies[0]) == data
+        assert len(bodies[0]) < len(data)
+
+    def test_post_data_to_endpoint_disabled_for_endpoint(self):
+        sess = self._prepare(compress_requests=True)
+        sess.disable_compression("/data-manager/")
+        data_stream = BytesIO(b"CSV;data;")
+
+        sess.post_data_to_endpoint("/data-manager/api/v3/datasets/1/data", data_stream)
+
+        _, kwargs = sess.http.post.call_args
+        assert "Content-Encoding" not in kwargs["headers"]
+        assert kwargs["data"] is data_stream
+
+
+class TestDARSessionRateLimiter:
+    dar_url = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+
+    def test_every_request_is_rate_limited(self):
+        rate_limiter = create_autospec(RateLimiter, instance=True)
+        sess = DARSession(
+            self.dar_url, StaticCredentialsSource("12345"), rate_limiter=rate_limiter
+        )
+        sess.http = create_mock_session()
+        sess.http_post_retry = create_mock_session()
+        for mock_session in (sess.http, sess.http_post_retry):
+            mock_session.post.return_value = create_mock_response()
+            mock_session.delete.return_value = create_mock_response()
+
+        sess.get_from_endpoint("/models")
+        sess.delete_from_endpoint("/models/1")
+        sess.post_to_endpoint("/models", {"a": 1}, retry=True)
+        sess.post_to_url(self.dar_url + "models", {"a": 1})
+        sess.post_json_to_endpoint("/models", b"{}")
+        sess.post_data_to_endpoint("/data", BytesIO(b"data"))
+
+        assert rate_limiter.acquire.call_args_list == [call()] * 6
+
+    def test_no_rate_limiter_by_default(self):
+        sess = DARSession(self.dar_url, StaticCredentialsSource("12345"))
+
+        assert sess.rate_limiter is None
+
+
+class TestDARSessionHeaderCache:
+    dar_url = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+
+    def test_headers_are_rebuilt_when_token_changes(self):
+        credentials_source = create_autospec(CredentialsSource, instance=True)
+        credentials_source.token.side_effect = ["first", "first", "second"]
+        sess = DARSession(self.dar_url, credentials_source)
+
+        first = sess._get_headers()
+        cached_headers = sess._header_cache[1]
+        assert sess._get_headers() == first
+        assert sess._header_cache[1] is cached_headers
+
+        assert first["Authorization"] == "Bearer first"
+        assert sess._get_headers()["Authorization"] == "Bearer second"
+        assert credentials_source.token.call_count == 3
+
+    def test_returned_headers_can_be_modified(self):
+        sess = DARSession(self.dar_url, StaticCredentialsSource("12345"))
+
+        sess._get_headers()["Content-Type"] = "application/json"
+
+        assert "Content-Type" not in sess._get_headers()
+
+
+class TestDARSessionConnectionPool:
+    dar_url = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+
+    def test_pool_settings(self):
+        sess = DARSession(
+            self.dar_url,
+            StaticCredentialsSource("12345"),
+            pool_maxsize=8,
+            pool_block=True,
+            keep_alive=False,
+        )
+
+        for http in (sess.http, sess.http_post_retry):
+            assert http.retry_session.pool_maxsize == 8
+            assert http.retry_session.pool_block is True
+            assert http.retry_session.session.headers["Connection"] == "close"
+
+    def test_ensure_pool_size(self):
+        sess = DARSession(self.dar_url, StaticCredentialsSource("12345"))
+
+        sess.ensure_pool_size(32)
+
+        for http in (sess.http, sess.http_post_retry):
+            assert http.retry_session.pool_maxsize == 32
+
+
+class TestDARSessionCircuitBreaker:
+    dar_url = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+    inference_endpoint = "/inference/api/v3/models/my-model/versions/1"
+
+    def _prepare(self):
+        registry = CircuitBreakerRegistry(minimum_requests=3, open_duration=60)
+        sess = DARSession(
+            self.dar_url, StaticCredentialsSource("12345"), circuit_breakers=registry
+        )
+        sess.http = create_mock_session()
+        sess.http_post_retry = create_mock_session()
+        return sess
+
+    def test_opens_after_failures_and_fails_fast(self):
+        sess = self._prepare()
+        response_503 = create_mock_response()
+        response_503.status_code = 503
+        sess.http_post_retry.post.side_effect = [
+            response_503,
+            requests.exceptions.ConnectionError("reset"),
+            response_503,
+        ]
+        for _ in range(3):
+            with pytest.raises((DARHTTPException, requests.RequestException)):
+                sess.post_to_endpoint(self.inference_endpoint, {}, retry=True)
+
+        with pytest.raises(CircuitBreakerOpen) as exc_info:
+            sess.post_to_endpoint(self.inference_endpoint, {}, retry=True)
+
+        assert sess.http_post_retry.post.call_count == 3
+        assert exc_info.value.retry_after == pytest.approx(60, abs=1)
+        breaker = sess.circuit_breakers.get(sess.base_url + self.inference_endpoint)
+        assert breaker.state == OPEN
+
+    def test_other_family_is_not_affected(self):
+        sess = self._prepare()
+        sess.circuit_breakers.get(sess.base_url + self.inference_endpoint)._open()
+
+        sess.get_from_endpoint("/model-manager/api/v3/models")
+
+        assert sess.http.get.call_count == 1
+
+    def test_client_errors_are_successes(self):
+        sess = self._prepare()
+        response_404 = create_mock_response()
+        response_404.status_code = 404
+        sess.http.get.return_value = response_404
+        for _ in range(5):
+            with pytest.raises(DARHTTPException):
+                sess.get_from_endpoint("/model-manager/api/v3/models/missing")
+
+        breaker = sess.circuit_breakers.get(sess.base_url + "/model-manager/")
+        assert breaker.state == CLOSED
+
+
+@pytest.fixture
+def httpretty_echo():
+    httpretty.enable()
+    httpretty.register_uri(httpretty.POST, re.compile(".*"), body="{}")
+    yield
+    httpretty.disable()
+    httpretty.reset()
+
+
+def test_compressed_request_on_the_wire(httpretty_echo):
+    sess = DARSession(
+        "https://localhost/",
+        StaticCredentialsSource("12345"),
+        compress_requests=True,
+        compression_threshold=100,
+    )
+    payload = {"objects": [{"objectId": str(idx)} for idx in range(100)]}
+
+    sess.post_to_endpoint("/inference", payload)
+
+    request = httpretty.last_request()
+    assert request.headers["Content-Encoding"] == "gzip"
+    assert json.loads(gzip.decompress(request.body)) == payload
+
+
+class _StubInferenceHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; avoid delayed ACK stalls.
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server_url():
+    server = ThreadingHTTPServer(("localhost", 0), _StubInferenceHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://localhost:{}/".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_benchmark_post_to_endpoint(stub_server_url):
+    """
+    Measures the per-request overhead of post_to_endpoint against a local stub
+    server, and the share of it spent building headers.
+
+    Run with `pytest -s -k benchmark` to see the results.
+    """
+    sess = DARSession(stub_server_url, StaticCredentialsSource("12345"))
+    payload = {"topN": 1, "objects": [{"objectId": "1", "features": []}]}
+    repeat = 100
+
+    def measure(func):
+        return min(timeit.repeat(func, number=repeat, repeat=3)) / repeat
+
+    def get_uncached_headers():
+        sess._header_cache = (None, {})
+        return sess._get_headers()
+
+    per_request = measure(lambda: sess.post_to_endpoint("/inference", payload))
+    cached_headers = measure(sess._get_headers)
+    uncached_headers = measure(get_uncached_headers)
+
+    print(
+        "post_to_endpoint: {:8.1f} µs per request\n"
+        "_get_headers:     {:8.2f} µs cached, {:.2f} µs uncached".format(
+            per_request * 1e6, cached_headers * 1e6, uncached_headers * 1e6
+        )
+    )
+    assert sess.post_to_endpoint("/inference", payload).json() == {}
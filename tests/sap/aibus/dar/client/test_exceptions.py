@@ -2,7 +2,9 @@ import datetime
 from unittest.mock import PropertyMock
 
 from sap.aibus.dar.client.exceptions import (
+    CircuitBreakerOpen,
     DARHTTPException,
+    DownloadVerificationFailed,
     ModelAlreadyExists,
 )
 from tests.sap.aibus.dar.client.test_dar_session import create_mock_response
@@ -172,3 +174,29 @@ class TestModelAlreadyExists:
             " first or choose a different name."
         )
         assert str(e) == expected_message
+
+
+class TestCircuitBreakerOpen:
+    def test_message(self):
+        e = CircuitBreakerOpen("https://localhost/inference", 12.345)
+
+        assert str(e) == (
+            "Circuit breaker is open for 'https://localhost/inference'."
+            " Retry in 12.3 seconds."
+        )
+        assert e.url == "https://localhost/inference"
+        assert e.retry_after == 12.345
+
+
+class TestDownloadVerificationFailed:
+    def test_message(self):
+        e = DownloadVerificationFailed(
+            "https://localhost/files/a.csv", "/tmp/a.csv", "expected 2 bytes, got 1"
+        )
+
+        assert str(e) == (
+            "Download of 'https://localhost/files/a.csv' to '/tmp/a.csv' failed"
+            " verification: expected 2 bytes, got 1"
+        )
+        assert e.url == "https://localhost/files/a.csv"
+        assert e.local_path == "/tmp/a.csv"
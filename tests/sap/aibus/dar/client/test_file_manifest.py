@@ -0,0 +1,96 @@
+import hashlib
+import os
+
+from sap.aibus.dar.client.aiapi import file_manifest
+from sap.aibus.dar.client.aiapi.file_manifest import (
+    FileManifest,
+    ManifestEntry,
+    file_sha256,
+)
+
+
+class TestFileSha256:
+    def test_small_file(self, tmp_path):
+        path = tmp_path / "a.csv"
+        path.write_bytes(b"abc")
+
+        assert file_sha256(str(path)) == hashlib.sha256(b"abc").hexdigest()
+
+    def test_memory_mapped_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(file_manifest, "MMAP_THRESHOLD", 100)
+        content = os.urandom(1000)
+        path = tmp_path / "a.bin"
+        path.write_bytes(content)
+
+        assert file_sha256(str(path), chunk_size=64) == (
+            hashlib.sha256(content).hexdigest()
+        )
+
+    def test_empty_file(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(file_manifest, "MMAP_THRESHOLD", 0)
+        path = tmp_path / "empty"
+        path.write_bytes(b"")
+
+        assert file_sha256(str(path)) == hashlib.sha256(b"").hexdigest()
+
+
+class TestFileManifest:
+    def test_changed_entry(self, tmp_path):
+        path = tmp_path / "a.csv"
+        path.write_bytes(b"abc")
+        manifest = FileManifest(str(tmp_path / "manifest.json"))
+
+        entry = manifest.changed_entry(str(path), "/data/a.csv")
+        assert entry == ManifestEntry(
+            size=3,
+            mtime_ns=os.stat(str(path)).st_mtime_ns,
+            sha256=hashlib.sha256(b"abc").hexdigest(),
+        )
+        # Not recorded yet.
+        assert manifest.changed_entry(str(path), "/data/a.csv") == entry
+
+        manifest.record("/data/a.csv", entry)
+        assert manifest.changed_entry(str(path), "/data/a.csv") is None
+        # Another remote path is unknown.
+        assert manifest.changed_entry(str(path), "/other/a.csv") == entry
+
+    def test_touched_file_is_unchanged(self, tmp_path):
+        path = tmp_path / "a.csv"
+        path.write_bytes(b"abc")
+        manifest = FileManifest(str(tmp_path / "manifest.json"))
+        manifest.record("/a.csv", manifest.changed_entry(str(path), "/a.csv"))
+
+        os.utime(str(path), ns=(0, 10**9))
+
+        assert manifest.changed_entry(str(path), "/a.csv") is None
+        assert manifest.entries["/a.csv"].mtime_ns == 10**9
+
+    def test_modified_file_is_changed(self, tmp_path):
+        path = tmp_path / "a.csv"
+        path.write_bytes(b"abc")
+        manifest = FileManifest(str(tmp_path / "manifest.json"))
+        manifest.record("/a.csv", manifest.changed_entry(str(path), "/a.csv"))
+
+        path.write_bytes(b"abd")
+        os.utime(str(path), ns=(0, 10**9))
+
+        entry = manifest.changed_entry(str(path), "/a.csv")
+        assert entry.sha256 == hashlib.sha256(b"abd").hexdigest()
+
+    def test_save_and_load(self, tmp_path):
+        manifest_path = str(tmp_path / "manifest.json")
+        manifest = FileManifest(manifest_path)
+        manifest.record("/b.csv", ManifestEntry(1, 2, "ff"))
+        manifest.record("/a.csv", ManifestEntry(3, 4, "ee"))
+
+        manifest.save()
+
+        loaded = FileManifest(manifest_path)
+        assert loaded.entries == manifest.entries
+        assert os.listdir(str(tmp_path)) == ["manifest.json"]
+
+    def test_unreadable_manifest_is_ignored(self, tmp_path):
+        manifest_path = tmp_path / "manifest.json"
+        manifest_path.write_text("{not json")
+
+        assert FileManifest(str(manifest_path)).entries == {}
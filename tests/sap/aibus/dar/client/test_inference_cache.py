@@ -0,0 +1,199 @@
+from unittest.mock import create_autospec
+
+import pytest
+
+from sap.aibus.dar.client.inference_cache import (
+    CachingInferenceClient,
+    InMemoryInferenceCache,
+    SqliteInferenceCache,
+)
+from sap.aibus.dar.client.inference_client import InferenceClient
+
+
+class _BaseInferenceCacheTest:
+    def create_cache(self, tmp_path, max_size=3, ttl=None, timer=None):
+        raise NotImplementedError
+
+    def test_get_missing(self, tmp_path):
+        cache = self.create_cache(tmp_path)
+        assert cache.get("missing") is None
+
+    def test_put_and_get(self, tmp_path):
+        cache = self.create_cache(tmp_path)
+        cache.put("a", {"labels": [{"name": "category", "value": "ANVIL"}]})
+        assert cache.get("a") == {"labels": [{"name": "category", "value": "ANVIL"}]}
+
+    def test_lru_eviction(self, tmp_path, fake_timer):
+        cache = self.create_cache(tmp_path, max_size=2, timer=fake_timer)
+        cache.put("a", {"labels": ["a"]})
+        fake_timer.now += 1
+        cache.put("b", {"labels": ["b"]})
+        fake_timer.now += 1
+        # Accessing "a" makes "b" the least recently used entry.
+        assert cache.get("a") is not None
+        fake_timer.now += 1
+        cache.put("c", {"labels": ["c"]})
+
+        assert len(cache) == 2
+        assert cache.get("b") is None
+        assert cache.get("a") == {"labels": ["a"]}
+        assert cache.get("c") == {"labels": ["c"]}
+
+    def test_ttl(self, tmp_path, fake_timer):
+        cache = self.create_cache(tmp_path, ttl=10, timer=fake_timer)
+        cache.put("a", {"labels": ["a"]})
+        fake_timer.now += 10
+        assert cache.get("a") == {"labels": ["a"]}
+        fake_timer.now += 1
+        assert cache.get("a") is None
+
+    def test_clear(self, tmp_path):
+        cache = self.create_cache(tmp_path)
+        cache.put("a", {"labels": ["a"]})
+        cache.clear()
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_invalid_max_size(self, tmp_path):
+        with pytest.raises(ValueError):
+            self.create_cache(tmp_path, max_size=0)
+
+
+class TestInMemoryInferenceCache(_BaseInferenceCacheTest):
+    def create_cache(self, tmp_path, max_size=3, ttl=None, timer=None):
+        return InMemoryInferenceCache(max_size=max_size, ttl=ttl, timer=timer)
+
+    def test_returned_prediction_is_a_copy(self, tmp_path):
+        cache = self.create_cache(tmp_path)
+        cache.put("a", {"labels": ["a"]})
+        cache.get("a")["labels"].append("modified")
+        assert cache.get("a") == {"labels": ["a"]}
+
+    def test_stored_prediction_is_a_copy(self, tmp_path):
+        cache = self.create_cache(tmp_path)
+        prediction = {"labels": ["a"]}
+        cache.put("a", prediction)
+        prediction["labels"].append("modified")
+        assert cache.get("a") == {"labels": ["a"]}
+
+
+class TestSqliteInferenceCache(_BaseInferenceCacheTest):
+    def create_cache(self, tmp_path, max_size=3, ttl=None, timer=None):
+        return SqliteInferenceCache(
+            str(tmp_path / "cache.db"), max_size=max_size, ttl=ttl, timer=timer
+        )
+
+    def test_persistent(self, tmp_path):
+        cache = self.create_cache(tmp_path)
+        cache.put("a", {"labels": ["a"]})
+        cache.close()
+
+        cache = self.create_cache(tmp_path)
+        assert cache.get("a") == {"labels": ["a"]}
+
+
+def make_object(object_id, value):
+    return {"objectId": object_id, "features": [{"name": "f", "value": value}]}
+
+
+def predictions_for(objects, **_):
+    return [
+        {
+            "objectId": obj["objectId"],
+            "labels": [{"name": "category", "value": obj["features"][0]["value"]}],
+        }
+        for obj in objects
+    ]
+
+
+@pytest.fixture()
+def inner_client():
+    client = create_autospec(InferenceClient, instance=True)
+    client.do_bulk_inference.side_effect = lambda model_name, objects, **kwargs: (
+        predictions_for(objects)
+    )
+    client.create_inference_request.side_effect = (
+        lambda model_name, objects, **kwargs: {
+            "id": "response-id",
+            "status": "DONE",
+            "processedTime": "2018-08-31T11:45:54.727934+00:00",
+            "predictions": predictions_for(objects),
+        }
+    )
+    return client
+
+
+class TestCachingInferenceClient:
+    def test_cache_key(self):
+        obj = make_object("1", "x")
+        other_id = make_object("2", "x")
+        assert CachingInferenceClient.cache_key(
+            "model", 1, obj
+        ) == CachingInferenceClient.cache_key("model", 1, other_id)
+        assert CachingInferenceClient.cache_key(
+            "model", 1, obj
+        ) != CachingInferenceClient.cache_key("model", 2, obj)
+        assert CachingInferenceClient.cache_key(
+            "model", 1, obj
+        ) != CachingInferenceClient.cache_key("other-model", 1, obj)
+
+    def test_do_bulk_inference_only_sends_misses(self, inner_client):
+        client = CachingInferenceClient(inner_client, InMemoryInferenceCache())
+
+        first = client.do_bulk_inference("model", [make_object("1", "x")], top_n=2)
+        assert first == predictions_for([make_object("1", "x")])
+
+        objects = [
+            make_object("2", "y"),
+            make_object("3", "x"),
+            make_object("4", "z"),
+        ]
+        result = client.do_bulk_inference("model", objects, top_n=2)
+
+        assert result == predictions_for(objects)
+        last_call = inner_client.do_bulk_inference.call_args
+        assert last_call[0] == ("model", [objects[0], objects[2]])
+        assert last_call[1]["top_n"] == 2
+
+    def test_do_bulk_inference_all_hits(self, inner_client):
+        client = CachingInferenceClient(inner_client, InMemoryInferenceCache())
+        objects = [make_object("1", "x")]
+        client.do_bulk_inference("model", objects)
+        client.do_bulk_inference("model", objects)
+        assert inner_client.do_bulk_inference.call_count == 1
+
+    def test_errors_are_not_cached(self, inner_client):
+        inner_client.do_bulk_inference.side_effect = lambda model_name, objects, **_: [
+            {"objectId": obj["objectId"], "labels": None, "_sdk_error": "Error"}
+            for obj in objects
+        ]
+        cache = InMemoryInferenceCache()
+        client = CachingInferenceClient(inner_client, cache)
+
+        result = client.do_bulk_inference("model", [make_object("1", "x")])
+
+        assert result[0]["labels"] is None
+        assert len(cache) == 0
+
+    def test_returned_predictions_do_not_change_cache(self, inner_client):
+        client = CachingInferenceClient(inner_client, InMemoryInferenceCache())
+        objects = [make_object("1", "x")]
+
+        result = client.do_bulk_inference("model", objects)
+        result[0]["labels"][0]["value"] = "modified"
+
+        assert client.do_bulk_inference("model", objects) == predictions_for(objects)
+        assert inner_client.do_bulk_inference.call_count == 1
+
+    def test_create_inference_request(self, inner_client):
+        client = CachingInferenceClient(inner_client, InMemoryInferenceCache())
+        objects = [make_object("1", "x")]
+
+        response = client.create_inference_request("model", objects)
+        assert response["id"] == "response-id"
+        assert response["predictions"] == predictions_for(objects)
+
+        response = client.create_inference_request("model", objects)
+        assert response["id"] is None
+        assert response["predictions"] == predictions_for(objects)
+        assert inner_client.create_inference_request.call_count == 1
@@ -2,14 +2,30 @@
 # The pragma above causes mypy to ignore this file:
 # mypy cannot deal with some of the monkey-patching we do below.
 # https://github.com/python/mypy/issues/2427
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Optional
-from unittest.mock import call, Mock
+from unittest.mock import call, create_autospec, Mock, patch
 
 import pytest
 from requests import RequestException, Timeout
 
-from sap.aibus.dar.client.exceptions import DARHTTPException, InvalidWorkerCount
+from sap.aibus.dar.client.exceptions import (
+    CircuitBreakerOpen,
+    DARHTTPException,
+    InvalidWorkerCount,
+)
 from sap.aibus.dar.client.inference_client import InferenceClient
+from sap.aibus.dar.client.util import json_codec
+from sap.aibus.dar.client.util.concurrency import AdaptiveConcurrencyLimit
+from sap.aibus.dar.client.util.credentials import StaticCredentialsSource
+from sap.aibus.dar.client.util.hedging import HedgingPolicy
+from sap.aibus.dar.client.util.rate_limiting import (
+    RateLimiter,
+    SqliteTokenBucket,
+    TokenBucket,
+)
 from tests.sap.aibus.dar.client.test_data_manager_client import (
     AbstractDARClientConstruction,
     prepare_client,
@@ -29,6 +45,7 @@ def inference_client():
     return prepare_client(DAR_URL, InferenceClient)
 
 
+@pytest.mark.usefixtures("stdlib_json_backend")
 class TestInferenceClient:
     def objects(
         self, object_id: Optional[str] = "b5cbcb34-7ab9-4da5-b7ec-654c90757eb9"
@@ -296,6 +313,7 @@ class TestInferenceClient:
             exception_404,
             RequestException("Request Error"),
             Timeout("Timeout"),
+            CircuitBreakerOpen(url, 12.5),
         ]
         for exc in exceptions:
             inference_client.session.post_to_endpoint.side_effect = make_mock_post(exc)
@@ -403,3 +421,895 @@ class TestInferenceClient:
                 worker_count=None,
             )
             assert "worker_count cannot be None" in str(context.value)
+
+    def test_streaming_bulk_inference(self, inference_client: InferenceClient):
+        """
+        Tests that do_streaming_bulk_inference consumes a generator lazily and
+        yields predictions in input order.
+        """
+        inference_client.session.post_to_endpoint.return_value.json.side_effect = [
+            self.inference_response(50),
+            self.inference_response(25),
+        ]
+
+        def generate_objects():
+            for _ in range(75):
+                yield self.objects()[0]
+
+        predictions = inference_client.do_streaming_bulk_inference(
+            model_name="test-model",
+            objects=generate_objects(),
+            top_n=4,
+            worker_count=1,
+        )
+
+        # Nothing happens until the generator is consumed.
+        assert inference_client.session.post_to_endpoint.call_count == 0
+
+        assert list(predictions) == self.inference_response(75)["predictions"]
+
+        expected_calls_to_post = [
+            call(
+                "/inference/api/v3/models/test-model/versions/1",
+                payload={"topN": 4, "objects": [self.objects()[0]] * 50},
+                retry=True,
+            ),
+            call(
+                "/inference/api/v3/models/test-model/versions/1",
+                payload={"topN": 4, "objects": [self.objects()[0]] * 25},
+                retry=True,
+            ),
+        ]
+        assert (
+            inference_client.session.post_to_endpoint.call_args_list
+            == expected_calls_to_post
+        )
+
+    def test_streaming_bulk_inference_window_is_bounded(
+        self, inference_client: InferenceClient
+    ):
+        """
+        Tests that only a bounded number of batches is read ahead of the consumer.
+        """
+        inference_client.session.post_to_endpoint.return_value.json.side_effect = (
+            lambda: self.inference_response(50)
+        )
+        consumed = []
+
+        def generate_objects():
+            for idx in range(50 * 100):
+                consumed.append(idx)
+                yield self.objects()[0]
+
+        predictions = inference_client.do_streaming_bulk_inference(
+            model_name="test-model", objects=generate_objects(), worker_count=2
+        )
+        next(predictions)
+
+        # With two workers, four batches may be in flight. The first batch
+        # has been yielded, so at most five batches have been read.
+        assert len(consumed) <= 50 * 5
+        predictions.close()
+
+    def test_streaming_bulk_inference_error(self, inference_client: InferenceClient):
+        """
+        Tests that failed batches are replaced by placeholder predictions.
+        """
+        exc = RequestException("Request Error")
+        inference_client.session.post_to_endpoint.return_value.json.side_effect = [
+            self.inference_response(50),
+            exc,
+        ]
+
+        predictions = list(
+            inference_client.do_streaming_bulk_inference(
+                model_name="test-model",
+                objects=(self.objects()[0] for _ in range(60)),
+                worker_count=1,
+            )
+        )
+
+        expected_error_response = {
+            "objectId": "b5cbcb34-7ab9-4da5-b7ec-654c90757eb9",
+            "labels": None,
+            "_sdk_error": "RequestException: Request Error",
+        }
+        assert predictions[:50] == self.inference_response(50)["predictions"]
+        assert predictions[50:] == [expected_error_response] * 10
+
+    def test_streaming_bulk_inference_empty(self, inference_client: InferenceClient):
+        predictions = inference_client.do_streaming_bulk_inference(
+            model_name="test-model", objects=[]
+        )
+        assert list(predictions) == []
+        assert inference_client.session.post_to_endpoint.call_count == 0
+
+    def test_streaming_bulk_inference_worker_count_validation(
+        self, inference_client: InferenceClient
+    ):
+        # The error must be raised on the call, not on first iteration.
+        with pytest.raises(InvalidWorkerCount):
+            inference_client.do_streaming_bulk_inference(
+                model_name="test-model", objects=[], worker_count=0
+            )
+
+    def test_bulk_inference_adaptive_concurrency(
+        self, inference_client: InferenceClient
+    ):
+        """
+        Tests that a concurrency_limit allows more than four workers and shrinks
+        on overload.
+        """
+        response_429 = create_mock_response_404()
+        response_429.status_code = 429
+        exception_429 = DARHTTPException.create_from_response(DAR_URL, response_429)
+
+        def post_to_endpoint(*args, **kwargs):
+            objects = kwargs["payload"]["objects"]
+            if objects[0]["objectId"] == "overloaded":
+                raise exception_429
+            response = Mock()
+            response.json.return_value = self.inference_response(len(objects))
+            return response
+
+        inference_client.session.post_to_endpoint.side_effect = post_to_endpoint
+
+        concurrency_limit = AdaptiveConcurrencyLimit(
+            initial_limit=8, max_limit=12, latency_threshold=60
+        )
+        objects = [self.objects()[0] for _ in range(50 * 20)]
+        response = inference_client.do_bulk_inference(
+            "test-model",
+            objects,
+            worker_count=4,
+            concurrency_limit=concurrency_limit,
+        )
+        assert response == self.inference_response(50 * 20)["predictions"]
+        assert concurrency_limit.limit == 10
+        assert concurrency_limit.in_flight == 0
+
+        objects = [self.objects(object_id="overloaded")[0] for _ in range(50)]
+        response = inference_client.do_bulk_inference(
+            "test-model", objects, concurrency_limit=concurrency_limit
+        )
+        assert response[0]["labels"] is None
+        assert concurrency_limit.limit == 5
+
+    def test_bulk_inference_deduplicate(self, inference_client: InferenceClient):
+        """
+        Tests that objects with identical features are only sent once and that
+        predictions are fanned out with the original objectId.
+        """
+
+        def post_to_endpoint(*args, **kwargs):
+            response = Mock()
+            response.json.return_value = {
+                "id": "8ba8d237-7625-4986-8b31-ab5dca5cdd80",
+                "predictions": [
+                    {
+                        "objectId": obj["objectId"],
+                        "labels": [
+                            {"name": "category", "value": obj["features"][0]["value"]}
+                        ],
+                    }
+                    for obj in kwargs["payload"]["objects"]
+                ],
+            }
+            return response
+
+        inference_client.session.post_to_endpoint.side_effect = post_to_endpoint
+
+        objects = [
+            {
+                "objectId": str(idx),
+                "features": [{"name": "manufacturer", "value": str(idx % 60)}],
+            }
+            for idx in range(300)
+        ]
+
+        response = inference_client.do_bulk_inference(
+            "test-model", objects, worker_count=1, deduplicate=True
+        )
+
+        # 60 unique objects need two requests instead of six.
+        assert inference_client.session.post_to_endpoint.call_count == 2
+        assert [p["objectId"] for p in response] == [str(i) for i in range(300)]
+        assert [p["labels"][0]["value"] for p in response] == [
+            str(i % 60) for i in range(300)
+        ]
+        # Fanned out predictions do not share state.
+        assert response[0]["labels"] is not response[60]["labels"]
+
+    def test_bulk_inference_deduplicate_error(self, inference_client: InferenceClient):
+        inference_client.session.post_to_endpoint.return_value.json.side_effect = [
+            RequestException("Request Error")
+        ]
+        objects = [self.objects(object_id=str(idx))[0] for idx in range(3)]
+
+        response = inference_client.do_bulk_inference(
+            "test-model", objects, deduplicate=True
+        )
+
+        assert response == [
+            {
+                "objectId": str(idx),
+                "labels": None,
+                "_sdk_error": "RequestException: Request Error",
+            }
+            for idx in range(3)
+        ]
+
+    def test_resumable_bulk_inference(
+        self, inference_client: InferenceClient, tmp_path
+    ):
+        """
+        Tests that a second run only sends batches which failed in the first run.
+        """
+        journal_path = str(tmp_path / "journal.jsonl")
+        objects = [self.objects(object_id=str(idx))[0] for idx in range(120)]
+        failing = {"50"}
+
+        def post_to_endpoint(*args, **kwargs):
+            batch = kwargs["payload"]["objects"]
+            if batch[0]["objectId"] in failing:
+                raise RequestException("Request Error")
+            response = Mock()
+            response.json.return_value = {
+                "id": "8ba8d237-7625-4986-8b31-ab5dca5cdd80",
+                "predictions": [
+                    {"objectId": obj["objectId"], "labels": []} for obj in batch
+                ],
+            }
+            return response
+
+        inference_client.session.post_to_endpoint.side_effect = post_to_endpoint
+
+        first = inference_client.do_resumable_bulk_inference(
+            "test-model", objects, journal_path, worker_count=1
+        )
+        assert inference_client.session.post_to_endpoint.call_count == 3
+        assert [p["objectId"] for p in first] == [str(i) for i in range(120)]
+        assert first[50]["labels"] is None
+        assert first[0]["labels"] == []
+
+        failing.clear()
+        inference_client.session.post_to_endpoint.reset_mock()
+
+        second = inference_client.do_resumable_bulk_inference(
+            "test-model", iter(objects), journal_path, worker_count=1
+        )
+        # Only the failed batch is sent again.
+        assert inference_client.session.post_to_endpoint.call_count == 1
+        sent = inference_client.session.post_to_endpoint.call_args[1]["payload"]
+        assert sent["objects"] == objects[50:100]
+        assert [p["objectId"] for p in second] == [str(i) for i in range(120)]
+        assert all(p["labels"] == [] for p in second)
+
+        inference_client.session.post_to_endpoint.reset_mock()
+        third = inference_client.do_resumable_bulk_inference(
+            "test-model", objects, journal_path
+        )
+        assert inference_client.session.post_to_endpoint.call_count == 0
+        assert third == second
+
+    def test_bulk_inference_resubmit_bisects_poison_object(
+        self, inference_client: InferenceClient, monkeypatch
+    ):
+        """
+        Tests that failed batches are re-submitted and bisected until the single
+        object which always fails is isolated.
+        """
+        sleeps = []
+        monkeypatch.setattr(InferenceClient, "_sleep", staticmethod(sleeps.append))
+        transient_failures = {"60"}
+
+        def post_to_endpoint(*args, **kwargs):
+            batch = kwargs["payload"]["objects"]
+            object_ids = {obj["objectId"] for obj in batch}
+            if "poison" in object_ids:
+                raise RequestException("Poison")
+            if object_ids & transient_failures:
+                transient_failures.clear()
+                raise RequestException("Transient")
+            response = Mock()
+            response.json.return_value = {
+                "id": "8ba8d237-7625-4986-8b31-ab5dca5cdd80",
+                "predictions": [
+                    {"objectId": obj["objectId"], "labels": []} for obj in batch
+                ],
+            }
+            return response
+
+        inference_client.session.post_to_endpoint.side_effect = post_to_endpoint
+
+        objects = [self.objects(object_id=str(idx))[0] for idx in range(120)]
+        objects[10] = self.objects(object_id="poison")[0]
+
+        response = inference_client.do_bulk_inference(
+            "test-model", objects, worker_count=1, resubmit_rounds=7
+        )
+
+        assert [p["objectId"] for p in response] == [o["objectId"] for o in objects]
+        failed = [idx for idx, p in enumerate(response) if p["labels"] is None]
+        assert failed == [10]
+        assert response[10]["_sdk_error"] == "RequestException: Poison"
+        # 50 -> 25 -> 13 -> 7 -> 4 -> 2 -> 1: the poison object is isolated in
+        # round six, round seven only re-sends the poison object.
+        assert sleeps == [10, 20, 40, 80, 160, 320, 640]
+
+    def test_bulk_inference_resubmit_stops_when_successful(
+        self, inference_client: InferenceClient, monkeypatch
+    ):
+        sleeps = []
+        monkeypatch.setattr(InferenceClient, "_sleep", staticmethod(sleeps.append))
+        inference_client.session.post_to_endpoint.return_value.json.side_effect = [
+            RequestException("Transient"),
+            self.inference_response(50),
+        ]
+        objects = [self.objects()[0] for _ in range(50)]
+
+        response = inference_client.do_bulk_inference(
+            "test-model", objects, resubmit_rounds=3
+        )
+
+        assert response == self.inference_response(50)["predictions"]
+        assert sleeps == [10]
+        assert inference_client.session.post_to_endpoint.call_count == 2
+
+    def test_bulk_inference_resubmit_rounds_validation(
+        self, inference_client: InferenceClient
+    ):
+        with pytest.raises(ValueError):
+            inference_client.do_bulk_inference(
+                "test-model", self.objects(), resubmit_rounds=-1
+            )
+
+    def test_bulk_inference_max_payload_bytes(self, inference_client: InferenceClient):
+        """
+        Tests that request bodies respect max_payload_bytes and that each object
+        is encoded only once.
+        """
+        bodies = []
+
+        def post_json_to_endpoint(endpoint, data, retry):
+            bodies.append(data)
+            batch = json.loads(data.decode("utf-8"))["objects"]
+            response = Mock()
+            response.json.return_value = {
+                "id": "8ba8d237-7625-4986-8b31-ab5dca5cdd80",
+                "predictions": [
+                    {"objectId": obj["objectId"], "labels": []} for obj in batch
+                ],
+            }
+            return response
+
+        inference_client.session.post_json_to_endpoint.side_effect = (
+            post_json_to_endpoint
+        )
+        objects = []
+        for idx in range(60):
+            inference_object = self.objects(object_id=str(idx))[0]
+            if idx % 10 == 0:
+                inference_object["features"].append(
+                    {"name": "description", "value": "x" * 2000}
+                )
+            objects.append(inference_object)
+
+        with patch.object(json_codec, "dumps", wraps=json_codec.dumps) as dumps:
+            response = inference_client.do_bulk_inference(
+                "test-model", objects, max_payload_bytes=5000
+            )
+
+        assert dumps.call_count == len(objects)
+        assert [p["objectId"] for p in response] == [str(i) for i in range(60)]
+        assert all(len(body) <= 5000 for body in bodies)
+        # Splitting by count alone would have resulted in two requests.
+        assert len(bodies) > 2
+        inference_client.session.post_to_endpoint.assert_not_called()
+
+    def test_streaming_bulk_inference_max_payload_bytes(
+        self, inference_client: InferenceClient
+    ):
+        response = Mock()
+        response.json.return_value = self.inference_response(1)
+        inference_client.session.post_json_to_endpoint.return_value = response
+        objects = [
+            self.objects()[0],
+            {"objectId": "2", "features": [{"name": "text", "value": "x" * 500}]},
+        ]
+
+        predictions = list(
+            inference_client.do_streaming_bulk_inference(
+                "test-model", iter(objects), max_payload_bytes=300
+            )
+        )
+
+        assert len(predictions) == 2
+        assert inference_client.session.post_json_to_endpoint.call_count == 2
+
+    def test_unordered_bulk_inference(self, inference_client: InferenceClient):
+        """
+        Tests that a slow batch does not hold back batches which complete later.
+        """
+        first_batch_may_finish = threading.Event()
+
+        def post_to_endpoint(*args, **kwargs):
+            batch = kwargs["payload"]["objects"]
+            if batch[0]["objectId"] == "0":
+                assert first_batch_may_finish.wait(timeout=10)
+            response = Mock()
+            response.json.return_value = {
+                "id": "8ba8d237-7625-4986-8b31-ab5dca5cdd80",
+                "predictions": [
+                    {"objectId": obj["objectId"], "labels": []} for obj in batch
+                ],
+            }
+            return response
+
+        inference_client.session.post_to_endpoint.side_effect = post_to_endpoint
+        objects = (self.objects(object_id=str(idx))[0] for idx in range(120))
+
+        completed = []
+        for index_range, predictions in inference_client.do_unordered_bulk_inference(
+            "test-model", objects, worker_count=2
+        ):
+            completed.append(index_range)
+            assert [p["objectId"] for p in predictions] == [
+                str(idx) for idx in index_range
+            ]
+            first_batch_may_finish.set()
+
+        assert completed[0] != range(0, 50)
+        assert sorted(completed, key=lambda r: r.start) == [
+            range(0, 50),
+            range(50, 100),
+            range(100, 120),
+        ]
+
+    def test_unordered_bulk_inference_error(self, inference_client: InferenceClient):
+        inference_client.session.post_to_endpoint.return_value.json.side_effect = [
+            RequestException("Request Error")
+        ]
+
+        result = list(
+            inference_client.do_unordered_bulk_inference("test-model", self.objects())
+        )
+
+        assert len(result) == 1
+        index_range, predictions = result[0]
+        assert index_range == range(0, 1)
+        assert predictions[0]["labels"] is None
+
+    def test_unordered_bulk_inference_worker_count_validation(
+        self, inference_client: InferenceClient
+    ):
+        with pytest.raises(InvalidWorkerCount):
+            inference_client.do_unordered_bulk_inference(
+                "test-model", self.objects(), worker_count=0
+            )
+
+    def test_dataframe_inference(self, inference_client: InferenceClient):
+        pandas = pytest.importorskip("pandas")
+
+        def post_to_endpoint(*args, **kwargs):
+            payload = kwargs["payload"]
+            predictions = []
+            for obj in payload["objects"]:
+                features = {f["name"]: f["value"] for f in obj["features"]}
+                results = [
+                    {"value": features["title"] + str(rank), "probability": 0.5}
+                    for rank in range(payload["topN"])
+                ]
+                predictions.append(
+                    {
+                        "objectId": obj["objectId"],
+                        "labels": [{"name": "category", "results": results}],
+                    }
+                )
+            if features["title"] == "fail":
+                raise RequestException("Request Error")
+            response = Mock()
+            response.json.return_value = {"id": "1", "predictions": predictions}
+            return response
+
+        inference_client.session.post_to_endpoint.side_effect = post_to_endpoint
+        titles = ["t{}".format(idx) for idx in range(99)] + [None, "fail"]
+        data_frame = pandas.DataFrame(
+            {"text": titles, "other": 1}, index=range(1000, 1101)
+        )
+
+        result = inference_client.do_dataframe_inference(
+            "test-model", data_frame, {"title": "text"}, top_n=2
+        )
+
+        assert list(result.columns) == [
+            "category",
+            "category_probability",
+            "category_2",
+            "category_2_probability",
+            "error",
+        ]
+        assert result.index.equals(data_frame.index)
+        assert result.loc[1000, "category"] == "t00"
+        assert result.loc[1098, "category_2"] == "t981"
+        assert result.loc[1098, "category_probability"] == 0.5
+        # Missing values are sent as empty strings.
+        assert result.loc[1099, "category"] == "0"
+        # The third batch only contains the last row and failed.
+        assert pandas.isna(result.loc[1100, "category"])
+        assert result.loc[1100, "error"] == "RequestException: Request Error"
+        assert result["error"].isna().sum() == 100
+        sent = inference_client.session.post_to_endpoint.call_args_list[0][1]
+        assert sent["payload"]["objects"][0] == {
+            "objectId": "0",
+            "features": [{"name": "title", "value": "t0"}],
+        }
+
+    def test_dataframe_inference_feature_list(self, inference_client: InferenceClient):
+        pandas = pytest.importorskip("pandas")
+        inference_client.session.post_to_endpoint.return_value.json.return_value = {
+            "id": "8ba8d237-7625-4986-8b31-ab5dca5cdd80",
+            "predictions": [
+                {
+                    "objectId": "0",
+                    "labels": [
+                        {
+                            "name": "category",
+                            "results": [{"value": "ANVIL", "probability": 0.9}],
+                        }
+                    ],
+                }
+            ],
+        }
+        data_frame = pandas.DataFrame({"manufacturer": ["ACME"]})
+
+        result = inference_client.do_dataframe_inference(
+            "test-model", data_frame, ["manufacturer"]
+        )
+
+        assert result["category"].tolist() == ["ANVIL"]
+        sent = inference_client.session.post_to_endpoint.call_args_list[0][1]
+        assert sent["payload"]["objects"][0]["features"] == [
+            {"name": "manufacturer", "value": "ACME"}
+        ]
+
+    def test_object_rate_limiter(self, inference_client: InferenceClient):
+        rate_limiter = create_autospec(RateLimiter, instance=True)
+        inference_client.object_rate_limiter = rate_limiter
+        inference_client.session.post_to_endpoint.return_value.json.side_effect = (
+            lambda: self.inference_response(50)
+        )
+        inference_client.session.post_json_to_endpoint.return_value = (
+            inference_client.session.post_to_endpoint.return_value
+        )
+        inference_client.session.post_to_url.return_value = (
+            inference_client.session.post_to_endpoint.return_value
+        )
+
+        inference_client.do_bulk_inference("test-model", self.objects() * 60)
+        inference_client.do_bulk_inference(
+            "test-model", self.objects() * 3, max_payload_bytes=10000
+        )
+        inference_client.create_inference_request_with_url(DAR_URL, self.objects())
+
+        assert sorted(rate_limiter.acquire.call_args_list) == sorted(
+            [call(50), call(10), call(3), call(1)]
+        )
+
+    def test_bulk_inference_sizes_connection_pool(
+        self, inference_client: InferenceClient
+    ):
+        inference_client.session.post_to_endpoint.return_value.json.return_value = (
+            self.inference_response(1)
+        )
+
+        inference_client.do_bulk_inference("test-model", self.objects(), worker_count=2)
+        inference_client.do_bulk_inference(
+            "test-model",
+            self.objects(),
+            concurrency_limit=AdaptiveConcurrencyLimit(max_limit=24),
+        )
+
+        assert inference_client.session.ensure_pool_size.call_args_list == [
+            call(2),
+            call(24),
+        ]
+
+    def test_create_inference_request_with_hedging(
+        self, inference_client: InferenceClient
+    ):
+        first_request_sent = threading.Event()
+        release_first_request = threading.Event()
+        fast_response = Mock()
+        fast_response.json.return_value = self.inference_response(1)
+
+        def post(*args, **kwargs):
+            if not first_request_sent.is_set():
+                first_request_sent.set()
+                release_first_request.wait(5)
+                return Mock()
+            return fast_response
+
+        inference_client.session.post_to_endpoint.side_effect = post
+        inference_client.session.post_to_url.side_effect = post
+        hedging = HedgingPolicy(delay=0.01, max_extra_ratio=1)
+
+        try:
+            response = inference_client.create_inference_request(
+                "my-model", self.objects(), hedging=hedging
+            )
+            assert response == self.inference_response(1)
+            assert inference_client.session.post_to_endpoint.call_count == 2
+        finally:
+            release_first_request.set()
+
+        response = inference_client.create_inference_request_with_url(
+            DAR_URL, self.objects(), hedging=hedging
+        )
+        assert response == self.inference_response(1)
+        assert hedging.hedged_count == 1
+
+    def test_create_inference_request_with_fast_json(
+        self, inference_client: InferenceClient, monkeypatch
+    ):
+        pytest.importorskip("orjson")
+        monkeypatch.setattr(json_codec, "BACKEND", "orjson")
+        expected_response = self.inference_response(1)
+        response = Mock(content=json.dumps(expected_response).encode("utf-8"))
+        inference_client.session.post_to_endpoint.return_value = response
+
+        result = inference_client.create_inference_request("test-model", self.objects())
+
+        assert result == expected_response
+        response.json.assert_not_called()
+
+
+class _UppercaseInferenceHandler(BaseHTTPRequestHandler):
+    """
+    Predicts the upper-cased value of the first feature of each object.
+    """
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.authorizations.append(self.headers["Authorization"])
+        predictions = [
+            {
+                "objectId": inference_object["objectId"],
+                "labels": [
+                    {
+                        "name": "category",
+                        "results": [
+                            {
+                                "value": inference_object["features"][0][
+                                    "value"
+                                ].upper(),
+                                "probability": 1.0,
+                            }
+                        ],
+                    }
+                ],
+            }
+            for inference_object in body["objects"]
+        ]
+        if "/broken-model/" in self.path:
+            self.send_response(500)
+            response = b"{}"
+        elif "/garbage-model/" in self.path:
+            # E.g. an error page of a proxy in front of the service.
+            self.send_response(200)
+            response = b"<html>Bad Gateway</html>"
+        else:
+            self.send_response(200)
+            response = json.dumps({"id": "1", "predictions": predictions}).encode()
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def inference_server():
+    server = ThreadingHTTPServer(("localhost", 0), _UppercaseInferenceHandler)
+    server.authorizations = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(params=["json", "orjson", "ujson"])
+def json_backend(request, monkeypatch):
+    if request.param != "json":
+        pytest.importorskip(request.param)
+    monkeypatch.setattr(json_codec, "BACKEND", request.param)
+    return request.param
+
+
+class TestBulkInferenceJsonBackends:
+    """
+    Runs bulk inference against a local server with each JSON backend.
+    """
+
+    def client(self, server) -> InferenceClient:
+        url = "http://localhost:{}/".format(server.server_address[1])
+        return InferenceClient(url, StaticCredentialsSource("token"))
+
+    def objects(self, count):
+        return [
+            {
+                "objectId": str(idx),
+                "features": [{"name": "title", "value": "item-{}".format(idx)}],
+            }
+            for idx in range(count)
+        ]
+
+    def test_bulk_inference(self, inference_server, json_backend):
+        client = self.client(inference_server)
+
+        results = client.do_bulk_inference("my-model", self.objects(60))
+
+        assert [_to_tuple(result) for result in results] == [
+            (str(idx), "ITEM-{}".format(idx)) for idx in range(60)
+        ]
+
+    def test_bulk_inference_invalid_json(self, inference_server, json_backend):
+        client = self.client(inference_server)
+
+        results = client.do_bulk_inference(
+            "garbage-model", self.objects(60), retry=False
+        )
+
+        assert [result["objectId"] for result in results] == [
+            str(idx) for idx in range(60)
+        ]
+        assert all(result["labels"] is None for result in results)
+        assert all("_sdk_error" in result for result in results)
+
+    def test_streaming_bulk_inference_invalid_json(
+        self, inference_server, json_backend
+    ):
+        client = self.client(inference_server)
+
+        results = list(
+            client.do_streaming_bulk_inference(
+                "garbage-model", iter(self.objects(3)), retry=False
+            )
+        )
+
+        assert [_to_tuple(result) for result in results] == [
+            ("0", None),
+            ("1", None),
+            ("2", None),
+        ]
+
+
+def _add_suffix(inference_object):
+    inference_object["features"][0]["value"] += "-x"
+    return inference_object
+
+
+def _to_tuple(prediction):
+    if prediction["labels"] is None:
+        return prediction["objectId"], None
+    return prediction["objectId"], prediction["labels"][0]["results"][0]["value"]
+
+
+class TestMultiprocessBulkInference:
+    def objects(self, count):
+        return (
+            {
+                "objectId": str(idx),
+                "features": [{"name": "title", "value": "item-{}".format(idx)}],
+            }
+            for idx in range(count)
+        )
+
+    def client(self, server) -> InferenceClient:
+        url = "http://localhost:{}/".format(server.server_address[1])
+        return InferenceClient(url, StaticCredentialsSource("forwarded-token"))
+
+    def test_predictions_in_input_order(self, inference_server):
+        client = self.client(inference_server)
+
+        results = list(
+            client.do_multiprocess_bulk_inference(
+                "my-model",
+                self.objects(1010),
+                process_count=2,
+                worker_count=2,
+                preprocess=_add_suffix,
+                postprocess=_to_tuple,
+            )
+        )
+
+        assert results == [(str(idx), "ITEM-{}-X".format(idx)) for idx in range(1010)]
+        # 21 requests of up to 50 objects each
+        assert len(inference_server.authorizations) == 21
+        assert set(inference_server.authorizations) == {"Bearer forwarded-token"}
+
+    def test_without_hooks(self, inference_server):
+        client = self.client(inference_server)
+
+        results = list(
+            client.do_multiprocess_bulk_inference(
+                "my-model", self.objects(3), process_count=1
+            )
+        )
+
+        assert [result["objectId"] for result in results] == ["0", "1", "2"]
+        assert results[0]["labels"][0]["results"][0]["value"] == "ITEM-0"
+
+    def test_error(self, inference_server):
+        client = self.client(inference_server)
+
+        results = list(
+            client.do_multiprocess_bulk_inference(
+                "broken-model",
+                self.objects(2),
+                retry=False,
+                process_count=1,
+                postprocess=_to_tuple,
+            )
+        )
+
+        assert results == [("0", None), ("1", None)]
+
+    def test_empty(self, inference_server):
+        client = self.client(inference_server)
+
+        results = client.do_multiprocess_bulk_inference("my-model", [])
+
+        assert list(results) == []
+        assert inference_server.authorizations == []
+
+    def test_hooks_must_be_picklable(self):
+        client = InferenceClient(DAR_URL, StaticCredentialsSource("token"))
+
+        with pytest.raises(ValueError, match="top level of a module"):
+            client.do_multiprocess_bulk_inference(
+                "my-model", [], postprocess=lambda prediction: prediction
+            )
+
+    def test_rate_limiters_are_forwarded(self, inference_server, tmp_path):
+        client = self.client(inference_server)
+        path = str(tmp_path / "buckets.db")
+        client.session.rate_limiter = SqliteTokenBucket(
+            path, rate=1000, name="requests"
+        )
+        client.object_rate_limiter = SqliteTokenBucket(
+            path, rate=100000, name="objects"
+        )
+
+        list(
+            client.do_multiprocess_bulk_inference(
+                "my-model", self.objects(120), process_count=2
+            )
+        )
+
+        tokens = dict(
+            client.object_rate_limiter._connection.execute(
+                "SELECT name, tokens FROM token_buckets"
+            ).fetchall()
+        )
+        # Three requests with 120 objects; the bucket refills quickly.
+        assert tokens["requests"] < 1000
+        assert tokens["objects"] < 100000
+
+    def test_in_process_rate_limiter_is_rejected(self):
+        client = InferenceClient(DAR_URL, StaticCredentialsSource("token"))
+        client.object_rate_limiter = TokenBucket(rate=10)
+
+        with pytest.raises(ValueError, match="SqliteTokenBucket"):
+            client.do_multiprocess_bulk_inference("my-model", [])
+
+    def test_validation(self):
+        client = InferenceClient(DAR_URL, StaticCredentialsSource("token"))
+
+        with pytest.raises(ValueError):
+            client.do_multiprocess_bulk_inference("my-model", [], process_count=0)
+        with pytest.raises(InvalidWorkerCount):
+            client.do_multiprocess_bulk_inference("my-model", [], worker_count=5)
@@ -0,0 +1,68 @@
+import pytest
+
+from sap.aibus.dar.client.exceptions import JournalMismatch
+from sap.aibus.dar.client.inference_journal import BulkInferenceJournal
+
+BATCH = [{"objectId": "1", "features": [{"name": "f", "value": "x"}]}]
+PREDICTIONS = [{"objectId": "1", "labels": [{"name": "category", "value": "A"}]}]
+
+
+class TestBulkInferenceJournal:
+    def test_record_and_reopen(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        fingerprint = BulkInferenceJournal.fingerprint(BATCH)
+
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            assert journal.get(0, fingerprint) is None
+            journal.record(0, fingerprint, PREDICTIONS)
+
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            assert journal.get(0, fingerprint) == PREDICTIONS
+            assert journal.get(1, fingerprint) is None
+
+    def test_fingerprint_mismatch(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            journal.record(0, BulkInferenceJournal.fingerprint(BATCH), PREDICTIONS)
+
+        other_batch = [{"objectId": "2", "features": []}]
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            assert journal.get(0, BulkInferenceJournal.fingerprint(other_batch)) is None
+
+    def test_header_mismatch(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        BulkInferenceJournal(path, "my-model", 1).close()
+
+        with pytest.raises(JournalMismatch):
+            BulkInferenceJournal(path, "my-model", 2)
+        with pytest.raises(JournalMismatch):
+            BulkInferenceJournal(path, "other-model", 1)
+
+    def test_partial_line_is_ignored(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        fingerprint = BulkInferenceJournal.fingerprint(BATCH)
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            journal.record(0, fingerprint, PREDICTIONS)
+        with open(path, "a") as journal_file:
+            journal_file.write('{"batch": 1, "fingerp')
+
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            assert journal.get(0, fingerprint) == PREDICTIONS
+            assert journal.get(1, fingerprint) is None
+            journal.record(1, fingerprint, PREDICTIONS)
+
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            assert journal.get(1, fingerprint) == PREDICTIONS
+
+    def test_partial_header_is_discarded(self, tmp_path):
+        path = str(tmp_path / "journal.jsonl")
+        with open(path, "w") as journal_file:
+            journal_file.write('{"modelName": "my-mo')
+
+        fingerprint = BulkInferenceJournal.fingerprint(BATCH)
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            assert journal.get(0, fingerprint) is None
+            journal.record(0, fingerprint, PREDICTIONS)
+
+        with BulkInferenceJournal(path, "my-model", 1) as journal:
+            assert journal.get(0, fingerprint) == PREDICTIONS
@@ -0,0 +1,207 @@
+import math
+
+import pytest
+
+from sap.aibus.dar.client.inference_results import ColumnarPredictions
+
+
+def make_prediction(object_id, *labels):
+    return {
+        "objectId": object_id,
+        "labels": [
+            {
+                "name": name,
+                "results": [
+                    {"value": value, "probability": probability}
+                    for value, probability in results
+                ],
+            }
+            for name, results in labels
+        ],
+    }
+
+
+PREDICTIONS = [
+    make_prediction(
+        "a",
+        ("category", [("ANVIL", 0.75), ("HAMMER", 0.25)]),
+        ("color", [("BLACK", 1.0)]),
+    ),
+    {"objectId": "b", "labels": None, "_sdk_error": "RequestException: Error"},
+    make_prediction(
+        "c",
+        ("category", [("HAMMER", 0.5), ("ANVIL", 0.5)]),
+        ("color", [("RED", 0.875)]),
+    ),
+]
+
+
+@pytest.fixture()
+def predictions():
+    return ColumnarPredictions.from_predictions(iter(PREDICTIONS))
+
+
+class TestColumnarPredictions:
+    def test_columns(self, predictions: ColumnarPredictions):
+        assert predictions.object_ids == ["a", "b", "c"]
+        assert predictions.errors == {1: "RequestException: Error"}
+        assert list(predictions.object_index) == [0, 0, 0, 2, 2, 2]
+        assert predictions.label_names == ["category", "color"]
+        assert list(predictions.label_codes) == [0, 0, 1, 0, 0, 1]
+        assert list(predictions.ranks) == [0, 1, 0, 0, 1, 0]
+        assert predictions.values == ["ANVIL", "HAMMER", "BLACK", "RED"]
+        assert list(predictions.value_codes) == [0, 1, 2, 1, 0, 3]
+        assert list(predictions.probabilities) == [0.75, 0.25, 1.0, 0.5, 0.5, 0.875]
+
+    def test_row_access(self, predictions: ColumnarPredictions):
+        assert len(predictions) == 3
+        assert list(predictions) == PREDICTIONS
+        assert predictions[-1] == PREDICTIONS[2]
+        assert predictions[1:] == PREDICTIONS[1:]
+        with pytest.raises(IndexError):
+            predictions[3]  # pylint: disable=pointless-statement
+
+    def test_missing_probability(self):
+        predictions = ColumnarPredictions()
+        predictions.append(
+            {"objectId": "a", "labels": [{"name": "x", "results": [{"value": "1"}]}]}
+        )
+        assert math.isnan(predictions.probabilities[0])
+
+    def test_empty(self):
+        predictions = ColumnarPredictions()
+        assert len(predictions) == 0
+        assert list(predictions) == []
+
+    def test_to_pandas(self, predictions: ColumnarPredictions):
+        pandas = pytest.importorskip("pandas")
+
+        data_frame = predictions.to_pandas()
+
+        assert list(data_frame.columns) == [
+            "objectIndex",
+            "objectId",
+            "label",
+            "rank",
+            "value",
+            "probability",
+        ]
+        assert data_frame["objectIndex"].tolist() == [0, 0, 0, 2, 2, 2]
+        assert data_frame["objectId"].tolist() == ["a", "a", "a", "c", "c", "c"]
+        assert isinstance(data_frame["label"].dtype, pandas.CategoricalDtype)
+        assert data_frame["label"].tolist() == [
+            "category",
+            "category",
+            "color",
+            "category",
+            "category",
+            "color",
+        ]
+        assert data_frame["rank"].tolist() == [0, 1, 0, 0, 1, 0]
+        assert data_frame["value"].tolist() == [
+            "ANVIL",
+            "HAMMER",
+            "BLACK",
+            "HAMMER",
+            "ANVIL",
+            "RED",
+        ]
+        assert data_frame["probability"].tolist() == [
+            0.75,
+            0.25,
+            1.0,
+            0.5,
+            0.5,
+            0.875,
+        ]
+
+    def test_to_arrow(self, predictions: ColumnarPredictions):
+        pytest.importorskip("pyarrow")
+
+        table = predictions.to_arrow()
+
+        assert table.column_names == [
+            "objectIndex",
+            "objectId",
+            "label",
+            "rank",
+            "value",
+            "probability",
+        ]
+        rows = table.to_pylist()
+        assert rows[0] == {
+            "objectIndex": 0,
+            "objectId": "a",
+            "label": "category",
+            "rank": 0,
+            "value": "ANVIL",
+            "probability": 0.75,
+        }
+        assert [row["value"] for row in rows] == [
+            "ANVIL",
+            "HAMMER",
+            "BLACK",
+            "HAMMER",
+            "ANVIL",
+            "RED",
+        ]
+
+    def test_empty_conversions(self):
+        pytest.importorskip("pandas")
+        pytest.importorskip("pyarrow")
+        predictions = ColumnarPredictions()
+
+        assert len(predictions.to_pandas()) == 0
+        assert predictions.to_arrow().num_rows == 0
+
+    def test_missing_optional_dependency(self, monkeypatch):
+        def import_module(name):
+            raise ImportError("No module named " + name)
+
+        monkeypatch.setattr(
+            "sap.aibus.dar.client.inference_results.importlib.import_module",
+            import_module,
+        )
+
+        with pytest.raises(ImportError, match=r"\[pandas\]"):
+            ColumnarPredictions().to_pandas()
+        with pytest.raises(ImportError, match=r"\[arrow\]"):
+            ColumnarPredictions().to_arrow()
+
+    def test_to_wide_pandas(self, predictions: ColumnarPredictions):
+        pandas = pytest.importorskip("pandas")
+
+        data_frame = predictions.to_wide_pandas(index=["x", "y", "z"])
+
+        assert list(data_frame.columns) == [
+            "objectId",
+            "category",
+            "category_probability",
+            "category_2",
+            "category_2_probability",
+            "color",
+            "color_probability",
+            "color_2",
+            "color_2_probability",
+            "error",
+        ]
+        assert list(data_frame.index) == ["x", "y", "z"]
+        assert data_frame["objectId"].tolist() == ["a", "b", "c"]
+        assert isinstance(data_frame["category"].dtype, pandas.CategoricalDtype)
+        assert data_frame.loc["x", "category"] == "ANVIL"
+        assert data_frame.loc["x", "category_2_probability"] == 0.25
+        assert data_frame.loc["z", "category_2"] == "ANVIL"
+        assert data_frame.loc["z", "color"] == "RED"
+        assert pandas.isna(data_frame.loc["z", "color_2"])
+        assert pandas.isna(data_frame.loc["y", "category"])
+        assert pandas.isna(data_frame.loc["y", "category_probability"])
+        assert data_frame["error"].isna().tolist() == [True, False, True]
+        assert data_frame.loc["y", "error"] == "RequestException: Error"
+
+    def test_to_wide_pandas_empty(self):
+        pytest.importorskip("pandas")
+
+        data_frame = ColumnarPredictions().to_wide_pandas()
+
+        assert list(data_frame.columns) == ["objectId", "error"]
+        assert len(data_frame) == 0
@@ -0,0 +1,199 @@
+import asyncio
+
+import pytest
+
+from sap.aibus.dar.client.exceptions import HTTPSRequired
+from sap.aibus.dar.client.util.async_http_transport import (
+    AsyncTimeoutPostRetrySession,
+    AsyncTimeoutRetrySession,
+)
+from sap.aibus.dar.client.util.http_transport import RetryBudget
+
+httpx = pytest.importorskip("httpx")
+
+URL = "https://localhost/"
+
+
+class _RecordingSleep:
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, how_long):
+        self.calls.append(how_long)
+
+
+def create_session(clazz, handler, num_retries=3, **kwargs):
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    session = clazz(num_retries=num_retries, client=client, **kwargs)
+    session.sleep = _RecordingSleep()
+    return session
+
+
+def status_sequence(*status_codes, headers=None):
+    remaining = list(status_codes)
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(remaining.pop(0), headers=headers)
+
+    return handler, requests
+
+
+class TestAsyncTimeoutRetrySession:
+    class_under_test = AsyncTimeoutRetrySession
+
+    def test_https_enforced(self):
+        session = self.class_under_test()
+        with pytest.raises(HTTPSRequired):
+            asyncio.run(session.get("http://aiservices-dar.cfapps.xxx.ondemand.com/"))
+
+    def test_default_timeouts(self):
+        session = self.class_under_test()
+        assert session.client.timeout.connect == 240
+        assert session.client.timeout.read == 240
+        assert session.num_retries == 7
+
+    def test_get_is_retried_on_status(self):
+        handler, requests = status_sequence(503, 500, 200)
+        session = create_session(self.class_under_test, handler, jitter=False)
+
+        response = asyncio.run(session.get(URL))
+
+        assert response.status_code == 200
+        assert len(requests) == 3
+        # No delay before first retry, as in urllib3.
+        assert session.sleep.calls == [0, 0.1]
+
+    def test_backoff_is_jittered_and_capped(self):
+        handler, _ = status_sequence(*([503] * 8), 200)
+        session = create_session(
+            self.class_under_test, handler, num_retries=8, max_backoff=1.0
+        )
+
+        asyncio.run(session.get(URL))
+
+        assert session.sleep.calls[0] == 0
+        assert all(0 <= delay <= 1.0 for delay in session.sleep.calls)
+        # Without jitter, the last delays would all be exactly max_backoff.
+        assert session.sleep.calls[-3:] != [1.0, 1.0, 1.0]
+
+    def test_retry_after_is_capped(self):
+        handler, _ = status_sequence(429, 200, headers={"Retry-After": "3600"})
+        session = create_session(self.class_under_test, handler, max_backoff=5)
+
+        asyncio.run(session.get(URL))
+
+        assert session.sleep.calls == [5]
+
+    def test_retry_budget_exhausted_returns_response(self):
+        budget = RetryBudget(ratio=0, min_retries=1)
+        handler, requests = status_sequence(503, 503, 503, 200)
+        session = create_session(self.class_under_test, handler, retry_budget=budget)
+
+        response = asyncio.run(session.get(URL))
+
+        assert response.status_code == 503
+        assert len(requests) == 2
+
+    def test_retry_budget_exhausted_raises_error(self):
+        budget = RetryBudget(ratio=0, min_retries=0)
+
+        def handler(request):
+            raise httpx.ConnectError("refused", request=request)
+
+        session = create_session(self.class_under_test, handler, retry_budget=budget)
+
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(session.get(URL))
+        assert len(budget._requests) == 1
+
+    def test_retries_exhausted_returns_last_response(self):
+        handler, requests = status_sequence(500, 500, 502)
+        session = create_session(self.class_under_test, handler, num_retries=2)
+
+        response = asyncio.run(session.delete(URL))
+
+        assert response.status_code == 502
+        assert len(requests) == 3
+
+    def test_non_retryable_status_is_returned(self):
+        handler, requests = status_sequence(404)
+        session = create_session(self.class_under_test, handler)
+
+        response = asyncio.run(session.put(URL))
+
+        assert response.status_code == 404
+        assert len(requests) == 1
+
+    def test_retry_after_is_honored(self):
+        handler, _ = status_sequence(429, 200, headers={"Retry-After": "3"})
+        session = create_session(self.class_under_test, handler)
+
+        response = asyncio.run(session.get(URL))
+
+        assert response.status_code == 200
+        assert session.sleep.calls == [3.0]
+
+    def test_post_is_not_retried(self):
+        handler, requests = status_sequence(503, 200)
+        session = create_session(AsyncTimeoutRetrySession, handler)
+
+        response = asyncio.run(session.post(URL, json={}))
+
+        assert response.status_code == 503
+        assert len(requests) == 1
+
+    def test_connect_error_is_always_retried(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200)
+
+        session = create_session(AsyncTimeoutRetrySession, handler)
+
+        response = asyncio.run(session.post(URL, json={}))
+
+        assert response.status_code == 200
+        assert len(attempts) == 2
+
+    def test_read_timeout_raised_for_post(self):
+        def handler(request):
+            raise httpx.ReadTimeout("timeout", request=request)
+
+        session = create_session(AsyncTimeoutRetrySession, handler)
+
+        with pytest.raises(httpx.ReadTimeout):
+            asyncio.run(session.post(URL, json={}))
+
+
+class TestAsyncTimeoutPostRetrySession(TestAsyncTimeoutRetrySession):
+    class_under_test = AsyncTimeoutPostRetrySession
+
+    def test_post_is_retried(self):
+        handler, requests = status_sequence(503, 200)
+        session = create_session(self.class_under_test, handler)
+
+        response = asyncio.run(session.post(URL, json={}))
+
+        assert response.status_code == 200
+        assert len(requests) == 2
+
+    def test_read_timeout_retried_for_post(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) < 3:
+                raise httpx.ReadTimeout("timeout", request=request)
+            return httpx.Response(200)
+
+        session = create_session(self.class_under_test, handler)
+
+        response = asyncio.run(session.post(URL, json={}))
+
+        assert response.status_code == 200
+        assert len(attempts) == 3
@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from sap.aibus.dar.client.util.batching import (
+    InferenceBatch,
+    InferenceBatchPlanner,
+    encode_object,
+)
+
+
+def make_object(object_id: str, text: str = "x") -> dict:
+    return {"objectId": object_id, "features": [{"name": "text", "value": text}]}
+
+
+class TestInferenceBatch:
+    def test_to_json(self):
+        batch = InferenceBatch(top_n=3)
+        objects = [make_object("1"), make_object("2", "äöü")]
+        for obj in objects:
+            batch.append(obj, encode_object(obj))
+
+        assert len(batch) == 2
+        assert batch.objects == objects
+        assert json.loads(batch.to_json().decode("utf-8")) == {
+            "topN": 3,
+            "objects": objects,
+        }
+        assert batch.size == len(batch.to_json())
+
+    def test_empty(self):
+        batch = InferenceBatch(top_n=1)
+        assert json.loads(batch.to_json().decode("utf-8")) == {
+            "topN": 1,
+            "objects": [],
+        }
+        assert batch.size == len(batch.to_json())
+
+
+class TestInferenceBatchPlanner:
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            InferenceBatchPlanner(max_objects=0)
+        with pytest.raises(ValueError):
+            InferenceBatchPlanner(max_objects=50, max_bytes=0)
+
+    def test_split_by_count(self):
+        planner = InferenceBatchPlanner(max_objects=2)
+        objects = [make_object(str(idx)) for idx in range(5)]
+
+        batches = list(planner.plan(objects, top_n=1))
+
+        assert [batch.objects for batch in batches] == [
+            objects[0:2],
+            objects[2:4],
+            objects[4:5],
+        ]
+
+    def test_split_by_size(self):
+        objects = [
+            make_object("1", "a" * 100),
+            make_object("2", "b" * 10),
+            make_object("3", "c" * 10),
+            make_object("4", "d" * 100),
+        ]
+        max_bytes = 320
+        planner = InferenceBatchPlanner(max_objects=50, max_bytes=max_bytes)
+
+        batches = list(planner.plan(objects, top_n=1))
+
+        assert [len(batch) for batch in batches] == [3, 1]
+        for batch in batches:
+            assert len(batch.to_json()) == batch.size <= max_bytes
+
+    def test_exact_fit(self):
+        objects = [make_object("1"), make_object("2")]
+        batch = InferenceBatch(top_n=1)
+        for obj in objects:
+            batch.append(obj, encode_object(obj))
+
+        fits = InferenceBatchPlanner(max_objects=50, max_bytes=batch.size)
+        too_small = InferenceBatchPlanner(max_objects=50, max_bytes=batch.size - 1)
+
+        assert len(list(fits.plan(objects, top_n=1))) == 1
+        assert len(list(too_small.plan(objects, top_n=1))) == 2
+
+    def test_oversized_object_is_sent_alone(self):
+        objects = [
+            make_object("1"),
+            make_object("2", "x" * 1000),
+            make_object("3"),
+        ]
+        planner = InferenceBatchPlanner(max_objects=50, max_bytes=200)
+
+        batches = list(planner.plan(objects, top_n=1))
+
+        assert [batch.objects for batch in batches] == [
+            objects[0:1],
+            objects[1:2],
+            objects[2:3],
+        ]
+
+    def test_empty(self):
+        planner = InferenceBatchPlanner(max_objects=50, max_bytes=200)
+        assert list(planner.plan([], top_n=1)) == []
+
+    def test_consumes_lazily(self):
+        consumed = []
+
+        def generate_objects():
+            for idx in range(10):
+                consumed.append(idx)
+                yield make_object(str(idx))
+
+        planner = InferenceBatchPlanner(max_objects=2)
+        batches = planner.plan(generate_objects(), top_n=1)
+
+        next(batches)
+        assert consumed == [0, 1, 2]
@@ -0,0 +1,138 @@
+import pytest
+
+from sap.aibus.dar.client.util.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+)
+
+
+def create_open_breaker(timer, **kwargs):
+    breaker = CircuitBreaker(
+        minimum_requests=4, open_duration=30, timer=timer, **kwargs
+    )
+    for _ in range(4):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+    return breaker
+
+
+class TestCircuitBreaker:
+    def test_invalid_arguments(self):
+        for kwargs in [
+            {"failure_rate_threshold": 0},
+            {"failure_rate_threshold": 1.5},
+            {"minimum_requests": 0},
+            {"half_open_requests": 0},
+        ]:
+            with pytest.raises(ValueError):
+                CircuitBreaker(**kwargs)
+
+    def test_stays_closed_below_threshold(self, fake_timer):
+        breaker = CircuitBreaker(
+            failure_rate_threshold=0.5, minimum_requests=4, timer=fake_timer
+        )
+
+        for _ in range(10):
+            breaker.record_success()
+            breaker.record_success()
+            breaker.record_failure()
+
+        assert breaker.state == CLOSED
+        assert breaker.allow_request()
+
+    def test_needs_minimum_requests(self, fake_timer):
+        breaker = CircuitBreaker(minimum_requests=4, timer=fake_timer)
+
+        for _ in range(3):
+            breaker.record_failure()
+
+        assert breaker.state == CLOSED
+
+    def test_opens_at_threshold(self, fake_timer):
+        breaker = create_open_breaker(fake_timer)
+
+        assert not breaker.allow_request()
+        fake_timer.now = 10
+        assert breaker.remaining_open_time() == 20
+
+    def test_failures_leave_window(self, fake_timer):
+        breaker = CircuitBreaker(minimum_requests=4, window=60, timer=fake_timer)
+        for _ in range(3):
+            breaker.record_failure()
+        for _ in range(3):
+            breaker.record_success()
+
+        fake_timer.now = 61
+        breaker.record_failure()
+
+        # Only one request is left in the window.
+        assert breaker.state == CLOSED
+
+    def test_half_open_limits_probes(self, fake_timer):
+        breaker = create_open_breaker(fake_timer, half_open_requests=2)
+
+        fake_timer.now = 30
+
+        assert breaker.state == HALF_OPEN
+        assert breaker.remaining_open_time() == 0
+        assert [breaker.allow_request() for _ in range(3)] == [True, True, False]
+        breaker.release()
+        assert breaker.allow_request()
+
+    def test_successful_probe_closes(self, fake_timer):
+        breaker = create_open_breaker(fake_timer)
+        fake_timer.now = 30
+        assert breaker.allow_request()
+
+        breaker.record_success()
+
+        assert breaker.state == CLOSED
+        # The failures before opening are forgotten.
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_failed_probe_opens_again(self, fake_timer):
+        breaker = create_open_breaker(fake_timer)
+        fake_timer.now = 30
+        assert breaker.allow_request()
+
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        assert breaker.remaining_open_time() == 30
+
+    def test_late_outcomes_while_open_are_ignored(self, fake_timer):
+        breaker = create_open_breaker(fake_timer)
+
+        breaker.record_success()
+        breaker.record_failure()
+
+        assert breaker.state == OPEN
+        assert breaker.remaining_open_time() == 30
+
+
+class TestCircuitBreakerRegistry:
+    def test_one_breaker_per_host_and_family(self):
+        registry = CircuitBreakerRegistry()
+
+        inference = registry.get("https://a.example.com/inference/api/v3/models/x")
+
+        assert inference is registry.get("https://a.example.com/inference/other")
+        assert inference is not registry.get("https://b.example.com/inference/x")
+        assert inference is not registry.get("https://a.example.com/data-manager/")
+
+    def test_breaker_settings(self):
+        registry = CircuitBreakerRegistry(minimum_requests=3, open_duration=5)
+
+        breaker = registry.get("https://a.example.com/inference")
+
+        assert breaker.minimum_requests == 3
+        assert breaker.open_duration == 5
+
+    def test_invalid_settings(self):
+        with pytest.raises(ValueError):
+            CircuitBreakerRegistry(minimum_requests=0)
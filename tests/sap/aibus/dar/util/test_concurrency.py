@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from sap.aibus.dar.client.util.concurrency import AdaptiveConcurrencyLimit
+
+
+class TestAdaptiveConcurrencyLimit:
+    def test_invalid_arguments(self):
+        for kwargs in [
+            {"min_limit": 0},
+            {"initial_limit": 5, "max_limit": 4},
+            {"initial_limit": 1, "min_limit": 2},
+            {"decrease_factor": 1},
+            {"decrease_factor": 0},
+        ]:
+            with pytest.raises(ValueError):
+                AdaptiveConcurrencyLimit(**kwargs)
+
+    def test_additive_increase(self, fake_timer):
+        limit = AdaptiveConcurrencyLimit(initial_limit=2, max_limit=8, timer=fake_timer)
+
+        # Each fast request increases the limit by 1 / limit, i.e. by about one
+        # per round-trip: 2 -> 2.5 -> 2.9 -> 3.24
+        for _ in range(3):
+            started_at = limit.acquire()
+            fake_timer.now += 1
+            limit.release(started_at)
+
+        assert limit.limit == 3
+
+    def test_increase_stops_at_ceiling(self, fake_timer):
+        limit = AdaptiveConcurrencyLimit(initial_limit=4, max_limit=6, timer=fake_timer)
+
+        for _ in range(100):
+            limit.release(limit.acquire())
+
+        assert limit.limit == 6
+
+    def test_multiplicative_decrease_on_overload(self, fake_timer):
+        limit = AdaptiveConcurrencyLimit(initial_limit=8, max_limit=8, timer=fake_timer)
+
+        started_at = limit.acquire()
+        fake_timer.now += 1
+        limit.release(started_at, overloaded=True)
+
+        assert limit.limit == 4
+
+    def test_decrease_stops_at_floor(self, fake_timer):
+        limit = AdaptiveConcurrencyLimit(initial_limit=4, min_limit=2, timer=fake_timer)
+
+        for _ in range(5):
+            started_at = limit.acquire()
+            fake_timer.now += 1
+            limit.release(started_at, overloaded=True)
+
+        assert limit.limit == 2
+
+    def test_decrease_once_per_round_trip(self, fake_timer):
+        limit = AdaptiveConcurrencyLimit(initial_limit=8, max_limit=8, timer=fake_timer)
+
+        # Four requests are started concurrently and all fail: the limit is
+        # only halved once.
+        started = [limit.acquire() for _ in range(4)]
+        fake_timer.now += 1
+        for started_at in started:
+            limit.release(started_at, overloaded=True)
+
+        assert limit.limit == 4
+
+    def test_slow_request_with_threshold(self, fake_timer):
+        limit = AdaptiveConcurrencyLimit(
+            initial_limit=8, max_limit=8, latency_threshold=5, timer=fake_timer
+        )
+
+        started_at = limit.acquire()
+        fake_timer.now += 6
+        limit.release(started_at)
+
+        assert limit.limit == 4
+
+    def test_slow_request_relative_to_fastest(self, fake_timer):
+        limit = AdaptiveConcurrencyLimit(initial_limit=8, max_limit=8, timer=fake_timer)
+
+        for duration in [1.0, 1.5, 3.0]:
+            started_at = limit.acquire()
+            fake_timer.now += duration
+            limit.release(started_at)
+
+        # The first two requests are fast, the third one took more than twice
+        # as long as the fastest request.
+        assert limit.limit == 4
+
+    def test_acquire_blocks_at_limit(self):
+        limit = AdaptiveConcurrencyLimit(initial_limit=1, max_limit=1)
+        started_at = limit.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limit.release(limit.acquire())
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        assert not acquired.wait(0.1)
+        assert limit.in_flight == 1
+
+        limit.release(started_at)
+        assert acquired.wait(5)
+        thread.join()
+        assert limit.in_flight == 0
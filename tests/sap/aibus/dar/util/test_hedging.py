@@ -0,0 +1,124 @@
+import threading
+
+import pytest
+
+from sap.aibus.dar.client.util.hedging import HedgingPolicy
+
+
+class SlowThenFast:
+    """
+    Blocks the first call until released; later calls return immediately.
+    """
+
+    def __init__(self, first_result="slow", exception=None):
+        self.first_result = first_result
+        self.exception = exception
+        self.calls = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call_number = self.calls
+        if call_number == 1:
+            self.release.wait(5)
+            return self.first_result
+        if self.exception is not None:
+            raise self.exception
+        return "fast"
+
+
+class TestHedgingPolicy:
+    def test_invalid_arguments(self):
+        for kwargs in [
+            {"percentile": 0},
+            {"percentile": 101},
+            {"delay": -1},
+            {"min_samples": 0},
+            {"min_samples": 10, "max_samples": 5},
+            {"max_extra_ratio": -0.1},
+        ]:
+            with pytest.raises(ValueError):
+                HedgingPolicy(**kwargs)
+
+    def test_current_delay_from_percentile(self, fake_timer):
+        policy = HedgingPolicy(
+            percentile=90, initial_delay=2.0, min_samples=10, timer=fake_timer
+        )
+
+        def take(seconds):
+            fake_timer.now += seconds
+            return None
+
+        for latency in range(1, 10):
+            policy.call(lambda latency=latency: take(latency))
+        assert policy.current_delay() == 2.0
+
+        policy.call(lambda: take(10))
+        assert policy.current_delay() == 9
+
+    def test_fixed_delay(self):
+        policy = HedgingPolicy(delay=0.5, percentile=50)
+
+        for _ in range(100):
+            policy.call(lambda: None)
+
+        assert policy.current_delay() == 0.5
+
+    def test_fast_call_is_not_hedged(self):
+        policy = HedgingPolicy(delay=5, max_extra_ratio=1)
+        func = SlowThenFast()
+        func.release.set()
+
+        assert policy.call(func) == "slow"
+        assert func.calls == 1
+        assert policy.hedged_count == 0
+
+    def test_slow_call_is_hedged(self):
+        policy = HedgingPolicy(delay=0.01, max_extra_ratio=1)
+        func = SlowThenFast()
+
+        try:
+            assert policy.call(func) == "fast"
+        finally:
+            func.release.set()
+
+        assert func.calls == 2
+        assert policy.hedged_count == 1
+
+    def test_failed_hedge_waits_for_first_call(self):
+        policy = HedgingPolicy(delay=0.01, max_extra_ratio=1)
+        func = SlowThenFast(exception=ValueError("hedge failed"))
+        threading.Timer(0.1, func.release.set).start()
+
+        assert policy.call(func) == "slow"
+        assert func.calls == 2
+
+    def test_first_error_raised_if_both_fail(self):
+        policy = HedgingPolicy(delay=0.01, max_extra_ratio=1)
+        func = SlowThenFast(first_result=None, exception=ValueError("hedge failed"))
+
+        def first_fails():
+            if func() is None:
+                raise KeyError("first failed")
+            return "fast"
+
+        threading.Timer(0.1, func.release.set).start()
+
+        with pytest.raises(KeyError):
+            policy.call(first_fails)
+
+    def test_extra_requests_are_capped(self):
+        policy = HedgingPolicy(delay=0.01, max_extra_ratio=0.5)
+
+        results = []
+        for _ in range(4):
+            func = SlowThenFast()
+            threading.Timer(0.1, func.release.set).start()
+            results.append(policy.call(func))
+
+        # At most one hedge per two requests: the 2nd and 4th requests wait for
+        # the slow response.
+        assert results == ["fast", "slow", "fast", "slow"]
+        assert policy.hedged_count == 2
@@ -1,12 +1,16 @@
 from typing import Any, Set
 from unittest.mock import Mock, create_autospec
 
+import httpretty
 import pytest
 from requests import Session
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
 
 from sap.aibus.dar.client.exceptions import HTTPSRequired
 from sap.aibus.dar.client.util import http_transport
 from sap.aibus.dar.client.util.http_transport import (
+    JitteredRetry,
+    RetryBudget,
     RetrySession,
     TimeoutSession,
     TimeoutRetrySession,
@@ -60,6 +64,41 @@ class _BaseRetrySessionTest(_BaseHTTPSEnforcedTest):
             adapter = cal[0][1]
             self._assert_retry_set_up_correctly(adapter)
 
+    def test_pool_settings(self):
+        session = self.class_under_test(
+            self.num_retries, pool_connections=2, pool_maxsize=20, pool_block=True
+        )
+
+        for adapter in session.adapters.values():
+            assert adapter.poolmanager.connection_pool_kw["maxsize"] == 20
+            assert adapter.poolmanager.connection_pool_kw["block"] is True
+            assert adapter.poolmanager.pools._maxsize == 2
+        assert session.session.headers["Connection"] == "keep-alive"
+
+    def test_invalid_pool_settings(self):
+        for kwargs in [{"pool_connections": 0}, {"pool_maxsize": 0}]:
+            with pytest.raises(ValueError):
+                self.class_under_test(self.num_retries, **kwargs)
+
+    def test_keep_alive_disabled(self):
+        session = self.class_under_test(self.num_retries, keep_alive=False)
+
+        assert session.session.headers["Connection"] == "close"
+
+    def test_ensure_pool_size(self):
+        session = self.class_under_test(self.num_retries, pool_maxsize=4)
+        adapter = session.adapter
+        old_pool_manager = adapter.poolmanager
+
+        session.ensure_pool_size(2)
+        assert adapter.poolmanager is old_pool_manager
+
+        session.ensure_pool_size(16)
+        assert session.pool_maxsize == 16
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 16
+        assert adapter.poolmanager.connection_pool_kw["block"] is False
+        assert adapter.max_retries.total == self.num_retries
+
     def _assert_retry_set_up_correctly(self, adapter):
         retry = adapter.max_retries
         assert retry.total == self.num_retries
@@ -153,6 +192,19 @@ class _BaseTestRetryTimeoutSession(_BaseHTTPSEnforcedTest):
             assert retry.read == 99
             assert retry.connect == 99
 
+    def test_pool_settings(self):
+        session = self.class_under_test(
+            3, pool_maxsize=20, pool_block=True, keep_alive=False
+        )
+
+        retry_session = session.retry_session
+        assert retry_session.pool_maxsize == 20
+        assert retry_session.pool_block is True
+        assert retry_session.session.headers["Connection"] == "close"
+
+        session.ensure_pool_size(32)
+        assert retry_session.pool_maxsize == 32
+
     def test_nested_session(self):
         sess = self.class_under_test(3)
         assert isinstance(sess.session, TimeoutSession)
@@ -193,3 +245,160 @@ class TestPostRetryTimeoutSession(_BaseTestRetryTimeoutSession):
 
     class_under_test = TimeoutPostRetrySession
     expected_retry_session_class = PostRetrySession
+
+
+class TestRetryBudget:
+    def test_invalid_arguments(self):
+        for kwargs in [{"ratio": -1}, {"min_retries": -1}, {"window": 0}]:
+            with pytest.raises(ValueError):
+                RetryBudget(**kwargs)
+
+    def test_min_retries_without_requests(self, fake_timer):
+        budget = RetryBudget(ratio=0.5, min_retries=2, timer=fake_timer)
+
+        assert budget.try_spend() is True
+        assert budget.try_spend() is True
+        assert budget.try_spend() is False
+
+    def test_ratio(self, fake_timer):
+        budget = RetryBudget(ratio=0.1, min_retries=0, timer=fake_timer)
+        for _ in range(30):
+            budget.record_request()
+
+        spent = [budget.try_spend() for _ in range(5)]
+
+        assert spent == [True, True, True, False, False]
+
+    def test_sliding_window(self, fake_timer):
+        budget = RetryBudget(ratio=0, min_retries=1, window=10, timer=fake_timer)
+        assert budget.try_spend() is True
+        fake_timer.now = 9.9
+        assert budget.try_spend() is False
+
+        fake_timer.now = 10.0
+
+        assert budget.try_spend() is True
+
+
+class TestJitteredRetry:
+    def _retry_after_errors(self, error_count, **kwargs):
+        retry = JitteredRetry(total=10, backoff_factor=1, **kwargs)
+        for _ in range(error_count):
+            retry = retry.increment(
+                method="GET", url="/", error=ReadTimeoutError(None, "/", "timeout")
+            )
+        return retry
+
+    def test_exponential_backoff_without_jitter(self):
+        delays = [
+            self._retry_after_errors(count, jitter=False).get_backoff_time()
+            for count in range(1, 6)
+        ]
+
+        assert delays == [0, 2, 4, 8, 16]
+
+    def test_max_backoff(self):
+        retry = self._retry_after_errors(9, jitter=False, max_backoff=30)
+
+        assert retry.get_backoff_time() == 30
+
+    def test_full_jitter(self):
+        retry = self._retry_after_errors(4)
+
+        delays = {retry.get_backoff_time() for _ in range(100)}
+
+        assert all(0 <= delay <= 8 for delay in delays)
+        assert len(delays) > 1
+
+    def test_settings_survive_increment(self):
+        budget = RetryBudget()
+
+        retry = self._retry_after_errors(
+            2, jitter=False, max_backoff=3, retry_budget=budget
+        )
+
+        assert retry.jitter is False
+        assert retry.max_backoff == 3
+        assert retry.retry_budget is budget
+
+    def test_retry_after_is_capped(self):
+        retry = JitteredRetry(max_backoff=60)
+        response = Mock(headers={"Retry-After": "3600"})
+
+        assert retry.get_retry_after(response) == 60
+
+        response.headers = {}
+        assert retry.get_retry_after(response) is None
+
+    def test_budget_exhausted(self, fake_timer):
+        budget = RetryBudget(ratio=0, min_retries=1, timer=fake_timer)
+        retry = self._retry_after_errors(1, retry_budget=budget)
+
+        with pytest.raises(MaxRetryError):
+            retry.increment(
+                method="GET", url="/", error=ReadTimeoutError(None, "/", "timeout")
+            )
+
+    def test_retry_session_uses_jittered_retry(self):
+        budget = RetryBudget()
+
+        session = RetrySession(3, max_backoff=5, jitter=False, retry_budget=budget)
+
+        for adapter in session.adapters.values():
+            assert isinstance(adapter.max_retries, JitteredRetry)
+            assert adapter.max_retries.max_backoff == 5
+            assert adapter.max_retries.jitter is False
+            assert adapter.max_retries.retry_budget is budget
+
+    def test_timeout_retry_session_passes_settings(self):
+        budget = RetryBudget()
+
+        session = TimeoutPostRetrySession(3, max_backoff=5, retry_budget=budget)
+
+        for adapter in session.adapters.values():
+            assert adapter.max_retries.max_backoff == 5
+            assert adapter.max_retries.retry_budget is budget
+
+
+@pytest.fixture
+def httpretty_enabled():
+    httpretty.enable()
+    yield
+    httpretty.disable()
+    httpretty.reset()
+
+
+class TestRetryOnTheWire:
+    url = "https://localhost/models"
+
+    def test_retry_after_is_honored(self, httpretty_enabled, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(http_transport.time, "sleep", sleeps.append)
+        httpretty.register_uri(
+            httpretty.GET,
+            self.url,
+            responses=[
+                httpretty.Response(
+                    body="", status=429, adding_headers={"Retry-After": "7"}
+                ),
+                httpretty.Response(body="{}", status=200),
+            ],
+        )
+
+        response = RetrySession(3).get(self.url)
+
+        assert response.status_code == 200
+        assert sleeps == [7]
+
+    def test_budget_stops_retries(self, httpretty_enabled):
+        httpretty.register_uri(httpretty.GET, self.url, body="", status=503)
+        budget = RetryBudget(ratio=0, min_retries=2)
+        session = RetrySession(7, backoff_factor=0, retry_budget=budget)
+
+        first = session.get(self.url)
+        second = session.get(self.url)
+
+        assert first.status_code == 503
+        assert second.status_code == 503
+        # Two retries for the first request, none for the second.
+        assert len(httpretty.latest_requests()) == 4
@@ -0,0 +1,122 @@
+import json
+import timeit
+from unittest.mock import Mock
+
+import pytest
+
+from sap.aibus.dar.client.util import json_codec
+
+
+def available_backends():
+    backends = ["json"]
+    for module_name in ["orjson", "ujson"]:
+        try:
+            __import__(module_name)
+        except ImportError:
+            continue
+        backends.append(module_name)
+    return backends
+
+
+def make_batch(object_count=50):
+    """A request body and a response body for one inference request."""
+    description = "Alkaline batteries; 1.5V, pack of 24 – long-lasting / “premium” "
+    payload = {
+        "topN": 3,
+        "objects": [
+            {
+                "objectId": "b5cbcb34-7ab9-4da5-b7ec-{:012d}".format(idx),
+                "features": [
+                    {"name": "manufacturer", "value": "Energizer"},
+                    {"name": "description", "value": description * 4},
+                    {"name": "price", "value": "5.99"},
+                ],
+            }
+            for idx in range(object_count)
+        ],
+    }
+    response = {
+        "id": "09ade1bd-1da0-4060-45bd-185b31afba24",
+        "status": "DONE",
+        "processedTime": "2020-07-03T15:22:28.124490+00:00",
+        "predictions": [
+            {
+                "objectId": obj["objectId"],
+                "labels": [
+                    {
+                        "name": "level{}_category".format(level),
+                        "results": [
+                            {"value": "Household Batteries", "probability": 0.99},
+                            {"value": "Housewares", "probability": 0.005},
+                            {"value": "Video Games", "probability": 0.001},
+                        ],
+                    }
+                    for level in range(1, 4)
+                ],
+            }
+            for obj in payload["objects"]
+        ],
+    }
+    return payload, json.dumps(response).encode("utf-8")
+
+
+@pytest.mark.parametrize("backend", available_backends())
+class TestJsonCodec:
+    def test_dumps_is_compact_utf8(self, backend, monkeypatch):
+        monkeypatch.setattr(json_codec, "BACKEND", backend)
+        obj = {"name": "café/ü", "values": [1, 2.5, None, True]}
+
+        encoded = json_codec.dumps(obj)
+
+        assert encoded == '{"name":"café/ü","values":[1,2.5,null,true]}'.encode("utf-8")
+
+    def test_round_trip(self, backend, monkeypatch):
+        monkeypatch.setattr(json_codec, "BACKEND", backend)
+        payload, response_body = make_batch()
+
+        assert json_codec.loads(json_codec.dumps(payload)) == payload
+        assert json_codec.loads(response_body) == json.loads(response_body)
+        assert json_codec.loads(response_body.decode("utf-8")) == json.loads(
+            response_body
+        )
+
+    def test_response_json(self, backend, monkeypatch):
+        monkeypatch.setattr(json_codec, "BACKEND", backend)
+        response = Mock(content=b'{"a": [1]}')
+        response.json.return_value = {"a": [1]}
+
+        assert json_codec.response_json(response) == {"a": [1]}
+        assert response.json.called == (backend == "json")
+        assert json_codec.is_fast() == (backend != "json")
+
+
+def test_benchmark_per_batch(monkeypatch):
+    """
+    Compares the time to encode a request and decode a response for one batch.
+
+    Run with `pytest -s -k benchmark` to see the results.
+    """
+    payload, response_body = make_batch()
+    repeat = 50
+
+    def measure():
+        return min(
+            timeit.repeat(
+                lambda: json_codec.loads(response_body) and json_codec.dumps(payload),
+                number=repeat,
+                repeat=3,
+            )
+        )
+
+    timings = {}
+    for backend in available_backends():
+        monkeypatch.setattr(json_codec, "BACKEND", backend)
+        timings[backend] = measure() / repeat
+
+    for backend, timing in timings.items():
+        print(
+            "{:>6}: {:8.1f} µs per batch ({:.1f}x stdlib)".format(
+                backend, timing * 1e6, timings["json"] / timing
+            )
+        )
+    assert set(timings) == set(available_backends())
@@ -1,6 +1,6 @@
 import pytest
 
-from sap.aibus.dar.client.util.lists import split_list
+from sap.aibus.dar.client.util.lists import split_iterable, split_list
 
 
 class TestSplitList:
@@ -26,3 +26,36 @@ class TestSplitList:
     def test_slice_size_bigger_than_list(self):
         res = list(split_list(["a", "b", "c", "d"], 6))
         assert res == [["a", "b", "c", "d"]]
+
+
+class TestSplitIterable:
+    """Tests split_iterable"""
+
+    def test_slice_size_invalid(self):
+        for invalid_slice_size in [-1000, -1, 0]:
+            with pytest.raises(ValueError):
+                list(split_iterable(["a", "b"], invalid_slice_size))
+
+    def test_empty_iterable(self):
+        res = list(split_iterable(iter([]), slice_size=1))
+        assert res == []
+
+    def test_regular_case(self):
+        res = list(split_iterable(iter(["a", "b", "c", "d"]), 2))
+        assert res == [["a", "b"], ["c", "d"]]
+
+    def test_iterable_uneven(self):
+        res = list(split_iterable(iter(["a", "b", "c", "d"]), 3))
+        assert res == [["a", "b", "c"], ["d"]]
+
+    def test_consumes_lazily(self):
+        consumed = []
+
+        def generate():
+            for item in ["a", "b", "c", "d"]:
+                consumed.append(item)
+                yield item
+
+        slices = split_iterable(generate(), 2)
+        assert next(slices) == ["a", "b"]
+        assert consumed == ["a", "b"]
@@ -0,0 +1,163 @@
+import multiprocessing
+import pickle
+import threading
+
+import pytest
+
+from sap.aibus.dar.client.util.rate_limiting import (
+    RateLimiter,
+    SqliteTokenBucket,
+    TokenBucket,
+)
+
+
+class TestTokenBucket:
+    def create_bucket(self, clock, **kwargs):
+        return TokenBucket(timer=clock, sleep=clock.sleep, **kwargs)
+
+    def test_invalid_arguments(self):
+        for kwargs in [{"rate": 0}, {"rate": -1}, {"rate": 1, "capacity": 0}]:
+            with pytest.raises(ValueError):
+                TokenBucket(**kwargs)
+
+    def test_default_capacity(self):
+        assert TokenBucket(rate=20).capacity == 20
+        assert TokenBucket(rate=0.5).capacity == 1
+
+    def test_burst_up_to_capacity(self, fake_timer):
+        bucket = self.create_bucket(fake_timer, rate=10, capacity=5)
+
+        for _ in range(5):
+            assert bucket.acquire() == 0
+
+        assert fake_timer.sleeps == []
+
+    def test_waits_when_empty(self, fake_timer):
+        bucket = self.create_bucket(fake_timer, rate=10, capacity=5)
+        bucket.acquire(5)
+
+        delay = bucket.acquire(2)
+
+        assert delay == pytest.approx(0.2)
+        assert fake_timer.sleeps == [pytest.approx(0.2)]
+
+    def test_refills_over_time(self, fake_timer):
+        bucket = self.create_bucket(fake_timer, rate=10, capacity=5)
+        bucket.acquire(5)
+        fake_timer.now += 0.5
+
+        assert bucket.acquire(3) == 0
+
+        # Refill stops at capacity.
+        fake_timer.now += 100
+        assert bucket.acquire(5) == 0
+        assert bucket.acquire(1) == pytest.approx(0.1)
+
+    def test_amount_exceeding_capacity_goes_into_debt(self, fake_timer):
+        bucket = self.create_bucket(fake_timer, rate=10, capacity=5)
+
+        assert bucket.acquire(50) == pytest.approx(4.5)
+        # The next caller waits for the debt to be paid off.
+        fake_timer.now -= 4.5
+        assert bucket.acquire(1) == pytest.approx(4.6)
+
+    def test_long_term_rate(self, fake_timer):
+        bucket = self.create_bucket(fake_timer, rate=100, capacity=10)
+
+        for _ in range(1010):
+            bucket.acquire()
+
+        assert fake_timer.now == pytest.approx(10.0)
+
+    def test_thread_safety(self):
+        bucket = TokenBucket(rate=1000, capacity=1000, sleep=lambda _: None)
+
+        def take():
+            for _ in range(100):
+                bucket.acquire()
+
+        threads = [threading.Thread(target=take) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 800 tokens were taken from a full bucket of 1000; the refill during the
+        # test run is negligible but positive.
+        assert 200 <= bucket._tokens <= 1000
+
+    def test_abstract_base_class(self):
+        with pytest.raises(NotImplementedError):
+            RateLimiter().acquire()
+
+
+def _acquire_in_other_process(bucket):
+    bucket.acquire(3)
+
+
+class TestSqliteTokenBucket:
+    def create_bucket(self, tmp_path, clock, **kwargs):
+        return SqliteTokenBucket(
+            str(tmp_path / "buckets.db"), timer=clock, sleep=clock.sleep, **kwargs
+        )
+
+    def test_invalid_arguments(self, tmp_path):
+        for kwargs in [{"rate": 0}, {"rate": 1, "capacity": -1}]:
+            with pytest.raises(ValueError):
+                SqliteTokenBucket(str(tmp_path / "buckets.db"), **kwargs)
+
+    def test_waits_when_empty(self, tmp_path, fake_timer):
+        bucket = self.create_bucket(tmp_path, fake_timer, rate=10, capacity=5)
+
+        assert bucket.acquire(5) == 0
+        assert bucket.acquire(2) == pytest.approx(0.2)
+        fake_timer.now += 10
+        assert bucket.acquire(5) == 0
+
+    def test_instances_share_bucket(self, tmp_path, fake_timer):
+        first = self.create_bucket(tmp_path, fake_timer, rate=10, capacity=5)
+        second = self.create_bucket(tmp_path, fake_timer, rate=10, capacity=5)
+
+        first.acquire(4)
+
+        assert second.acquire(2) == pytest.approx(0.1)
+        first.close()
+        second.close()
+
+    def test_names_are_separate_buckets(self, tmp_path, fake_timer):
+        first = self.create_bucket(tmp_path, fake_timer, rate=10, capacity=5, name="a")
+        second = self.create_bucket(tmp_path, fake_timer, rate=10, capacity=5, name="b")
+
+        first.acquire(5)
+
+        assert second.acquire(5) == 0
+
+    def test_pickle(self, tmp_path, fake_timer):
+        bucket = self.create_bucket(tmp_path, fake_timer, rate=10, capacity=5)
+        bucket.acquire(4)
+
+        copy = pickle.loads(pickle.dumps(SqliteTokenBucket(bucket.path, rate=10)))
+
+        assert copy.path == bucket.path
+        assert copy.capacity == 10
+        # The copy opened its own connection to the same database.
+        (count,) = copy._connection.execute(
+            "SELECT COUNT(*) FROM token_buckets"
+        ).fetchone()
+        assert count == 1
+
+    def test_shared_between_processes(self, tmp_path):
+        path = str(tmp_path / "buckets.db")
+        bucket = SqliteTokenBucket(path, rate=0.001, capacity=5)
+
+        process = multiprocessing.Process(
+            target=_acquire_in_other_process, args=(bucket,)
+        )
+        process.start()
+        process.join()
+
+        assert process.exitcode == 0
+        (tokens,) = bucket._connection.execute(
+            "SELECT tokens FROM token_buckets WHERE name = 'default'"
+        ).fetchone()
+        assert tokens == pytest.approx(2, abs=0.01)
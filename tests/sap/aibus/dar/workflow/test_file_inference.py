@@ -0,0 +1,179 @@
+import csv
+import gzip
+import json
+from unittest.mock import Mock
+
+import pytest
+from requests import RequestException
+
+from sap.aibus.dar.client.inference_client import InferenceClient
+from sap.aibus.dar.client.util.credentials import (
+    CredentialsSource,
+    StaticCredentialsSource,
+)
+from sap.aibus.dar.client.workflow.file_inference import FileInference, detect_format
+from tests.sap.aibus.dar.client.test_data_manager_client import (
+    AbstractDARClientConstruction,
+    prepare_client,
+)
+
+DAR_URL = "https://aiservices-dar.cfapps.xxx.hana.ondemand.com/"
+
+DATASET_SCHEMA = {
+    "features": [
+        {"label": "manufacturer", "type": "CATEGORY"},
+        {"label": "title", "type": "TEXT"},
+    ],
+    "labels": [{"label": "category", "type": "CATEGORY"}],
+    "name": "test-schema",
+}
+
+CSV_INPUT = """id,manufacturer,title,category
+a1,ACME,"Anvil, heavy",
+a2,ACME,Hammer ü,
+a3,Globex,Rocket,
+"""
+
+
+def post_to_endpoint(endpoint, payload, retry=False):
+    """Predicts the title of each object with the given top_n."""
+    if isinstance(payload, bytes):
+        # Sent via post_json_to_endpoint
+        payload = json.loads(payload.decode("utf-8"))
+    predictions = []
+    for obj in payload["objects"]:
+        features = {feature["name"]: feature["value"] for feature in obj["features"]}
+        if features["title"] == "Rocket":
+            raise RequestException("Rocket")
+        results = [
+            {"value": features["title"], "probability": 1.0 / (rank + 1)}
+            for rank in range(payload["topN"])
+        ]
+        predictions.append(
+            {
+                "objectId": obj["objectId"],
+                "labels": [{"name": "category", "results": results}],
+            }
+        )
+    response = Mock()
+    response.json.return_value = {"id": "1", "predictions": predictions}
+    return response
+
+
+@pytest.fixture()
+def file_inference():
+    file_inference = FileInference.construct_from_jwt(DAR_URL, token="54321")
+    file_inference.inference_client = prepare_client(DAR_URL, InferenceClient)
+    session = file_inference.inference_client.session
+    session.post_to_endpoint.side_effect = post_to_endpoint
+    session.post_json_to_endpoint.side_effect = post_to_endpoint
+    return file_inference
+
+
+class TestFileInferenceConstruction(AbstractDARClientConstruction):
+    # Tests are in base class
+    clazz = FileInference
+
+    def test_constructor(self):
+        source = StaticCredentialsSource("1234")
+        client = self.clazz(DAR_URL, source)
+        assert client.inference_client.credentials_source == source
+
+    def test_create_from_jwt(self):
+        # Override and change assertions to look into embedded client.
+        jwt = "12345"
+        client = self.clazz.construct_from_jwt(self.dar_url, jwt)
+
+        embedded_client = client.inference_client
+        assert isinstance(embedded_client.credentials_source, StaticCredentialsSource)
+        assert embedded_client.credentials_source.token() == jwt
+        assert embedded_client.session.base_url == self.dar_url[:-1]
+
+    def _assert_fields_initialized(self, client):
+        assert isinstance(client.inference_client, InferenceClient)
+        assert client.inference_client.session.base_url == self.dar_url[:-1]
+        assert isinstance(client.inference_client.credentials_source, CredentialsSource)
+
+
+@pytest.mark.usefixtures("stdlib_json_backend")
+class TestFileInference:
+    def test_detect_format(self):
+        assert detect_format("in.csv") == "csv"
+        assert detect_format("IN.CSV.GZ") == "csv"
+        assert detect_format("in.jsonl") == "jsonl"
+        assert detect_format("in.ndjson.gz") == "jsonl"
+        with pytest.raises(ValueError):
+            detect_format("in.parquet")
+
+    def test_csv_to_csv(self, file_inference: FileInference, tmp_path):
+        input_path = tmp_path / "objects.csv"
+        input_path.write_text(CSV_INPUT, encoding="utf-8")
+        output_path = tmp_path / "predictions.csv"
+
+        result = file_inference.run(
+            "my-model",
+            str(input_path),
+            str(output_path),
+            DATASET_SCHEMA,
+            id_column="id",
+            top_n=2,
+            worker_count=1,
+            # One object per request, so that only the last request fails.
+            max_payload_bytes=100,
+        )
+
+        assert result == {"objectCount": 3, "failedCount": 1}
+        with open(str(output_path), encoding="utf-8", newline="") as output_file:
+            rows = list(csv.DictReader(output_file))
+        assert list(rows[0].keys()) == [
+            "objectId",
+            "category",
+            "category_probability",
+            "category_2",
+            "category_2_probability",
+            "error",
+        ]
+        assert rows[0] == {
+            "objectId": "a1",
+            "category": "Anvil, heavy",
+            "category_probability": "1.0",
+            "category_2": "Anvil, heavy",
+            "category_2_probability": "0.5",
+            "error": "",
+        }
+        assert rows[1]["category"] == "Hammer ü"
+        assert rows[2]["objectId"] == "a3"
+        assert rows[2]["category"] == ""
+        assert rows[2]["error"] == "RequestException: Rocket"
+
+    def test_gzip_jsonl_to_jsonl(self, file_inference: FileInference, tmp_path):
+        input_path = tmp_path / "objects.jsonl.gz"
+        with gzip.open(str(input_path), "wt", encoding="utf-8") as input_file:
+            for idx in range(120):
+                record = {"manufacturer": "ACME", "title": "Anvil {}".format(idx)}
+                input_file.write(json.dumps(record) + "\n")
+            input_file.write("\n")
+        output_path = tmp_path / "predictions.jsonl.gz"
+
+        result = file_inference.run(
+            "my-model", str(input_path), str(output_path), DATASET_SCHEMA
+        )
+
+        assert result == {"objectCount": 120, "failedCount": 0}
+        with gzip.open(str(output_path), "rt", encoding="utf-8") as output_file:
+            predictions = [json.loads(line) for line in output_file]
+        assert [p["objectId"] for p in predictions] == [str(i) for i in range(120)]
+        assert predictions[7]["labels"][0]["results"][0]["value"] == "Anvil 7"
+        assert file_inference.inference_client.session.post_to_endpoint.call_count == 3
+
+    def test_missing_column(self, file_inference: FileInference, tmp_path):
+        input_path = tmp_path / "objects.csv"
+        input_path.write_text("manufacturer\nACME\n", encoding="utf-8")
+
+        with pytest.raises(ValueError, match="title"):
+            file_inference.run(
+                "my-model",
+                str(input_path),
+                str(tmp_path / "predictions.csv"),
+                DATASET_SCHEMA,
+            )